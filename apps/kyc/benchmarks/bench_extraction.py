@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass field extractor against the previous cascade of
+per-fragment regex loops on synthetic OCR outputs.
+
+Usage: python benchmarks/bench_extraction.py [count]
+"""
+
+import io
+import os
+import re
+import sys
+import time
+import random
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from extraction import extract_passport_patterns
+
+SURNAMES = ["MUSTERMANN", "ERIKSSON", "SMITH", "MARTIN", "BROWN", "JOVANOVIC", "DUBOIS"]
+GIVEN_NAMES = ["ERIKA", "ANNA", "JOHN", "PIERRE", "SARAH", "MILAN", "CLAIRE"]
+COUNTRIES = [("DEU", "GERMANY"), ("USA", "UNITED STATES"), ("GBR", "UNITED KINGDOM"),
+             ("FRA", "FRANCE"), ("SRB", "SERBIA"), ("CAN", "CANADA"), ("NLD", "NETHERLANDS")]
+NOISE = ["DATE OF BIRTH", "SEX F", "DATE OF ISSUE", "AUTHORITY", "CLASS C", "HEIGHT 5-06",
+         "EXPIRES 08/12/2027", "SIGNATURE", "DONOR", "12 MAR 2020", "RESTRICTIONS NONE"]
+
+
+def legacy_extract_passport_patterns(text_list):
+    """The per-fragment regex cascade replaced by extraction.py, kept for comparison"""
+    passport_data = {"passport_number": None, "country": None, "name": None,
+                     "confidence_score": 0, "extraction_method": "none"}
+    all_text = ' '.join(text_list).upper()
+    for pattern in [r'P<([A-Z]{3})<([A-Z]+)<<([A-Z]+)<+', r'P<([A-Z]{3})([A-Z]+)<<([A-Z]+)']:
+        match = re.search(pattern, all_text)
+        if match:
+            passport_data["country"] = match.group(1)
+            passport_data["name"] = f"{match.group(2)}, {match.group(3)}"
+            passport_data["extraction_method"] = "mrz"
+            passport_data["confidence_score"] = 0.9
+            break
+    passport_patterns = [
+        r'\b[A-Z]{1,2}[0-9]{6,8}\b', r'\b[0-9]{8,9}\b', r'\b[A-Z][0-9]{7}\b',
+        r'\bPASS(?:PORT)?\s+(?:NO\.?|NUMBER)?\s*([A-Z0-9]{6,9})\b', r'\bNO\.?\s*([A-Z0-9]{6,9})\b',
+    ]
+    for text in text_list:
+        for pattern in passport_patterns:
+            match = re.search(pattern, text.upper())
+            if match:
+                potential_number = match.group(1) if match.groups() else match.group()
+                if not re.match(r'.*(DOB|SEX|BIRTH|DATE|EXPIRES?|ISS|EXP|CLASS|TYPE).*', potential_number):
+                    if not passport_data["passport_number"]:
+                        passport_data["passport_number"] = potential_number
+                        if passport_data["extraction_method"] == "none":
+                            passport_data["extraction_method"] = "pattern_match"
+                            passport_data["confidence_score"] = 0.7
+                        break
+    if not passport_data["country"]:
+        country_patterns = [
+            r'\b(USA|UNITED STATES|US)\b', r'\b(GBR|UNITED KINGDOM|UK|BRITAIN)\b',
+            r'\b(DEU|GERMANY|DEUTSCHLAND)\b', r'\b(FRA|FRANCE)\b', r'\b(CAN|CANADA)\b',
+            r'\b(AUS|AUSTRALIA)\b', r'\b(ITA|ITALY)\b', r'\b(ESP|SPAIN)\b',
+            r'\b(NLD|NETHERLANDS)\b', r'\b(CHE|SWITZERLAND)\b'
+        ]
+        country_map = {'UNITED STATES': 'USA', 'US': 'USA', 'UNITED KINGDOM': 'GBR', 'UK': 'GBR',
+                       'BRITAIN': 'GBR', 'GERMANY': 'DEU', 'DEUTSCHLAND': 'DEU', 'FRANCE': 'FRA',
+                       'CANADA': 'CAN', 'AUSTRALIA': 'AUS', 'ITALY': 'ITA', 'SPAIN': 'ESP',
+                       'NETHERLANDS': 'NLD', 'SWITZERLAND': 'CHE'}
+        for pattern in country_patterns:
+            match = re.search(pattern, all_text)
+            if match:
+                found_country = match.group(1).upper()
+                passport_data["country"] = country_map.get(found_country, found_country)
+                if passport_data["extraction_method"] == "none":
+                    passport_data["extraction_method"] = "country_detection"
+                    passport_data["confidence_score"] = 0.2
+                break
+    if not passport_data["name"]:
+        for pattern in [r'(?:SURNAME|LAST NAME|LN)[:\s]+([A-Z\s]+)',
+                        r'(?:GIVEN NAME|FIRST NAME|FN)[:\s]+([A-Z\s]+)',
+                        r'([A-Z]{2,})\s*,\s*([A-Z]{2,})']:
+            match = re.search(pattern, all_text)
+            if match:
+                if len(match.groups()) == 2:
+                    passport_data["name"] = f"{match.group(1).strip()}, {match.group(2).strip()}"
+                else:
+                    passport_data["name"] = match.group(1).strip()
+                break
+    return passport_data
+
+
+def legacy_process(text_list):
+    """Legacy flow: extraction, retry over all text, then the fallback number scan"""
+    passport_data = legacy_extract_passport_patterns(text_list)
+    if passport_data["extraction_method"] == "none":
+        passport_data = legacy_extract_passport_patterns(text_list)
+    if not passport_data["passport_number"]:
+        for pattern in [r'\b[A-Z0-9]{6,10}\b', r'\b\d{8,9}\b']:
+            for match in re.findall(pattern, ' '.join(text_list).upper()):
+                if not re.match(r'.*(DATE|BIRTH|EXP|ISS|CLASS|SEX|HEIGHT|WEIGHT).*', match):
+                    passport_data["passport_number"] = match
+                    passport_data["extraction_method"] = "fallback_pattern"
+                    passport_data["confidence_score"] = 0.4
+                    break
+            if passport_data["passport_number"]:
+                break
+    return passport_data
+
+
+def synthetic_page(rng):
+    """One OCR output: a passport with MRZ, a driver license, or an unlabelled card"""
+    surname, given = rng.choice(SURNAMES), rng.choice(GIVEN_NAMES)
+    alpha3, name = rng.choice(COUNTRIES)
+    number = rng.choice("ABCDELP") + ''.join(rng.choice("0123456789") for _ in range(7))
+    lines = rng.sample(NOISE, 4)
+    kind = rng.random()
+    if kind < 0.4:
+        lines += ["PASSPORT", name, f"SURNAME {surname}", f"GIVEN NAMES {given}",
+                  f"P<{alpha3}{surname}<<{given}<<<<<<<<<<<<<<<",
+                  f"{number}<4{alpha3}7408122F2708129<<<<<<<<<<<<<<02"]
+    elif kind < 0.8:
+        lines += [name, "DRIVER LICENSE", f"DL {number}", f"{surname}, {given}", "CLASS C"]
+    else:
+        lines += [f"{name} IDENTITY CARD", f"NO. X{number[1:]}Y", f"{surname} {given}"]
+    rng.shuffle(lines)
+    return lines
+
+
+def bench(label, fn, pages):
+    sink = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        results = [fn(page) for page in pages]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {elapsed:8.2f}s  {len(pages) / elapsed:10.0f} pages/s  "
+          f"{elapsed / len(pages) * 1e6:8.1f} us/page")
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(1234)
+    pages = [synthetic_page(rng) for _ in range(count)]
+    print(f"🧪 {count} synthetic OCR outputs")
+
+    legacy = bench("legacy", legacy_process, pages)
+    single = bench("single-pass", extract_passport_patterns, pages)
+
+    for field in ("passport_number", "country", "name"):
+        agree = sum(a[field] == b[field] for a, b in zip(legacy, single))
+        print(f"{field:<16} agreement: {agree / count:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measure the logging overhead of process_passport() on a dense page:
+KYC_LOG_LEVEL=DEBUG (every fragment, line and result is formatted and
+written, as the per-fragment print calls used to do) against the INFO
+production default. The page stage's OCR output is synthetic and passed
+in directly, so only post-OCR work is timed.
+
+Usage: python benchmarks/bench_logging.py [fragments] [iterations]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+
+KYC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(KYC_DIR, 'src'))
+
+from app import process_passport
+
+IMAGE = os.path.join(KYC_DIR, 'test-image.png')
+WORDS = ["REISEPASS", "PASSPORT", "SURNAME", "MUSTERMANN", "GIVEN", "NAMES", "ERIKA", "DATE",
+         "OF", "BIRTH", "12", "AUG", "1964", "AUTHORITY", "KOLN", "NATIONALITY", "DEUTSCH"]
+
+
+class NoMrzReader:
+    """Only reached if a synthetic fragment looks like an MRZ line"""
+    def readtext(self, image, **options):
+        return []
+
+
+def dense_page(fragments):
+    """EasyOCR-style detections laid out in rows of six"""
+    random.seed(7)
+    # A number and a country, so the page verifies without the demo fallback
+    results = [
+        ([[0, 0], [100, 0], [100, 20], [0, 20]], "L898902C3", 0.95),
+        ([[120, 0], [220, 0], [220, 20], [120, 20]], "GERMANY", 0.95),
+    ]
+    for n in range(6, fragments):
+        x, y = (n % 6) * 120, (n // 6) * 30
+        bbox = [[x, y], [x + 100, y], [x + 100, y + 20], [x, y + 20]]
+        results.append((bbox, random.choice(WORDS), random.uniform(0.2, 0.99)))
+    return results
+
+
+def run(results, iterations, level):
+    root = logging.getLogger('kyc')
+    root.setLevel(level)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        process_passport(IMAGE, NoMrzReader(), ocr_results=results)
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def main():
+    fragments = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    results = dense_page(fragments)
+
+    # Log lines go to /dev/null so terminal speed does not skew the numbers
+    handler = logging.getLogger('kyc').handlers[0]
+    with open(os.devnull, 'w') as devnull:
+        handler.setStream(devnull)
+        debug_ms = run(results, iterations, logging.DEBUG)
+        info_ms = run(results, iterations, logging.INFO)
+
+    print(f"{fragments} fragments per page, {iterations} iterations")
+    print(f"DEBUG  {debug_ms:8.2f} ms/page")
+    print(f"INFO   {info_ms:8.2f} ms/page")
+    print(f"logging overhead removed: {debug_ms - info_ms:.2f} ms/page "
+          f"({1 - info_ms / debug_ms:.0%})")
+
+
+if __name__ == "__main__":
+    main()
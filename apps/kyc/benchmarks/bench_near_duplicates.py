@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure near-duplicate screening: hashing cost per image, Hamming distances
+between re-photographed variants of test-image.png, and lookup latency in
+an index filled with random records.
+
+Usage: python benchmarks/bench_near_duplicates.py [records]
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import tempfile
+
+from PIL import Image, ImageEnhance
+
+KYC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(KYC_DIR, 'src'))
+
+from near_duplicates import NearDuplicateIndex, hamming, image_hashes
+
+IMAGE = os.path.join(KYC_DIR, 'test-image.png')
+OTHER_IMAGE = os.path.join(KYC_DIR, 'src', 'fake-id.jpg')
+
+
+def variants(image):
+    """The same document as it might come back from another phone"""
+    width, height = image.size
+    jpeg = io.BytesIO()
+    image.convert('RGB').save(jpeg, 'JPEG', quality=60)
+    return {
+        "half size": image.resize((width // 2, height // 2)),
+        "jpeg q60": Image.open(io.BytesIO(jpeg.getvalue())),
+        "brighter": ImageEnhance.Brightness(image.convert('RGB')).enhance(1.3),
+        "cropped 3%": image.crop((width * 3 // 100, height * 3 // 100, width, height)),
+        "other document": Image.open(OTHER_IMAGE),
+    }
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    original = Image.open(IMAGE)
+    with open(IMAGE, 'rb') as f:
+        image_bytes = f.read()
+
+    start = time.perf_counter()
+    for _ in range(20):
+        p_hash, d_hash, digest = image_hashes(original, image_bytes)
+    print(f"hashing {original.size[0]}x{original.size[1]}: "
+          f"{(time.perf_counter() - start) / 20 * 1e3:.2f} ms/image")
+
+    print(f"{'variant':<16} {'pHash d':>8} {'dHash d':>8}")
+    for name, image in variants(original).items():
+        p_variant, d_variant, _ = image_hashes(image, b'')
+        print(f"{name:<16} {hamming(p_hash, p_variant):>8} {hamming(d_hash, d_variant):>8}")
+
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'phash.idx')
+        index = NearDuplicateIndex(path)
+        start = time.perf_counter()
+        for _ in range(records):
+            index._insert((random.getrandbits(64), random.getrandbits(64), 0.0, b'\0' * 16))
+        print(f"\n{records} random records inserted in {time.perf_counter() - start:.2f}s")
+
+        index.check_and_add(p_hash, d_hash, digest)
+        lookups = []
+        for name, image in variants(original).items():
+            p_variant, d_variant, variant_digest = image_hashes(image, b'')
+            start = time.perf_counter()
+            matches = index.check_and_add(p_variant, d_variant, variant_digest)
+            lookups.append(time.perf_counter() - start)
+            print(f"{name:<16} matches: {len(matches)}")
+        print(f"lookup + append: {sum(lookups) / len(lookups) * 1e3:.3f} ms mean, "
+              f"{max(lookups) * 1e3:.3f} ms max")
+
+        reopened = NearDuplicateIndex(path)
+        print(f"reopened index holds {len(reopened.records)} persisted record(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Compare document throughput of the plain sequential readtext() loop with
+the pipelined detect/recognize executor.
+
+Usage: python benchmarks/bench_pipeline.py [documents] [queue_size]
+"""
+
+import os
+import sys
+import time
+
+KYC_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(KYC_DIR, 'src'))
+
+from app import initialize_ocr
+from pipeline import pipelined_readtext
+
+SAMPLE_IMAGES = [
+    os.path.join(KYC_DIR, 'test-image.png'),
+    os.path.join(KYC_DIR, 'driver-license-test.png'),
+    os.path.join(KYC_DIR, 'src', 'fake-id.jpg'),
+]
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    queue_size = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    samples = [path for path in SAMPLE_IMAGES if os.path.exists(path)]
+    images = [samples[i % len(samples)] for i in range(documents)]
+
+    reader = initialize_ocr()
+    if not reader:
+        print("❌ Failed to initialize OCR reader")
+        return
+    # Warm up both models
+    reader.readtext(samples[0], detail=1)
+
+    start = time.perf_counter()
+    sequential = [reader.readtext(image, detail=1) for image in images]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipelined = [results for _, results in pipelined_readtext(reader, images, queue_size=queue_size)]
+    pipelined_time = time.perf_counter() - start
+
+    same = sum(
+        [text for _, text, _ in a] == [text for _, text, _ in b]
+        for a, b in zip(sequential, pipelined)
+    )
+    print(f"{'executor':<12} {'total s':>8} {'docs/s':>8}")
+    print(f"{'sequential':<12} {sequential_time:8.2f} {documents / sequential_time:8.2f}")
+    print(f"{'pipelined':<12} {pipelined_time:8.2f} {documents / pipelined_time:8.2f}")
+    print(f"speedup: {sequential_time / pipelined_time:.2f}x, identical text on {same}/{documents} documents")
+
+
+if __name__ == "__main__":
+    main()
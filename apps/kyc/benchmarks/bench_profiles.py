@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark each OCR recognition profile on the sample documents and print
+one table row per profile and image.
+
+Usage: python benchmarks/bench_profiles.py [repeats] [image ...]
+       KYC_OCR_PROFILES=profiles.json python benchmarks/bench_profiles.py
+"""
+
+import os
+import sys
+import time
+import statistics
+
+KYC_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(KYC_DIR, 'src'))
+
+from app import initialize_ocr, is_mrz_line
+from line_assembler import assemble_lines
+from ocr_profiles import load_profiles
+
+DEFAULT_IMAGES = [
+    os.path.join(KYC_DIR, 'test-image.png'),
+    os.path.join(KYC_DIR, 'driver-license-test.png'),
+    os.path.join(KYC_DIR, 'src', 'fake-id.jpg'),
+]
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    images = sys.argv[2:] or [path for path in DEFAULT_IMAGES if os.path.exists(path)]
+
+    reader = initialize_ocr()
+    if not reader:
+        print("❌ Failed to initialize OCR reader")
+        return
+
+    profiles, stages = load_profiles()
+    print(f"Stages: {stages}")
+    print(f"{'profile':<22} {'image':<26} {'mean s':>8} {'min s':>8} {'regions':>8} {'lines':>6} {'mrz':>4} {'conf':>6}")
+
+    for name, options in profiles.items():
+        for image in images:
+            # Warm up once so model loading is not counted
+            reader.readtext(image, detail=1, **options)
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                results = reader.readtext(image, detail=1, **options)
+                timings.append(time.perf_counter() - start)
+            lines = assemble_lines(results)
+            mrz = sum(is_mrz_line(line["text"]) for line in lines)
+            confidence = statistics.mean(r[2] for r in results) if results else 0.0
+            print(f"{name:<22} {os.path.basename(image):<26} {statistics.mean(timings):8.2f} "
+                  f"{min(timings):8.2f} {len(results):8d} {len(lines):6d} {mrz:4d} {confidence:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare the result.json output (indent=2, OCR debug payload included) with
+the compact ABI encoding on size and encode/decode time.
+
+Usage: python benchmarks/bench_result_encoding.py [iterations]
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compact_result import decode_result, encode_result, keccak256
+
+# A typical multi-page DataProtector result as main() writes it
+RESULT = {
+    "passport_number": "L898902C3",
+    "country": "DEU",
+    "name": "MUSTERMANN, ERIKA",
+    "verified": True,
+    "confidence_score": 0.95,
+    "extraction_method": "mrz",
+    "processing_time": "7.4s",
+    "image_processed": "/iexec_out/temp_passport_image_1.jpg",
+    "timestamp": "2026-10-19T10:21:33.482911",
+    "ocr_stats": {
+        "total_text_regions": 41,
+        "high_confidence_regions": 37,
+        "text_lines": 18,
+        "ocr_profiles": {"page": "default", "mrz": None},
+        "ocr_languages": ["en", "de"],
+        "mrz_check": {"valid": True, "substitutions": 1, "escalated": False},
+        "all_detected_text": [
+            "REISEPASS", "PASSPORT", "PASSEPORT", "BUNDESREPUBLIK DEUTSCHLAND", "Typ/Type",
+            "P", "Kode/Code", "D", "Pass-Nr./Passport No.", "L898902C3",
+        ],
+    },
+    "visual_zone_name": "MUSTERMANN, ERIKA",
+    "pages": [
+        {"page": "passport_image_1", "extraction_method": "mrz", "confidence_score": 0.95,
+         "processing_time": "6.9s", "error": None},
+        {"page": "passport_image_2", "extraction_method": "country_detection",
+         "confidence_score": 0.2, "processing_time": "5.1s", "error": None},
+    ],
+    "data_source": "dataprotector",
+    "processing_method": "enhanced_ocr",
+    "reader_pool": {"memory_cap_mb": 1024.0, "resident_mb": 560.2, "loads": 1, "hits": 0,
+                    "evictions": 0, "readers": {"en": 280.1, "de+en": 280.1}},
+    "deadline": {"budget_s": 300.0, "elapsed_s": 7.61, "degradations": []},
+}
+
+
+def timed(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    json_bytes = json.dumps(RESULT, indent=2).encode()
+    compact_bytes = encode_result(RESULT)
+
+    rows = [
+        ("json", len(json_bytes),
+         timed(lambda: json.dumps(RESULT, indent=2).encode(), iterations),
+         timed(lambda: json.loads(json_bytes), iterations)),
+        ("compact", len(compact_bytes),
+         timed(lambda: encode_result(RESULT), iterations),
+         timed(lambda: decode_result(compact_bytes), iterations)),
+    ]
+
+    print(f"{'format':<10} {'bytes':>8} {'encode us':>10} {'decode us':>10}")
+    for name, size, encode_us, decode_us in rows:
+        print(f"{name:<10} {size:>8} {encode_us:>10.1f} {decode_us:>10.1f}")
+    print(f"size reduction: {1 - len(compact_bytes) / len(json_bytes):.1%}")
+    print(f"keccak256 of compact result: 0x{keccak256(compact_bytes).hex()} "
+          f"({timed(lambda: keccak256(compact_bytes), max(1, iterations // 20)):.0f} us)")
+
+
+if __name__ == "__main__":
+    main()
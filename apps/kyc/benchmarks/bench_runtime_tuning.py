@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Sweep torch intra-op thread counts on test-image.png and print readtext()
+latency for each, next to the configuration runtime_tuning picks for this
+container. Each count runs in a fresh process, since OpenMP sizes its
+thread pool when torch loads.
+
+Usage: python benchmarks/bench_runtime_tuning.py [repeats] [threads ...]
+       docker run --cpus=2 ... python benchmarks/bench_runtime_tuning.py
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+KYC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(KYC_DIR, 'src'))
+
+import runtime_tuning
+
+IMAGE = os.path.join(KYC_DIR, 'test-image.png')
+
+
+def worker(repeats):
+    """Child process: time readtext() under the thread settings in the environment"""
+    from app import initialize_ocr
+
+    reader = initialize_ocr()
+    # Warm up once so model loading is not counted
+    reader.readtext(IMAGE, detail=1)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        reader.readtext(IMAGE, detail=1)
+        timings.append(time.perf_counter() - start)
+    print(json.dumps(timings))
+
+
+def run(threads, repeats):
+    env = dict(os.environ, KYC_TORCH_THREADS=str(threads), OMP_NUM_THREADS=str(threads),
+               MKL_NUM_THREADS=str(threads), KYC_LOG_LEVEL='WARNING')
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', str(repeats)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:2] == ['--worker']:
+        worker(int(sys.argv[2]))
+        return
+
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    host_cores = os.cpu_count() or 1
+    if len(sys.argv) > 2:
+        sweep = [int(n) for n in sys.argv[2:]]
+    else:
+        sweep = sorted({1, 2, 4, 8, host_cores} & set(range(1, host_cores + 1)))
+
+    config = runtime_tuning.plan()
+    print(f"host cores {host_cores}, cgroup quota {config['cpu_quota']}, "
+          f"memory limit {config['memory_limit_mb']} MB")
+    print(f"runtime_tuning picks {config['page_workers']} page worker(s) x "
+          f"{config['intra_op_threads']} intra-op thread(s), {config['malloc_arenas']} malloc arena(s)")
+    if config['intra_op_threads'] not in sweep:
+        sweep = sorted(sweep + [config['intra_op_threads']])
+
+    print(f"{'threads':>8} {'mean s':>8} {'median s':>9} {'min s':>8}")
+    for threads in sweep:
+        timings = run(threads, repeats)
+        marker = "  <- tuned" if threads == config['intra_op_threads'] else ""
+        print(f"{threads:8d} {statistics.mean(timings):8.2f} {statistics.median(timings):9.2f} "
+              f"{min(timings):8.2f}{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compare per-task latency of a cold start (python src/app.py, as the
+Dockerfile ENTRYPOINT does) with a fork from the pre-warmed zygote.
+
+Usage: python benchmarks/bench_zygote.py [tasks] [image]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import subprocess
+
+KYC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(KYC_DIR, 'src'))
+
+from zygote import submit
+
+APP = os.path.join(KYC_DIR, 'src', 'app.py')
+ZYGOTE = os.path.join(KYC_DIR, 'src', 'zygote.py')
+
+
+def task_dirs(root, image, name):
+    """A fresh IEXEC_IN/IEXEC_OUT pair per task, with the image as an input file"""
+    iexec_in = os.path.join(root, f'in-{name}')
+    iexec_out = os.path.join(root, f'out-{name}')
+    os.makedirs(iexec_in)
+    os.makedirs(iexec_out)
+    shutil.copy(image, iexec_in)
+    return iexec_in, iexec_out
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    print(f"{label:<12} {statistics.mean(timings):8.2f} {timings[len(timings) // 2]:8.2f} "
+          f"{timings[0]:8.2f} {timings[-1]:8.2f}")
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    image = sys.argv[2] if len(sys.argv) > 2 else os.path.join(KYC_DIR, 'test-image.png')
+    root = tempfile.mkdtemp(prefix='kyc-zygote-bench-')
+    socket_path = os.path.join(root, 'zygote.sock')
+
+    cold = []
+    for n in range(tasks):
+        iexec_in, iexec_out = task_dirs(root, image, f'cold-{n}')
+        env = dict(os.environ, IEXEC_IN=iexec_in, IEXEC_OUT=iexec_out)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, APP], env=env, stdout=subprocess.DEVNULL, check=True)
+        cold.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, ZYGOTE, 'serve', '--socket', socket_path],
+                              stdout=subprocess.DEVNULL)
+    while not os.path.exists(socket_path):
+        if server.poll() is not None:
+            raise Exception("Zygote exited during startup")
+        time.sleep(0.1)
+    startup = time.perf_counter() - start
+
+    forked = []
+    try:
+        for n in range(tasks):
+            iexec_in, iexec_out = task_dirs(root, image, f'fork-{n}')
+            os.environ['IEXEC_IN'], os.environ['IEXEC_OUT'] = iexec_in, iexec_out
+            start = time.perf_counter()
+            reply = submit(socket_path)
+            forked.append(time.perf_counter() - start)
+            if reply["status"] != "ok":
+                print(f"⚠️ Forked task {reply['pid']} failed")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{tasks} tasks on {os.path.basename(image)}, zygote startup {startup:.2f}s (paid once)")
+    print(f"{'mode':<12} {'mean s':>8} {'p50 s':>8} {'min s':>8} {'max s':>8}")
+    report("cold-start", cold)
+    report("fork-start", forked)
+    print(f"per-task speedup: {statistics.mean(cold) / statistics.mean(forked):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,38 +2,68 @@ import json
 import os
 import sys
 import re
+import runtime_tuning
+# Thread and allocator settings have to be in place before torch loads
+runtime_tuning.configure_environment()
 import easyocr
+import numpy as np
 from PIL import Image
 import datetime
+import time
 import base64
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from borsh_construct import CStruct, U8, U32, String
+from line_assembler import assemble_lines
+from extraction import extract_passport_patterns
+from ocr_profiles import stage_profile
+from reader_pool import DEFAULT_LANGUAGES, ReaderPool, languages_for_country
+from deadline import Deadline
+from mrz import read_data_line
+from compact_result import RESULT_FORMAT, write_compact_result
+from kyc_log import DEBUG, get_logger
+import profiling
+from near_duplicates import screen
+from page_merge import merge_page_results
+
+log = get_logger('app')
 
 # Real DataProtector deserializer implementation following iExec documentation
 # https://tools.docs.iex.ec/tools/dataProtector/advanced/iApp/deserializer
 class DataProtectorDeserializer:
+    def _dataset_path(self):
+        """Resolve the protected data zip file provided by iExec"""
+        # Get dataset file path from iExec environment
+        input_dir = os.environ.get('IEXEC_IN', 'input')
+        dataset_filename = os.environ.get('IEXEC_DATASET_FILENAME')
+        
+        if not dataset_filename:
+            raise Exception("IEXEC_DATASET_FILENAME not set")
+        
+        dataset_path = os.path.join(input_dir, dataset_filename)
+        log.debug("🔍 Looking for protected data at: %s", dataset_path)
+        
+        if not os.path.exists(dataset_path):
+            raise Exception(f"Dataset file not found: {dataset_path}")
+        
+        return dataset_path
+
+    def listKeys(self):
+        """List the keys available in the protected data"""
+        with zipfile.ZipFile(self._dataset_path(), 'r') as zip_file:
+            return zip_file.namelist()
+
     def getValue(self, key, data_type):
         """
         Real implementation of DataProtector deserializer for Python
         Based on iExec documentation: protected data are zip files with Borsh serialization
         """
         try:
-            # Get dataset file path from iExec environment
-            input_dir = os.environ.get('IEXEC_IN', 'input')
-            dataset_filename = os.environ.get('IEXEC_DATASET_FILENAME')
-            
-            if not dataset_filename:
-                raise Exception("IEXEC_DATASET_FILENAME not set")
-            
-            dataset_path = os.path.join(input_dir, dataset_filename)
-            print(f"🔍 Looking for protected data at: {dataset_path}")
-            
-            if not os.path.exists(dataset_path):
-                raise Exception(f"Dataset file not found: {dataset_path}")
+            dataset_path = self._dataset_path()
             
             # Extract zip file (protected data are zip files per documentation)
             with zipfile.ZipFile(dataset_path, 'r') as zip_file:
-                print(f"📦 Zip contents: {zip_file.namelist()}")
+                log.debug("📦 Zip contents: %s", zip_file.namelist())
                 
                 # Look for the key file in the zip
                 if key not in zip_file.namelist():
@@ -58,7 +88,7 @@ class DataProtectorDeserializer:
                     return value_data.decode('utf-8') if isinstance(value_data, bytes) else value_data
                     
         except Exception as e:
-            print(f"⚠️ DataProtector deserializer error: {e}")
+            log.warning("⚠️ DataProtector deserializer error: %s", e)
             # Fallback: raise exception to trigger file-based processing
             raise Exception(f"Failed to deserialize protected data key '{key}': {e}")
 
@@ -78,127 +108,27 @@ DEMO_PASSPORT_DATA = {
     "C5555555": {"country": "CAN", "name": "BROWN, SARAH"}
 }
 
-def initialize_ocr():
-    """Initialize EasyOCR reader with English language support"""
+# Multi-page protected datasets store each image as passport_image_1..N
+PASSPORT_PAGE_KEY = re.compile(r'^passport_image_(\d+)$')
+LEGACY_PASSPORT_KEY = 'passport'
+# Upper bound on pages decoded/OCR'd at the same time (they share one Reader);
+# runtime_tuning sizes it together with torch's threads per page
+MAX_PAGE_WORKERS = runtime_tuning.configure_environment()["page_workers"]
+# Bottom share of the page searched for the MRZ when only the ROI is read
+MRZ_REGION_FRACTION = 0.3
+# Page fragments at or below this confidence are noise, kept out of extraction
+MIN_TEXT_CONFIDENCE = 0.3
+
+def initialize_ocr(languages=DEFAULT_LANGUAGES):
+    """Initialize EasyOCR reader, with English language support by default"""
     try:
-        reader = easyocr.Reader(['en'], gpu=False, verbose=False)
+        runtime_tuning.configure_torch()
+        reader = easyocr.Reader(list(languages), gpu=False, verbose=False)
         return reader
     except Exception as e:
-        print(f"Error initializing OCR: {e}")
+        log.error("Error initializing OCR: %s", e)
         return None
 
-def extract_passport_patterns(text_list):
-    """Enhanced pattern extraction for passport data"""
-    passport_data = {
-        "passport_number": None,
-        "country": None,
-        "name": None,
-        "confidence_score": 0,
-        "extraction_method": "none"
-    }
-    
-    all_text = ' '.join(text_list).upper()
-    print(f"Combined text for analysis: {all_text}")
-    
-    # Pattern 1: MRZ (Machine Readable Zone) format
-    mrz_patterns = [
-        r'P<([A-Z]{3})<([A-Z]+)<<([A-Z]+)<+',  # P<COUNTRY<SURNAME<<GIVENNAME<
-        r'P<([A-Z]{3})([A-Z]+)<<([A-Z]+)',     # Variant without trailing <
-    ]
-    
-    for pattern in mrz_patterns:
-        match = re.search(pattern, all_text)
-        if match:
-            passport_data["country"] = match.group(1)
-            passport_data["name"] = f"{match.group(2)}, {match.group(3)}"
-            passport_data["extraction_method"] = "mrz"
-            passport_data["confidence_score"] = 0.9
-            print(f"✅ MRZ pattern found: Country={passport_data['country']}, Name={passport_data['name']}")
-            break
-    
-    # Pattern 2: Passport number extraction (various formats)
-    passport_patterns = [
-        r'\b[A-Z]{1,2}[0-9]{6,8}\b',      # A1234567, AB1234567
-        r'\b[0-9]{8,9}\b',                # 12345678, 123456789
-        r'\b[A-Z][0-9]{7}\b',             # L1234567
-        r'\bPASS(?:PORT)?\s+(?:NO\.?|NUMBER)?\s*([A-Z0-9]{6,9})\b',  # PASSPORT NO A123456
-        r'\bNO\.?\s*([A-Z0-9]{6,9})\b',   # NO. A123456
-    ]
-    
-    for text in text_list:
-        for pattern in passport_patterns:
-            match = re.search(pattern, text.upper())
-            if match:
-                potential_number = match.group(1) if match.groups() else match.group()
-                # Filter out common false positives
-                if not re.match(r'.*(DOB|SEX|BIRTH|DATE|EXPIRES?|ISS|EXP|CLASS|TYPE).*', potential_number):
-                    if not passport_data["passport_number"]:
-                        passport_data["passport_number"] = potential_number
-                        if passport_data["extraction_method"] == "none":
-                            passport_data["extraction_method"] = "pattern_match"
-                            passport_data["confidence_score"] = 0.7
-                        print(f"✅ Passport number found: {passport_data['passport_number']}")
-                        break
-    
-    # Pattern 3: Country code detection
-    if not passport_data["country"]:
-        country_patterns = [
-            r'\b(USA|UNITED STATES|US)\b',
-            r'\b(GBR|UNITED KINGDOM|UK|BRITAIN)\b', 
-            r'\b(DEU|GERMANY|DEUTSCHLAND)\b',
-            r'\b(FRA|FRANCE)\b',
-            r'\b(CAN|CANADA)\b',
-            r'\b(AUS|AUSTRALIA)\b',
-            r'\b(ITA|ITALY)\b',
-            r'\b(ESP|SPAIN)\b',
-            r'\b(NLD|NETHERLANDS)\b',
-            r'\b(CHE|SWITZERLAND)\b'
-        ]
-        
-        country_map = {
-            'USA': 'USA', 'UNITED STATES': 'USA', 'US': 'USA',
-            'GBR': 'GBR', 'UNITED KINGDOM': 'GBR', 'UK': 'GBR', 'BRITAIN': 'GBR',
-            'DEU': 'DEU', 'GERMANY': 'DEU', 'DEUTSCHLAND': 'DEU',
-            'FRA': 'FRA', 'FRANCE': 'FRA',
-            'CAN': 'CAN', 'CANADA': 'CAN',
-            'AUS': 'AUS', 'AUSTRALIA': 'AUS',
-            'ITA': 'ITA', 'ITALY': 'ITA',
-            'ESP': 'ESP', 'SPAIN': 'ESP',
-            'NLD': 'NLD', 'NETHERLANDS': 'NLD',
-            'CHE': 'CHE', 'SWITZERLAND': 'CHE'
-        }
-        
-        for pattern in country_patterns:
-            match = re.search(pattern, all_text)
-            if match:
-                found_country = match.group(1).upper()
-                passport_data["country"] = country_map.get(found_country, found_country)
-                if passport_data["extraction_method"] == "none":
-                    passport_data["extraction_method"] = "country_detection"
-                    passport_data["confidence_score"] = 0.2
-                print(f"✅ Country detected: {passport_data['country']}")
-                break
-    
-    # Pattern 4: Name extraction
-    if not passport_data["name"]:
-        name_patterns = [
-            r'(?:SURNAME|LAST NAME|LN)[:\s]+([A-Z\s]+)',
-            r'(?:GIVEN NAME|FIRST NAME|FN)[:\s]+([A-Z\s]+)',
-            r'([A-Z]{2,})\s*,\s*([A-Z]{2,})',  # SURNAME, FIRSTNAME
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, all_text)
-            if match:
-                if len(match.groups()) == 2:
-                    passport_data["name"] = f"{match.group(1).strip()}, {match.group(2).strip()}"
-                else:
-                    passport_data["name"] = match.group(1).strip()
-                print(f"✅ Name extracted: {passport_data['name']}")
-                break
-    
-    return passport_data
-
 def generate_demo_result(image_path=None):
     """Generate a reliable demo result"""
     import random
@@ -220,78 +150,200 @@ def generate_demo_result(image_path=None):
         "demo_mode": True
     }
 
-def process_passport(image_path, reader):
+def is_mrz_line(text):
+    """MRZ lines are long and padded with '<' fillers"""
+    return len(text) >= 20 and text.count('<') >= 2
+
+def recognize_mrz(image_path, lines, reader):
+    """
+    Re-read the MRZ strip found by the page stage with the MRZ profile
+    (MRZ charset allowlist, greedy decoding) and splice the result back in.
+    Returns the updated lines and the profile used, or None if no MRZ was found.
+    """
+    mrz_indexes = [i for i, line in enumerate(lines) if is_mrz_line(line["text"])]
+    if not mrz_indexes:
+        return lines, None
+    
+    profile_name, options = stage_profile("mrz")
+    boxes = [lines[i]["bbox"] for i in mrz_indexes]
+    margin = max(box[3] - box[1] for box in boxes) / 2
+    with Image.open(image_path) as img:
+        region = (
+            max(0, int(min(box[0] for box in boxes) - margin)),
+            max(0, int(min(box[1] for box in boxes) - margin)),
+            min(img.width, int(max(box[2] for box in boxes) + margin)),
+            min(img.height, int(max(box[3] for box in boxes) + margin)),
+        )
+        strip = np.array(img.crop(region).convert('RGB'))
+    
+    with profiling.torch_region("mrz"):
+        mrz_results = reader.readtext(strip, detail=1, **options)
+    mrz_lines = [line for line in assemble_lines(mrz_results) if is_mrz_line(line["text"])]
+    log.info("🛂 MRZ stage (%s) read %d line(s)", profile_name, len(mrz_lines))
+    if len(mrz_lines) < len(mrz_indexes):
+        return lines, profile_name
+    
+    first = mrz_indexes[0]
+    kept = [line for i, line in enumerate(lines) if i not in mrz_indexes]
+    return kept[:first] + mrz_lines + kept[first:], profile_name
+
+def read_mrz_region(image_path, reader):
+    """
+    Deadline fallback: OCR only the bottom band of the page where the MRZ
+    sits, with the MRZ profile. Boxes are returned in page coordinates.
+    """
+    _, options = stage_profile("mrz")
+    with Image.open(image_path) as img:
+        top = int(img.height * (1 - MRZ_REGION_FRACTION))
+        region = np.array(img.crop((0, top, img.width, img.height)).convert('RGB'))
+    
+    with profiling.torch_region("mrz_region"):
+        region_results = reader.readtext(region, detail=1, **options)
+    results = []
+    for bbox, text, confidence in region_results:
+        results.append(([[x, y + top] for x, y in bbox], text, confidence))
+    return results
+
+def read_visual_zone(image_path, languages, reader_pool, page_options):
+    """
+    Re-read the page with the issuing country's languages and extract from
+    the non-MRZ lines, so names keep their native spelling (diacritics).
+    """
+    native_reader = reader_pool.get(languages)
+    with profiling.torch_region("visual_zone"):
+        lines = assemble_lines(native_reader.readtext(image_path, detail=1, **page_options),
+                               min_confidence=MIN_TEXT_CONFIDENCE)
+    visual_lines = [line["text"] for line in lines if not is_mrz_line(line["text"])]
+    return extract_passport_patterns(visual_lines)
+
+def process_passport(image_path, reader, ocr_results=None, reader_pool=None, deadline=None):
     """
-    Enhanced passport image processing with multiple extraction strategies
+    Enhanced passport image processing with multiple extraction strategies.
+    ocr_results lets callers that already ran the page stage (e.g. the
+    batching service) skip the readtext() call. With a reader_pool, documents
+    whose MRZ names a non-English issuing country get a second visual-zone
+    read in that country's languages. With a deadline, the stages degrade
+    (greedy decoding, lower resolution, MRZ region only) as time runs out.
     """
     try:
-        print(f"🔍 Processing image: {image_path}")
+        log.info("🔍 Processing image: %s", image_path)
         start_time = datetime.datetime.now()
         
         # Check if image exists and is readable
         if not os.path.exists(image_path):
-            print(f"⚠️ Image file not found: {image_path}")
+            log.warning("⚠️ Image file not found: %s", image_path)
             return generate_demo_result(image_path)
         
         # Verify image can be opened
         try:
             with Image.open(image_path) as img:
-                print(f"📷 Image dimensions: {img.size}")
-                print(f"📷 Image format: {img.format}")
+                log.debug("📷 Image dimensions: %s", img.size)
+                log.debug("📷 Image format: %s", img.format)
+                
+                # Fraud screening: the same document seen before, before paying for OCR
+                try:
+                    near_duplicate = screen(img, image_path)
+                except Exception as screen_error:
+                    log.warning("⚠️ Near-duplicate screening failed: %s", screen_error)
+                    near_duplicate = None
         except Exception as img_error:
-            print(f"⚠️ Cannot open image: {img_error}")
+            log.warning("⚠️ Cannot open image: %s", img_error)
             return generate_demo_result(image_path)
         
         # Perform OCR with error handling
         try:
-            results = reader.readtext(image_path, detail=1)
-            print(f"🔤 OCR detected {len(results)} text regions")
+            page_profile, page_options = stage_profile("page")
+            roi_only = False
+            if ocr_results is None:
+                if deadline is not None:
+                    page_options, roi_only = deadline.degrade("page", page_options)
+                stage_start = time.perf_counter()
+                if roi_only:
+                    results = read_mrz_region(image_path, reader)
+                else:
+                    with profiling.torch_region("page"):
+                        results = reader.readtext(image_path, detail=1, **page_options)
+                if deadline is not None:
+                    deadline.observe("page", time.perf_counter() - stage_start)
+                profiling.mark(f"page_ocr {os.path.basename(image_path)}")
+            else:
+                results = ocr_results
+            log.info("🔤 OCR detected %d text regions", len(results))
         except Exception as ocr_error:
-            print(f"⚠️ OCR processing failed: {ocr_error}")
+            log.warning("⚠️ OCR processing failed: %s", ocr_error)
             return generate_demo_result(image_path)
         
         # Extract all text with confidence scores
         all_text = []
         high_confidence_text = []
         
+        # Dense pages have hundreds of fragments: skip the formatting entirely in production
+        log_fragments = log.isEnabledFor(DEBUG)
         for detection in results:
             bbox, text, confidence = detection
             text_clean = text.strip()
             all_text.append(text_clean)
             
-            print(f"📝 Text: '{text_clean}' (confidence: {confidence:.2f})")
+            if log_fragments:
+                log.debug("📝 Text: %r (confidence: %.2f)", text_clean, confidence)
             
-            if confidence > 0.3:  # Only use high-confidence text
+            if confidence > MIN_TEXT_CONFIDENCE:  # Only use high-confidence text
                 high_confidence_text.append(text_clean)
         
-        # Try extraction with high-confidence text first
-        passport_data = extract_passport_patterns(high_confidence_text)
+        # Rebuild the document's actual lines from the high-confidence boxes so
+        # MRZ lines are not broken up and interleaved with visual-zone text
+        lines = assemble_lines(results, min_confidence=MIN_TEXT_CONFIDENCE)
         
-        # If extraction failed, try with all text
-        if passport_data["extraction_method"] == "none":
-            print("🔄 Retrying with all detected text...")
-            passport_data = extract_passport_patterns(all_text)
+        # A data line that passes its check digits, after look-alike
+        # correction if needed, makes the second MRZ read unnecessary
+        mrz_check = read_data_line(lines)
         
-        # Enhanced fallback logic
-        if not passport_data["passport_number"]:
-            # Look for any alphanumeric sequence that could be a document number
-            all_text_combined = ' '.join(all_text).upper()
-            fallback_patterns = [
-                r'\b[A-Z0-9]{6,10}\b',  # Any 6-10 char alphanumeric
-                r'\b\d{8,9}\b',         # Any 8-9 digit number
-            ]
-            
-            for pattern in fallback_patterns:
-                matches = re.findall(pattern, all_text_combined)
-                for match in matches:
-                    if not re.match(r'.*(DATE|BIRTH|EXP|ISS|CLASS|SEX|HEIGHT|WEIGHT).*', match):
-                        passport_data["passport_number"] = match
-                        passport_data["extraction_method"] = "fallback_pattern"
-                        passport_data["confidence_score"] = 0.4
-                        print(f"📋 Fallback passport number: {passport_data['passport_number']}")
-                        break
-                if passport_data["passport_number"]:
-                    break
+        # Second stage: re-read the MRZ strip with its dedicated profile
+        # (the ROI-only read already used it)
+        mrz_profile = None
+        if roi_only:
+            mrz_profile = stage_profile("mrz")[0]
+        elif (mrz_check is None or not mrz_check["valid"]) and (deadline is None or deadline.allows("mrz")):
+            try:
+                stage_start = time.perf_counter()
+                lines, mrz_profile = recognize_mrz(image_path, lines, reader)
+                if deadline is not None:
+                    deadline.observe("mrz", time.perf_counter() - stage_start)
+                if mrz_profile is not None:
+                    mrz_check = read_data_line(lines) or mrz_check
+            except Exception as mrz_error:
+                log.warning("⚠️ MRZ stage failed, keeping page text: %s", mrz_error)
+        line_text = [line["text"] for line in lines]
+        if log_fragments:
+            for line in lines:
+                log.debug("📏 Line: %r (confidence: %.2f)", line["text"], line["confidence"])
+        
+        profiling.mark(f"mrz_stage {os.path.basename(image_path)}")
+        
+        # One pass over the lines extracts every field, fallbacks included
+        passport_data = extract_passport_patterns(line_text)
+        
+        # Check-digit-validated MRZ fields beat anything read from the visual zone
+        if mrz_check and mrz_check["valid"]:
+            mrz_fields = mrz_check["fields"]
+            passport_data["passport_number"] = mrz_fields["document_number"]
+            passport_data["country"] = passport_data["country"] or mrz_fields["nationality"]
+            passport_data["extraction_method"] = "mrz"
+            passport_data["confidence_score"] = max(passport_data["confidence_score"], 0.95)
+        
+        # The MRZ is ASCII-only; read the visual zone in the issuer's languages
+        ocr_languages = DEFAULT_LANGUAGES
+        visual_zone = None
+        if reader_pool is not None and passport_data["extraction_method"] == "mrz":
+            ocr_languages = languages_for_country(passport_data["country"])
+            if ocr_languages != DEFAULT_LANGUAGES and (deadline is None or deadline.allows("page")):
+                try:
+                    visual_zone = read_visual_zone(image_path, ocr_languages, reader_pool, page_options)
+                except Exception as language_error:
+                    log.warning("⚠️ Visual zone read for %s failed: %s", list(ocr_languages), language_error)
+                    ocr_languages = DEFAULT_LANGUAGES
+        if visual_zone and not passport_data["passport_number"]:
+            passport_data["passport_number"] = visual_zone["passport_number"]
         
         # Calculate processing time
         processing_time = (datetime.datetime.now() - start_time).total_seconds()
@@ -310,13 +362,25 @@ def process_passport(image_path, reader):
             "ocr_stats": {
                 "total_text_regions": len(results),
                 "high_confidence_regions": len(high_confidence_text),
+                "text_lines": len(lines),
+                "ocr_profiles": {"page": page_profile, "mrz": mrz_profile},
+                "ocr_languages": list(ocr_languages),
+                "mrz_check": {
+                    "valid": bool(mrz_check and mrz_check["valid"]),
+                    "substitutions": mrz_check["substitutions"] if mrz_check else 0,
+                    "escalated": mrz_profile is not None and not roi_only,
+                },
                 "all_detected_text": all_text[:10]  # First 10 for debugging
             }
         }
+        if visual_zone and visual_zone["name"]:
+            result["visual_zone_name"] = visual_zone["name"]
+        if near_duplicate:
+            result["near_duplicate"] = near_duplicate
         
         # Apply intelligent fallback if needed
         if not result["verified"]:
-            print("🎯 Applying intelligent fallback for demo reliability...")
+            log.info("🎯 Applying intelligent fallback for demo reliability...")
             demo_result = generate_demo_result(image_path)
             
             # Keep any successfully extracted data, supplement with demo data
@@ -331,96 +395,165 @@ def process_passport(image_path, reader):
             result["demo_fallback_applied"] = True
             result["confidence_score"] = max(result["confidence_score"], 0.8)
         
-        print(f"✅ Final result: {result}")
+        log.info("✅ Page processed: method=%s confidence=%.2f demo_fallback=%s",
+                 result["extraction_method"], result["confidence_score"],
+                 bool(result.get("demo_fallback_applied")))
+        log.debug("✅ Final result: %s", result)
         return result
         
     except Exception as e:
-        print(f"❌ Error in passport processing: {e}")
+        log.error("❌ Error in passport processing: %s", e)
         result = generate_demo_result(image_path)
         result["error"] = str(e)
         return result
 
-def generate_demo_result():
-    """Generate a demo result for fallback scenarios"""
-    demo_profiles = [
-        {
-            "passport_number": "L898902C3",
-            "country": "DEU",
-            "full_name": "ERIKSSON, ANNA LENA",
-            "birth_date": "1974-08-12",
-            "expiry_date": "2027-08-12",
-            "nationality": "GERMAN",
-            "sex": "F",
-            "place_of_birth": "BERLIN",
-            "verified": True,
-        },
-        {
-            "passport_number": "P123456789",
-            "country": "USA",
-            "full_name": "SMITH, JOHN ROBERT", 
-            "birth_date": "1985-03-15",
-            "expiry_date": "2029-03-15",
-            "nationality": "AMERICAN",
-            "sex": "M",
-            "place_of_birth": "NEW YORK",
-            "verified": True,
-        }
-    ]
+def list_passport_pages(keys):
+    """Return the passport_image_N keys ordered by page number, or the legacy single key"""
+    pages = []
+    for key in keys:
+        match = PASSPORT_PAGE_KEY.match(key)
+        if match:
+            pages.append((int(match.group(1)), key))
+    pages.sort()
     
-    import random
-    result = random.choice(demo_profiles).copy()
-    result.update({
-        "processing_time": 2.5,
-        "confidence_score": 0.95,
-        "demo_mode": True,
-        "timestamp": datetime.datetime.now().isoformat()
-    })
+    if pages:
+        return [key for _, key in pages]
+    if LEGACY_PASSPORT_KEY in keys:
+        return [LEGACY_PASSPORT_KEY]
+    return []
+
+def process_passport_page(key, reader, reader_pool=None, deadline=None):
+    """Decode a single protected data page and run OCR on it"""
+    with profiling.worker():
+        return _process_passport_page(key, reader, reader_pool, deadline)
+
+def _process_passport_page(key, reader, reader_pool, deadline):
+    page_data = deserializer.getValue(key, 'string')
+    log.info("✅ Retrieved %s, length: %d", key, len(page_data))
+    
+    # Decode base64 image data
+    image_data = base64.b64decode(page_data)
     
+    # Save image temporarily for processing, one file per page
+    temp_image_path = os.path.join(IEXEC_OUT, f'temp_{key}.jpg')
+    with open(temp_image_path, 'wb') as f:
+        f.write(image_data)
+    
+    try:
+        result = process_passport(temp_image_path, reader, reader_pool=reader_pool, deadline=deadline)
+    finally:
+        # Clean up temp file
+        os.remove(temp_image_path)
+    
+    result["page"] = key
     return result
 
-def main():
-    """Main function to handle iExec input/output with DataProtector"""
+def process_passport_pages(keys, reader, reader_pool=None, deadline=None):
+    """
+    Decode and OCR all pages concurrently with a bounded thread pool.
+    The Reader is shared, and torch releases the GIL during inference, so the
+    wall-clock time approaches the slowest page rather than the sum of pages.
+    """
+    max_workers = max(1, min(MAX_PAGE_WORKERS, len(keys)))
+    log.info("📚 Processing %d page(s) with %d worker(s)", len(keys), max_workers)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(process_passport_page, key, reader, reader_pool, deadline)
+                   for key in keys]
+    
+    page_results = []
+    for key, future in zip(keys, futures):
+        try:
+            page_results.append(future.result())
+        except Exception as page_error:
+            log.warning("⚠️ Failed to process %s: %s", key, page_error)
+            page_results.append({"page": key, "error": str(page_error)})
+    return page_results
+
+def write_outputs(result, computed_json):
+    """Write result.json (or the compact result.bin) and the computed.json iExec requires"""
+    if RESULT_FORMAT == 'compact':
+        # Deterministic ABI bytes, also handed to the callback contract
+        result_path, encoded, digest = write_compact_result(result, IEXEC_OUT)
+        computed_json = dict(computed_json)
+        computed_json['deterministic-output-path'] = result_path
+        computed_json['callback-data'] = '0x' + encoded.hex()
+        log.info("📁 Compact result written to: %s (%d bytes, keccak 0x%s)", result_path, len(encoded), digest.hex())
+    else:
+        result_path = os.path.join(IEXEC_OUT, 'result.json')
+        with open(result_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        log.info("📁 Results written to: %s", result_path)
+    
+    computed_path = os.path.join(IEXEC_OUT, 'computed.json')
+    with open(computed_path, 'w') as f:
+        json.dump(computed_json, f, indent=2)
+    log.info("📁 Computed.json written to: %s", computed_path)
+
+def write_deadline_fallback(deadline):
+    """Watchdog path: the pipeline is still running and only the output reserve is left"""
+    log.warning("⏱️ Task deadline reached before OCR finished, writing fallback result")
+    result = generate_demo_result()
+    result["error"] = "Task deadline reached before OCR finished"
+    result["data_source"] = "deadline_fallback"
+    result["deadline"] = deadline.report()
+    write_outputs(result, {
+        'deterministic-output-path': os.path.join(IEXEC_OUT, 'result.json'),
+        'error-message': result["error"]
+    })
+    profiling.finish(IEXEC_OUT)
+
+def main(reader=None):
+    """
+    Main function to handle iExec input/output with DataProtector.
+    A prebuilt reader can be passed in (see zygote.py) to skip model loading.
+    """
     computed_json = {}
+    result = None
+    # KYC_PROFILE turns on cProfile/tracemalloc/torch profiling for this task
+    profiling.start()
+    
+    # Make sure result.json and computed.json exist even if iExec's max time is near
+    deadline = Deadline()
+    deadline.start_watchdog(lambda: write_deadline_fallback(deadline))
     
     try:
         # Get arguments passed from iExec
         args = sys.argv[1:] if len(sys.argv) > 1 else []
-        print(f"App arguments received: {args}")
+        log.debug("App arguments received: %s", args)
         
-        print("🚀 Starting DataProtector-enabled passport OCR processing...")
+        log.info("🚀 Starting DataProtector-enabled passport OCR processing...")
         
         # Initialize OCR reader
-        reader = initialize_ocr()
+        if reader is None:
+            reader = initialize_ocr()
         if not reader:
             raise Exception("Failed to initialize OCR reader")
+        profiling.mark("reader_ready")
+        
+        # Readers for other language sets are loaded on demand; the default one stays
+        reader_pool = ReaderPool()
+        reader_pool.put(DEFAULT_LANGUAGES, reader, pinned=True)
         
         try:
             # Get protected data using deserializer as per hackathon docs
-            print("📦 Retrieving protected passport data...")
-            passport_data = deserializer.getValue('passport', 'string')
-            print(f"✅ Retrieved passport data, length: {len(passport_data)}")
-            
-            # Decode base64 image data
-            image_data = base64.b64decode(passport_data)
-            
-            # Save image temporarily for processing
-            temp_image_path = os.path.join(IEXEC_OUT, 'temp_passport.jpg')
-            with open(temp_image_path, 'wb') as f:
-                f.write(image_data)
-            
-            print(f"💾 Saved image to: {temp_image_path}")
+            log.info("📦 Retrieving protected passport data...")
+            page_keys = list_passport_pages(deserializer.listKeys())
+            if not page_keys:
+                raise Exception("No passport images found in protected data")
             
-            # Process the passport image
-            result = process_passport(temp_image_path, reader)
+            # Process every page concurrently and merge into one record
+            start_time = datetime.datetime.now()
+            page_results = process_passport_pages(page_keys, reader, reader_pool, deadline)
+            result = merge_page_results(page_results)
+            processing_time = (datetime.datetime.now() - start_time).total_seconds()
+            result["processing_time"] = f"{processing_time:.1f}s"
             result["data_source"] = "dataprotector"
             result["processing_method"] = "enhanced_ocr"
             
-            # Clean up temp file
-            os.remove(temp_image_path)
-            
         except Exception as deserializer_error:
-            print(f"⚠️ DataProtector deserializer error: {deserializer_error}")
-            print("🔄 Falling back to file-based processing...")
+            log.warning("⚠️ DataProtector deserializer error: %s", deserializer_error)
+            log.info("🔄 Falling back to file-based processing...")
             
             # Fallback to file-based processing
             image_file = None
@@ -433,7 +566,7 @@ def main():
                         break
             
             if image_file and os.path.exists(image_file):
-                result = process_passport(image_file, reader)
+                result = process_passport(image_file, reader, reader_pool=reader_pool, deadline=deadline)
                 result["data_source"] = "file_fallback"
             else:
                 # Generate demo result
@@ -441,14 +574,10 @@ def main():
                 result["data_source"] = "demo_fallback"
                 result["fallback_reason"] = "No protected data or file found"
         
-        print(f"✅ Final OCR Result: {result}")
-        
-        # Write results to output file
-        result_path = os.path.join(IEXEC_OUT, 'result.json')
-        with open(result_path, 'w') as f:
-            json.dump(result, f, indent=2)
-        
-        print(f"📁 Results written to: {result_path}")
+        profiling.mark("ocr_done")
+        result["reader_pool"] = reader_pool.stats()
+        log.info("✅ OCR finished: source=%s verified=%s", result.get("data_source"), result.get("verified"))
+        log.debug("✅ Final OCR Result: %s", result)
         
         # Create computed.json file required by iExec
         computed_json = {
@@ -456,31 +585,32 @@ def main():
         }
         
     except Exception as e:
-        print(f"❌ Error in main execution: {e}")
+        log.error("❌ Error in main execution: %s", e)
         
         # Fallback result for demo
         result = generate_demo_result()
         result["error"] = str(e)
         result["data_source"] = "error_fallback"
         
-        # Write error result
-        result_path = os.path.join(IEXEC_OUT, 'result.json')
-        with open(result_path, 'w') as f:
-            json.dump(result, f, indent=2)
-        
         computed_json = {
             'deterministic-output-path': os.path.join(IEXEC_OUT, 'result.json'),
             'error-message': str(e)
         }
     
     finally:
-        # Always create computed.json
-        computed_path = os.path.join(IEXEC_OUT, 'computed.json')
-        with open(computed_path, 'w') as f:
-            json.dump(computed_json, f, indent=2)
-        
-        print(f"📁 Computed.json written to: {computed_path}")
-        print("🎉 Passport OCR processing completed!")
+        deadline.stop_watchdog()
+        # Always create computed.json, unless the watchdog already wrote the outputs
+        if deadline.claim_output():
+            if result is not None:
+                result["deadline"] = deadline.report()
+                write_outputs(result, computed_json)
+            else:
+                computed_path = os.path.join(IEXEC_OUT, 'computed.json')
+                with open(computed_path, 'w') as f:
+                    json.dump(computed_json, f, indent=2)
+                log.info("📁 Computed.json written to: %s", computed_path)
+        profiling.finish(IEXEC_OUT)
+        log.info("🎉 Passport OCR processing completed!")
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,9 @@ import re
 import base64
 import time
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+from page_merge import merge_page_results
 
 # Add iExec DataProtector for fetching protected data
 try:
@@ -22,6 +25,13 @@ HARDCODED_PROTECTED_DATA = "0x47Ca0D66c06AE3D29e0Fcda0f49c6354FA350e5e"
 IEXEC_OUT = os.getenv('IEXEC_OUT', 'output')
 IEXEC_IN = os.getenv('IEXEC_IN', 'input')
 
+PASSPORT_PAGE_KEY = re.compile(r'^passport_image_(\d+)$')
+MAX_PAGE_WORKERS = int(os.getenv('KYC_MAX_PAGE_WORKERS', '4'))
+
+# Used when no page yields a field
+FALLBACK_PASSPORT_NUMBER = "L898902C3"
+FALLBACK_COUNTRY = "DEU"
+
 def fetch_protected_data_mock():
     """
     Mock function to simulate fetching protected data.
@@ -66,11 +76,12 @@ def mock_ocr_processing(image_data):
     
     # Return realistic test data based on your actual image
     return {
-        "passport_number": "L898902C3",
-        "country": "DEU", 
+        "passport_number": FALLBACK_PASSPORT_NUMBER,
+        "country": FALLBACK_COUNTRY,
         "verified": True,
-        "confidence": 0.95,
-        "processing_method": "mock_ocr_for_testing"
+        "confidence_score": 0.95,
+        "processing_method": "mock_ocr_for_testing",
+        "demo_mode": True
     }
 
 def process_passport_with_ocr(image_data, reader):
@@ -111,11 +122,12 @@ def process_passport_with_ocr(image_data, reader):
             if text in ['DEU', 'GER', 'USA', 'GBR', 'FRA'] and confidence > 0.7:
                 country = text
         
+        # Missing fields are left empty for other pages to fill in
         return {
-            "passport_number": passport_number or "L898902C3",  # Fallback
-            "country": country or "DEU",  # Fallback
+            "passport_number": passport_number,
+            "country": country,
             "verified": passport_number is not None,
-            "confidence": 0.85,
+            "confidence_score": 0.85,
             "processing_method": "easyocr"
         }
         
@@ -138,25 +150,37 @@ def main():
         # Initialize OCR
         reader = initialize_ocr()
         
-        # Process the primary passport image
-        if 'passport_image_1' in protected_data:
-            image_data = protected_data['passport_image_1']
-            ocr_result = process_passport_with_ocr(image_data, reader)
+        # Process every passport page (front, back, selfie...) concurrently
+        page_keys = sorted(
+            (key for key in protected_data if PASSPORT_PAGE_KEY.match(key)),
+            key=lambda key: int(PASSPORT_PAGE_KEY.match(key).group(1))
+        )
+        if page_keys:
+            max_workers = max(1, min(MAX_PAGE_WORKERS, len(page_keys)))
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                page_results = list(pool.map(
+                    lambda key: dict(process_passport_with_ocr(protected_data[key], reader), page=key),
+                    page_keys
+                ))
+            
+            # Each field comes from the best page that has it, as in app.py
+            ocr_result = merge_page_results(page_results)
             
             # Create final result
             result = {
                 "wallet": "0x3938d5d8CdA5863d5Bb7907A9cd64010229Bd564",  # Your wallet
-                "passport_number": ocr_result["passport_number"],
-                "country": ocr_result["country"],
+                "passport_number": ocr_result["passport_number"] or FALLBACK_PASSPORT_NUMBER,
+                "country": ocr_result["country"] or FALLBACK_COUNTRY,
                 "verified": ocr_result["verified"],
-                "confidence": ocr_result.get("confidence", 0.0),
+                "confidence": ocr_result.get("confidence_score") or 0.0,
                 "processing_method": ocr_result.get("processing_method", "unknown"),
+                "pages_processed": len(page_keys),
                 "protected_data_address": HARDCODED_PROTECTED_DATA,
                                  "timestamp": int(time.time())
             }
         else:
             result = {
-                "error": "No passport image found in protected data",
+                "error": "No passport images found in protected data",
                 "verified": False,
                 "protected_data_address": HARDCODED_PROTECTED_DATA
             }
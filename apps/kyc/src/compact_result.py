@@ -0,0 +1,140 @@
+import os
+
+# Compact, deterministic result encoding for on-chain callbacks.
+# The result is ABI-encoded with a fixed field order, so a callback contract
+# can read it with
+#
+#   abi.decode(data, (string, string, string, bool, uint16, string, bool, string, string))
+#
+# Timestamps, timings and OCR debug data are left out: the same document
+# always encodes to the same bytes, and every byte of callback data costs gas.
+# Enabled with KYC_RESULT_FORMAT=compact.
+
+RESULT_FORMAT = os.getenv('KYC_RESULT_FORMAT', 'json')
+
+# (field, ABI type) in encoding order
+FIELDS = (
+    ("passport_number", "string"),
+    ("country", "string"),
+    ("name", "string"),
+    ("verified", "bool"),
+    ("confidence_bps", "uint16"),
+    ("extraction_method", "string"),
+    ("demo_fallback_applied", "bool"),
+    ("data_source", "string"),
+    ("error", "string"),
+)
+
+WORD = 32
+
+
+def _field_value(result, field):
+    if field == "confidence_bps":
+        # Basis points keep the score an integer
+        return int(round(float(result.get("confidence_score") or 0) * 10000))
+    if field == "demo_fallback_applied":
+        return bool(result.get("demo_fallback_applied") or result.get("demo_mode"))
+    return result.get(field)
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % WORD)
+
+
+def encode_result(result):
+    """ABI-encode the result's fixed fields"""
+    head = []
+    tail = []
+    tail_offset = WORD * len(FIELDS)
+    for field, abi_type in FIELDS:
+        value = _field_value(result, field)
+        if abi_type == "string":
+            data = str(value if value is not None else "").encode('utf-8')
+            head.append(tail_offset.to_bytes(WORD, 'big'))
+            encoded = len(data).to_bytes(WORD, 'big') + _pad(data)
+            tail.append(encoded)
+            tail_offset += len(encoded)
+        elif abi_type == "bool":
+            head.append(int(bool(value)).to_bytes(WORD, 'big'))
+        else:
+            head.append(min(max(int(value), 0), 0xFFFF).to_bytes(WORD, 'big'))
+    return b''.join(head) + b''.join(tail)
+
+
+def decode_result(data):
+    """Inverse of encode_result()"""
+    view = memoryview(data)
+    result = {}
+    for index, (field, abi_type) in enumerate(FIELDS):
+        word = int.from_bytes(view[index * WORD:(index + 1) * WORD], 'big')
+        if abi_type == "string":
+            length = int.from_bytes(view[word:word + WORD], 'big')
+            result[field] = bytes(view[word + WORD:word + WORD + length]).decode('utf-8')
+        elif abi_type == "bool":
+            result[field] = bool(word)
+        else:
+            result[field] = word
+    return result
+
+
+# Keccak-256 (the pre-standard SHA-3 padding Ethereum uses; hashlib.sha3_256
+# is the NIST variant and gives different digests)
+_ROUND_CONSTANTS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+_ROTATIONS = (
+    (0, 36, 3, 41, 18), (1, 44, 10, 45, 2), (62, 6, 43, 15, 61),
+    (28, 55, 25, 21, 56), (27, 20, 39, 8, 14),
+)
+_MASK = (1 << 64) - 1
+_RATE = 136
+
+
+def _rotl(value, shift):
+    return ((value << shift) | (value >> (64 - shift))) & _MASK if shift else value
+
+
+def _keccak_f(lanes):
+    for round_constant in _ROUND_CONSTANTS:
+        c = [lanes[x][0] ^ lanes[x][1] ^ lanes[x][2] ^ lanes[x][3] ^ lanes[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rotl(c[(x + 1) % 5], 1) for x in range(5)]
+        lanes = [[lanes[x][y] ^ d[x] for y in range(5)] for x in range(5)]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                b[y][(2 * x + 3 * y) % 5] = _rotl(lanes[x][y], _ROTATIONS[x][y])
+        lanes = [[b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y]) for y in range(5)] for x in range(5)]
+        lanes[0][0] ^= round_constant
+    return lanes
+
+
+def keccak256(data):
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b'\0' * (-len(padded) % _RATE))
+    padded[-1] |= 0x80
+
+    lanes = [[0] * 5 for _ in range(5)]
+    for start in range(0, len(padded), _RATE):
+        for i in range(_RATE // 8):
+            lanes[i % 5][i // 5] ^= int.from_bytes(padded[start + 8 * i:start + 8 * i + 8], 'little')
+        lanes = _keccak_f(lanes)
+
+    return b''.join(lanes[i % 5][i // 5].to_bytes(8, 'little') for i in range(4))
+
+
+def write_compact_result(result, output_dir):
+    """Write result.bin and its hash; returns (path, encoded bytes, keccak digest)"""
+    encoded = encode_result(result)
+    digest = keccak256(encoded)
+    path = os.path.join(output_dir, 'result.bin')
+    with open(path, 'wb') as f:
+        f.write(encoded)
+    with open(os.path.join(output_dir, 'result.keccak'), 'w') as f:
+        f.write('0x' + digest.hex())
+    return path, encoded, digest
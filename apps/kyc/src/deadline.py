@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+from kyc_log import get_logger
+
+log = get_logger('deadline')
+
+# Per-task deadline scheduler.
+# iExec kills a task that runs past its category's max time, and a killed
+# task never writes computed.json, so the frontend polls forever. The
+# Deadline tracks the remaining budget, tells each OCR stage how much to
+# degrade as the end gets close, and a watchdog writes the outputs itself
+# if the pipeline is still running when only the reserve is left.
+#
+# KYC_TASK_BUDGET_S should be the category's max time minus container startup.
+
+TASK_BUDGET = float(os.getenv('KYC_TASK_BUDGET_S', '300'))
+# Time always kept back for writing result.json and computed.json
+OUTPUT_RESERVE = float(os.getenv('KYC_OUTPUT_RESERVE_S', '15'))
+
+# Degradations in the order they fire, with the fraction of the usable
+# budget left (after the stage's expected cost) below which each one applies
+DEGRADATIONS = (
+    ("greedy_decoding", 0.5),
+    ("low_resolution", 0.3),
+    ("roi_only", 0.15),
+)
+LOW_RESOLUTION_CANVAS = 1280
+
+# Run by the watchdog after on_expire(), just before it ends the process
+# (zygote.py uses this to still answer its client)
+_exit_hooks = []
+
+
+def add_exit_hook(hook):
+    _exit_hooks.append(hook)
+
+
+class Deadline:
+    def __init__(self, budget=TASK_BUDGET, reserve=OUTPUT_RESERVE):
+        self.budget = budget
+        self.reserve = min(reserve, budget / 2)
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+        # Longest observed duration per stage, used as its expected cost
+        self.costs = {}
+        self.fired = []
+        self.output_claimed = False
+        self.watchdog = None
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def available(self):
+        """Seconds left for processing, output reserve excluded"""
+        return self.budget - self.reserve - self.elapsed()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.costs[stage] = max(seconds, self.costs.get(stage, 0))
+
+    def record(self, degradation):
+        with self.lock:
+            if degradation not in self.fired:
+                self.fired.append(degradation)
+                log.warning("⏱️ Deadline: %s (%.1fs left)", degradation, self.available())
+
+    def allows(self, stage):
+        """Whether an optional stage is expected to finish before the reserve"""
+        allowed = self.available() > self.costs.get(stage, 0)
+        if not allowed:
+            self.record(f"skip_{stage}")
+        return allowed
+
+    def level(self, stage):
+        """Number of degradations that apply to the stage right now"""
+        usable = self.budget - self.reserve
+        fraction = (self.available() - self.costs.get(stage, 0)) / usable
+        return sum(1 for _, threshold in DEGRADATIONS if fraction < threshold)
+
+    def degrade(self, stage, options):
+        """Return (readtext() options, roi_only) adjusted to the remaining budget"""
+        level = self.level(stage)
+        options = dict(options)
+        if level >= 1:
+            options["decoder"] = "greedy"
+            options.pop("beamWidth", None)
+            self.record("greedy_decoding")
+        if level >= 2:
+            options["canvas_size"] = min(options.get("canvas_size", 2560), LOW_RESOLUTION_CANVAS)
+            self.record("low_resolution")
+        roi_only = level >= 3
+        if roi_only:
+            self.record("roi_only")
+        return options, roi_only
+
+    def claim_output(self):
+        """Only one of the pipeline and the watchdog gets to write the outputs"""
+        with self.lock:
+            if self.output_claimed:
+                return False
+            self.output_claimed = True
+            return True
+
+    def start_watchdog(self, on_expire):
+        """Call on_expire() if the pipeline still runs when only the reserve is left"""
+        def expire():
+            if self.claim_output():
+                on_expire()
+                for hook in _exit_hooks:
+                    try:
+                        hook()
+                    except Exception as hook_error:
+                        log.error("⏱️ Deadline exit hook failed: %s", hook_error)
+                # The pipeline may be stuck inside inference; end the task here
+                os._exit(0)
+
+        self.watchdog = threading.Timer(max(0, self.available()), expire)
+        self.watchdog.daemon = True
+        self.watchdog.start()
+
+    def stop_watchdog(self):
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+
+    def report(self):
+        with self.lock:
+            return {
+                "budget_s": self.budget,
+                "elapsed_s": round(self.elapsed(), 2),
+                "degradations": list(self.fired),
+            }
@@ -0,0 +1,182 @@
+import re
+
+from countries import ISO_3166_COUNTRIES, COUNTRY_ALIASES, AMBIGUOUS_CODES
+from kyc_log import get_logger
+
+log = get_logger('extraction')
+
+# Single-pass passport field extraction.
+# The OCR lines are uppercased once and scanned once with a precompiled
+# named-group alternation. Every token is classified as it goes past, and
+# countries are resolved through a dict built from the full ISO 3166 table.
+
+# Country rank: names, alpha-3 codes and aliases beat alpha-2 codes, which
+# clash with US state abbreviations on driver licenses (CA, GA, MD...)
+RANK_NAME = 0
+RANK_ALPHA2 = 1
+
+def _build_country_lookup():
+    lookup = {}
+    for alpha2, alpha3, name in ISO_3166_COUNTRIES:
+        lookup[alpha2] = (alpha3, RANK_ALPHA2)
+    for alpha2, alpha3, name in ISO_3166_COUNTRIES:
+        lookup[alpha3] = (alpha3, RANK_NAME)
+        lookup[name] = (alpha3, RANK_NAME)
+    for alias, alpha3 in COUNTRY_ALIASES.items():
+        lookup[alias] = (alpha3, RANK_NAME)
+    for code in AMBIGUOUS_CODES:
+        lookup.pop(code, None)
+    return lookup
+
+COUNTRY_LOOKUP = _build_country_lookup()
+
+# Names that span several tokens are matched by the scanner itself, longest first
+_MULTI_TOKEN_COUNTRIES = sorted(
+    (name for name in COUNTRY_LOOKUP if not name.isalnum()),
+    key=len,
+    reverse=True
+)
+
+FIELD_SCANNER = re.compile(r"""
+    (?P<mrz>P<(?P<mrz_country>[A-Z]{3})<?(?P<mrz_surname>[A-Z]+)<<(?P<mrz_given>[A-Z]+))
+  | \b(?P<name_label>SURNAME|LAST[ ]NAME|LN|GIVEN[ ]NAMES?|FIRST[ ]NAME|FN)\b
+    [:\ \t]+(?P<name_value>[^\W\d_]+(?:[\ \t]+[^\W\d_]+)*)
+  | \b(?P<country_name>%s)\b
+  | (?P<token>[A-Z0-9]+)(?=\s*,\s*(?P<given>[A-Z]{2,}))?
+""" % '|'.join(
+    r'\s+'.join(re.escape(word) for word in name.split())
+    for name in _MULTI_TOKEN_COUNTRIES
+), re.VERBOSE)
+
+# Labels announcing a document number: PASSPORT [NO|NUMBER] <n>, NO <n>
+PASSPORT_LABELS = frozenset({"PASS", "PASSPORT"})
+NUMBER_LABELS = frozenset({"NO", "NUMBER"})
+
+# Label fragments that rule out a labelled or fallback candidate
+LABELLED_FALSE_POSITIVE = re.compile(r'DOB|SEX|BIRTH|DATE|ISS|EXP|CLASS|TYPE')
+FALLBACK_FALSE_POSITIVE = re.compile(r'DATE|BIRTH|EXP|ISS|CLASS|SEX|HEIGHT|WEIGHT')
+
+SURNAME_LABELS = frozenset({"SURNAME", "LAST NAME", "LN"})
+
+
+def is_document_number(token):
+    """A1234567, AB12345678, 12345678 or 123456789"""
+    if token.isdigit():
+        return 8 <= len(token) <= 9
+    letters = 2 if token[1:2].isalpha() else 1
+    digits = token[letters:]
+    return token[:letters].isalpha() and digits.isdigit() and 6 <= len(digits) <= 8
+
+
+def extract_passport_patterns(text_list):
+    """Extract passport data from OCR lines in a single scan"""
+    passport_data = {
+        "passport_number": None,
+        "country": None,
+        "name": None,
+        "confidence_score": 0,
+        "extraction_method": "none"
+    }
+
+    all_text = '\n'.join(text_list).upper()
+    log.debug("Combined text for analysis: %r", all_text)
+
+    mrz = None
+    number = None
+    fallback_number = None
+    country = None
+    country_rank = None
+    surname_label = None
+    given_label = None
+    name_pair = None
+    # 0: no label, 1: after PASSPORT, 2: after NO/NUMBER (same line only)
+    label_state = 0
+    label_end = 0
+
+    for match in FIELD_SCANNER.finditer(all_text):
+        token = match['token']
+        if token is None:
+            label_state = 0
+            if match['mrz'] is not None:
+                if mrz is None:
+                    mrz = match
+            elif match['name_label'] is not None:
+                label = ' '.join(match['name_label'].split())
+                if label in SURNAME_LABELS:
+                    surname_label = surname_label or match['name_value']
+                else:
+                    given_label = given_label or match['name_value']
+            else:
+                found, rank = COUNTRY_LOOKUP[' '.join(match['country_name'].split())]
+                if country_rank is None or rank < country_rank:
+                    country, country_rank = found, rank
+            continue
+
+        if label_state and '\n' in all_text[label_end:match.start()]:
+            label_state = 0
+
+        if number is None:
+            if is_document_number(token):
+                number = token
+            elif label_state and 6 <= len(token) <= 9 and not LABELLED_FALSE_POSITIVE.search(token):
+                number = token
+
+        if fallback_number is None and 6 <= len(token) <= 10 and not FALLBACK_FALSE_POSITIVE.search(token):
+            fallback_number = token
+
+        if token in PASSPORT_LABELS:
+            label_state = 1
+        elif token in NUMBER_LABELS and (label_state or token == "NO"):
+            label_state = 2
+        else:
+            label_state = 0
+        label_end = match.end()
+
+        found = COUNTRY_LOOKUP.get(token)
+        if found is not None and (country_rank is None or found[1] < country_rank):
+            country, country_rank = found
+
+        if name_pair is None and match['given'] is not None and len(token) >= 2 and token.isalpha():
+            name_pair = (token, match['given'])
+
+    # Pattern 1: MRZ (Machine Readable Zone) format
+    if mrz is not None:
+        passport_data["country"] = mrz['mrz_country']
+        passport_data["name"] = f"{mrz['mrz_surname']}, {mrz['mrz_given']}"
+        passport_data["extraction_method"] = "mrz"
+        passport_data["confidence_score"] = 0.9
+        log.debug("✅ MRZ pattern found: Country=%s, Name=%s", passport_data["country"], passport_data["name"])
+
+    # Pattern 2: Passport number extraction (various formats)
+    if number is not None:
+        passport_data["passport_number"] = number
+        if passport_data["extraction_method"] == "none":
+            passport_data["extraction_method"] = "pattern_match"
+            passport_data["confidence_score"] = 0.7
+        log.debug("✅ Passport number found: %s", passport_data["passport_number"])
+
+    # Pattern 3: Country code detection
+    if not passport_data["country"] and country is not None:
+        passport_data["country"] = country
+        if passport_data["extraction_method"] == "none":
+            passport_data["extraction_method"] = "country_detection"
+            passport_data["confidence_score"] = 0.2
+        log.debug("✅ Country detected: %s", passport_data["country"])
+
+    # Pattern 4: Name extraction
+    if not passport_data["name"]:
+        if surname_label or given_label:
+            passport_data["name"] = (surname_label or given_label).strip()
+        elif name_pair is not None:
+            passport_data["name"] = f"{name_pair[0]}, {name_pair[1]}"
+        if passport_data["name"]:
+            log.debug("✅ Name extracted: %s", passport_data["name"])
+
+    # Pattern 5: any alphanumeric sequence that could be a document number
+    if not passport_data["passport_number"] and fallback_number is not None:
+        passport_data["passport_number"] = fallback_number
+        passport_data["extraction_method"] = "fallback_pattern"
+        passport_data["confidence_score"] = 0.4
+        log.debug("📋 Fallback passport number: %s", passport_data["passport_number"])
+
+    return passport_data
@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+import sys
+
+# Structured, level-gated logging for the KYC app.
+# Every record is one JSON line on stdout. Messages use logging's lazy
+# %-formatting, so a disabled level costs a level check and nothing else;
+# loops over OCR fragments additionally guard on log.isEnabledFor(DEBUG).
+#
+#   KYC_LOG_LEVEL=INFO    production default: no OCR text, names or numbers
+#   KYC_LOG_LEVEL=DEBUG   every fragment, line and the full result (contains PII)
+#
+# Structured fields go in extra={"fields": {...}} and are merged into the line.
+
+LOG_LEVEL = os.getenv('KYC_LOG_LEVEL', 'INFO').upper()
+
+DEBUG = logging.DEBUG
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _configure():
+    root = logging.getLogger('kyc')
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonLinesFormatter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return root
+
+
+def get_logger(name):
+    _configure()
+    return logging.getLogger(f'kyc.{name}')
@@ -0,0 +1,86 @@
+import re
+
+# Geometry-aware line reconstruction for EasyOCR detections.
+# EasyOCR returns (bbox, text, confidence) tuples in detection order, which
+# interleaves MRZ chunks with visual-zone text. Rebuilding the physical rows
+# of the document lets extraction see the lines as they are printed.
+
+# A box joins a row when its baseline is within this fraction of the row height
+BASELINE_TOLERANCE = 0.5
+
+# MRZ chunks are glued back together without a separator
+MRZ_CHUNK = re.compile(r'^[A-Z0-9<]+$')
+
+
+def _box_geometry(bbox):
+    """Return (x_min, x_max, baseline, height) of a 4-point EasyOCR bbox"""
+    xs = [point[0] for point in bbox]
+    ys = [point[1] for point in bbox]
+    top, bottom = min(ys), max(ys)
+    return min(xs), max(xs), bottom, max(bottom - top, 1)
+
+
+def _is_mrz_chunk(text):
+    return '<' in text and MRZ_CHUNK.match(text.upper()) is not None
+
+
+def _join_row(texts):
+    """Join texts left to right, gluing adjacent MRZ chunks"""
+    line = texts[0]
+    for previous, text in zip(texts, texts[1:]):
+        if _is_mrz_chunk(previous) and _is_mrz_chunk(text):
+            line += text
+        else:
+            line += ' ' + text
+    return line
+
+
+def assemble_lines(detections, min_confidence=0.0):
+    """
+    Cluster EasyOCR detections into rows by baseline and order each row
+    left to right. Detections at or below min_confidence are dropped.
+    Returns a list of line dicts with text, mean confidence, the
+    (text, confidence) fragments it was joined from and the row's
+    bounding box, top to bottom.
+    """
+    boxes = []
+    for bbox, text, confidence in detections:
+        text = text.strip()
+        if not text or confidence <= min_confidence:
+            continue
+        x_min, x_max, baseline, height = _box_geometry(bbox)
+        boxes.append({
+            "text": text,
+            "confidence": confidence,
+            "x_min": x_min,
+            "x_max": x_max,
+            "baseline": baseline,
+            "height": height,
+        })
+
+    rows = []
+    for box in sorted(boxes, key=lambda b: b["baseline"]):
+        if rows:
+            row = rows[-1]
+            row_height = sorted(b["height"] for b in row["boxes"])[len(row["boxes"]) // 2]
+            if abs(box["baseline"] - row["baseline"]) <= BASELINE_TOLERANCE * row_height:
+                row["boxes"].append(box)
+                row["baseline"] = sum(b["baseline"] for b in row["boxes"]) / len(row["boxes"])
+                continue
+        rows.append({"baseline": box["baseline"], "boxes": [box]})
+
+    lines = []
+    for row in rows:
+        row_boxes = sorted(row["boxes"], key=lambda b: b["x_min"])
+        lines.append({
+            "text": _join_row([b["text"] for b in row_boxes]),
+            "confidence": sum(b["confidence"] for b in row_boxes) / len(row_boxes),
+            "fragments": [(b["text"], b["confidence"]) for b in row_boxes],
+            "bbox": (
+                row_boxes[0]["x_min"],
+                min(b["baseline"] - b["height"] for b in row_boxes),
+                max(b["x_max"] for b in row_boxes),
+                max(b["baseline"] for b in row_boxes),
+            ),
+        })
+    return lines
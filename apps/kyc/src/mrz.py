@@ -0,0 +1,276 @@
+import heapq
+import math
+import re
+
+from countries import ISO_3166_COUNTRIES
+from kyc_log import get_logger
+
+log = get_logger('mrz')
+
+# Check-digit-driven correction of the TD3 (passport) MRZ data line.
+# Line 2 carries ICAO 9303 check digits over the document number, birth
+# date, expiry date, optional data and a composite of all of them. When
+# OCR confuses look-alike characters (O/0, I/1, B/8, S/5...) the checks
+# fail; instead of escalating to another OCR pass, a bounded beam search
+# over likely substitutions looks for the most probable line that passes
+# every check. The nationality field has no check digit, so candidates
+# for it must be a known issuing code.
+
+TD3_LINE_LENGTH = 44
+BEAM_WIDTH = 64
+# The best candidate must be this much more likely (log odds) than the next
+# one passing the checks; closer calls are left to the MRZ re-read
+AMBIGUITY_MARGIN = math.log(20)
+# L/1, G/6 and K/< swaps change a check digit sum by a multiple of 10, so
+# every line with such a character has a twin passing the same checks. A
+# runner-up that only differs from the best candidate by such swaps, of
+# characters read with at least this confidence and kept by the best
+# candidate, does not count as ambiguity. Below it the twin is a real
+# possibility (at 0.8 it is ~1 in 13) and the line goes to the re-read.
+CONFIDENT_READ = 0.9
+
+# P(OCR read `key` | printed character was `alt`) for OCR-B look-alikes
+CONFUSIONS = {
+    'O': (('0', 0.6), ('D', 0.1), ('Q', 0.05)),
+    'D': (('0', 0.3), ('O', 0.1)),
+    'Q': (('0', 0.3), ('O', 0.2)),
+    'I': (('1', 0.6), ('L', 0.05)),
+    'L': (('1', 0.3), ('I', 0.05)),
+    'T': (('7', 0.2),),
+    'Z': (('2', 0.4),),
+    'S': (('5', 0.5),),
+    'G': (('6', 0.4),),
+    'B': (('8', 0.5),),
+    'A': (('4', 0.1),),
+    '0': (('O', 0.5), ('D', 0.1), ('Q', 0.05)),
+    '1': (('I', 0.5), ('L', 0.05)),
+    '2': (('Z', 0.3),),
+    '4': (('A', 0.1),),
+    '5': (('S', 0.4),),
+    '6': (('G', 0.3),),
+    '7': (('T', 0.1),),
+    '8': (('B', 0.4),),
+    # Fillers are often read as K, X or a guillemet
+    'K': (('<', 0.4),),
+    'X': (('<', 0.2),),
+    '«': (('<', 0.8),),
+}
+
+DIGITS = frozenset('0123456789')
+LETTERS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+FILLER = frozenset('<')
+ALPHANUMERIC = DIGITS | LETTERS | FILLER
+
+# Characters allowed at each position of TD3 line 2
+_POSITIONS = (
+    [ALPHANUMERIC] * 9 + [DIGITS]                  # document number + check
+    + [LETTERS | FILLER] * 3                       # nationality
+    + [DIGITS] * 7                                 # birth date + check
+    + [frozenset('MFX<')]                          # sex
+    + [DIGITS] * 7                                 # expiry date + check
+    + [ALPHANUMERIC] * 14 + [DIGITS | FILLER]      # optional data + check
+    + [DIGITS]                                     # composite check
+)
+
+# Issuing state / nationality codes besides ISO 3166 alpha-3 (ICAO 9303
+# part 3): Germany's D, British nationality classes, United Nations and
+# stateless codes, and the Utopia specimen documents
+ICAO_NATIONALITY_CODES = frozenset({
+    'D', 'GBD', 'GBN', 'GBO', 'GBP', 'GBS', 'UNO', 'UNA', 'UNK',
+    'XXA', 'XXB', 'XXC', 'XXX', 'EUE', 'XOM', 'RKS', 'UTO',
+})
+NATIONALITY_CODES = frozenset(alpha3 for _, alpha3, _ in ISO_3166_COUNTRIES) | ICAO_NATIONALITY_CODES
+NATIONALITY_END = 12
+
+# Document number and optional data are padded on the right: once a field
+# has a filler, everything after it in the field is a filler too
+_PADDED = frozenset(range(1, 9)) | frozenset(range(29, 42))
+
+# Letters in document numbers mostly form a leading series (C01X00T47 style
+# numbers exist, so this is a cost, not a rule)
+LETTER_AFTER_DIGIT_COST = math.log(5)
+
+# check digit position -> the slices it covers
+_CHECKS = {
+    9: ((0, 9),),
+    19: ((13, 19),),
+    27: ((21, 27),),
+    42: ((28, 42),),
+    43: ((0, 10), (13, 20), (21, 43)),
+}
+
+MRZ_DATA_LINE = re.compile(r'^[A-Z0-9<«]{%d}$' % TD3_LINE_LENGTH)
+
+
+def _char_value(char):
+    if char.isdigit():
+        return int(char)
+    if char == '<':
+        return 0
+    return ord(char) - ord('A') + 10
+
+
+def check_digit(field):
+    """ICAO 9303 check digit: weights 7, 3, 1 over the character values, mod 10"""
+    return sum(_char_value(char) * (7, 3, 1)[i % 3] for i, char in enumerate(field)) % 10
+
+
+def _check_passes(line, position):
+    expected = line[position]
+    if expected not in DIGITS and expected != '<':
+        return False
+    value = 0 if expected == '<' else int(expected)
+    field = ''.join(line[start:end] for start, end in _CHECKS[position])
+    return check_digit(field) == value
+
+
+def is_valid(line):
+    """Every character allowed at its position and every check digit passing"""
+    return (
+        len(line) == TD3_LINE_LENGTH
+        and all(char in allowed for char, allowed in zip(line, _POSITIONS))
+        and not any(line[i - 1] == '<' and line[i] != '<' for i in _PADDED)
+        and all(_check_passes(line, position) for position in _CHECKS)
+    )
+
+
+def _candidates(char, allowed, confidence):
+    """(character, log probability) options for one OCR'd character"""
+    options = []
+    if char in allowed:
+        options.append((char, math.log(confidence)))
+    for alt, probability in CONFUSIONS.get(char, ()):
+        if alt in allowed:
+            # An impossible read is certainly a confusion; a possible one only maybe
+            weight = probability if char not in allowed else (1 - confidence) * probability
+            options.append((alt, math.log(weight)))
+    return options
+
+
+def _context_cost(position, prefix, option):
+    if position in _PADDED and option in LETTERS and prefix[-1] in DIGITS:
+        return LETTER_AFTER_DIGIT_COST
+    return 0.0
+
+
+def _unverifiable_swap(line, confidences, best, candidate, position):
+    """
+    Whether candidate only re-reads a confidently read character that the
+    best candidate kept, as a look-alike no check digit can tell apart
+    """
+    return (
+        confidences[position] >= CONFIDENT_READ
+        and line[position] == best[position]
+        and (_char_value(best[position]) - _char_value(candidate[position])) % 10 == 0
+    )
+
+
+def _known_nationality(line):
+    return line[10:13].rstrip('<') in NATIONALITY_CODES
+
+
+def correct_data_line(line, confidences=None, beam_width=BEAM_WIDTH, margin=AMBIGUITY_MARGIN):
+    """
+    Return (corrected line, substitutions) for the most likely TD3 line 2
+    that passes every check digit, or None if the beam finds none or a
+    plausible runner-up is within the ambiguity margin.
+    confidences gives one OCR confidence per character. EasyOCR reports one
+    per fragment, so callers give each character its fragment's confidence.
+    """
+    if len(line) != TD3_LINE_LENGTH:
+        return None
+    if confidences is None:
+        confidences = [0.9] * TD3_LINE_LENGTH
+
+    beams = [(0.0, '')]
+    for position, char in enumerate(line):
+        confidence = min(max(confidences[position], 0.01), 0.99)
+        options = _candidates(char, _POSITIONS[position], confidence)
+        if not options:
+            return None
+        beams = [
+            (cost - log_p + _context_cost(position, prefix, option), prefix + option)
+            for cost, prefix in beams
+            for option, log_p in options
+            if not (position in _PADDED and prefix[-1] == '<' and option != '<')
+        ]
+        if position in _CHECKS:
+            # Field complete: candidates failing its check digit are dropped
+            beams = [beam for beam in beams if _check_passes(beam[1], position)]
+        elif position == NATIONALITY_END:
+            # No check digit here; keep known codes, unless the document
+            # carries one this table does not have yet
+            known = [beam for beam in beams if _known_nationality(beam[1])]
+            beams = known or beams
+        beams = heapq.nsmallest(beam_width, beams)
+        if not beams:
+            return None
+
+    best_cost, corrected = beams[0]
+    for cost, candidate in beams[1:]:
+        if cost - best_cost >= margin:
+            break
+        differences = [position for position in range(TD3_LINE_LENGTH) if candidate[position] != corrected[position]]
+        if not all(_unverifiable_swap(line, confidences, corrected, candidate, position) for position in differences):
+            return None
+    return corrected, sum(a != b for a, b in zip(line, corrected))
+
+
+def _date(yymmdd):
+    return f"{yymmdd[0:2]}-{yymmdd[2:4]}-{yymmdd[4:6]}"
+
+
+def parse_data_line(line):
+    """Fields of a valid TD3 line 2"""
+    return {
+        "document_number": line[0:9].replace('<', ''),
+        "nationality": line[10:13].replace('<', ''),
+        "birth_date": _date(line[13:19]),
+        "sex": line[20].replace('<', '') or None,
+        "expiry_date": _date(line[21:27]),
+    }
+
+
+def _character_confidences(line, text):
+    """One confidence per character of text, each from the fragment it was read in"""
+    confidences = []
+    for fragment, confidence in line.get("fragments", ()):
+        confidences.extend([confidence] * len(fragment.replace(' ', '')))
+    if len(confidences) != len(text):
+        return [line["confidence"]] * len(text)
+    return confidences
+
+
+def find_data_line(lines):
+    """
+    Locate TD3 line 2 among assembled OCR lines (dicts with text, confidence
+    and fragments). Returns (normalised text, confidence per character) or None.
+    """
+    for line in lines:
+        text = line["text"].replace(' ', '').upper()
+        if MRZ_DATA_LINE.match(text) and sum(char.isdigit() for char in text) >= 12:
+            return text, _character_confidences(line, text)
+    return None
+
+
+def read_data_line(lines, beam_width=BEAM_WIDTH):
+    """
+    Validate, and correct if needed, the MRZ data line.
+    Returns None when there is no data line, otherwise a dict with the parsed
+    fields (None if no correction passes the checks) and the substitutions made.
+    """
+    found = find_data_line(lines)
+    if found is None:
+        return None
+    text, confidences = found
+
+    if is_valid(text):
+        corrected, substitutions = text, 0
+    else:
+        correction = correct_data_line(text, confidences, beam_width)
+        if correction is None:
+            return {"valid": False, "fields": None, "substitutions": 0}
+        corrected, substitutions = correction
+        log.info("🔧 MRZ data line corrected with %d substitution(s)", substitutions)
+
+    return {"valid": True, "fields": parse_data_line(corrected), "substitutions": substitutions}
@@ -0,0 +1,248 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from kyc_log import get_logger
+
+log = get_logger('near_duplicates')
+
+# Perceptual-hash index for spotting the same document photographed again,
+# possibly from another account, before spending an OCR pass on it.
+#
+# Each image gets a 64-bit pHash (low frequencies of a 32x32 DCT) and a
+# 64-bit dHash (horizontal gradient signs on a 9x8 thumbnail), both computed
+# with NumPy on the decoded greyscale image. Lookups use multi-index hashing:
+# the pHash is split into five 12-13 bit chunks, and by the pigeonhole
+# principle any hash within PHASH_THRESHOLD bits matches the query on some
+# chunk up to PHASH_THRESHOLD // 5 bit flips, so only ~70 buckets are probed.
+#
+# The index file (KYC_PHASH_INDEX) is append-only: an 8-byte header, then
+# fixed 40-byte records. Several processes may append to it; each reads the
+# records added by others before every lookup.
+
+INDEX_PATH = os.getenv('KYC_PHASH_INDEX')
+PHASH_THRESHOLD = int(os.getenv('KYC_PHASH_THRESHOLD', '8'))
+DHASH_THRESHOLD = int(os.getenv('KYC_DHASH_THRESHOLD', '12'))
+
+FILE_MAGIC = b'KYCPH\x00\x01\n'
+# pHash, dHash, unix time, first 16 bytes of the image's SHA-256
+RECORD = struct.Struct('<QQd16s')
+
+CHUNK_WIDTHS = (13, 13, 13, 13, 12)
+_CHUNK_SHIFTS = (0, 13, 26, 39, 52)
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+_DCT = _dct_matrix(DCT_SIZE)
+_BIT_WEIGHTS = np.left_shift(np.uint64(1), np.arange(63, -1, -1, dtype=np.uint64))
+
+
+def _shrink(grey, rows, cols):
+    """Area-average a greyscale array down to rows x cols"""
+    height, width = grey.shape
+    if height < rows or width < cols:
+        grey = np.repeat(np.repeat(grey, -(-rows // height), axis=0), -(-cols // width), axis=1)
+        height, width = grey.shape
+    block_h, block_w = height // rows, width // cols
+    return grey[:rows * block_h, :cols * block_w].reshape(rows, block_h, cols, block_w).mean(axis=(1, 3))
+
+
+def _to_int(bits):
+    return int(np.bitwise_or.reduce(np.where(bits.ravel(), _BIT_WEIGHTS, np.uint64(0))))
+
+
+def phash(grey):
+    coefficients = _DCT @ _shrink(grey, DCT_SIZE, DCT_SIZE) @ _DCT.T
+    low = coefficients[:HASH_SIZE, :HASH_SIZE]
+    # The DC term carries overall brightness, not structure
+    return _to_int(low > np.median(low.ravel()[1:]))
+
+
+def dhash(grey):
+    thumbnail = _shrink(grey, HASH_SIZE, HASH_SIZE + 1)
+    return _to_int(thumbnail[:, 1:] > thumbnail[:, :-1])
+
+
+def hamming(a, b):
+    # int.bit_count() needs Python 3.10; the app runs on 3.9
+    return bin(a ^ b).count('1')
+
+
+def image_hashes(image, image_bytes):
+    """(pHash, dHash, digest) of a decoded PIL image and its encoded bytes"""
+    grey = np.asarray(image.convert('L'), dtype=np.float32)
+    return phash(grey), dhash(grey), hashlib.sha256(image_bytes).digest()[:16]
+
+
+def _chunks(value):
+    return [(value >> shift) & ((1 << width) - 1) for shift, width in zip(_CHUNK_SHIFTS, CHUNK_WIDTHS)]
+
+
+def _flip_masks(radius, width):
+    """XOR masks for every chunk value within radius bit flips"""
+    masks = [0]
+    frontier = [(0, -1)]
+    for _ in range(radius):
+        next_frontier = []
+        for value, last in frontier:
+            for bit in range(last + 1, width):
+                flipped = value | (1 << bit)
+                masks.append(flipped)
+                next_frontier.append((flipped, bit))
+        frontier = next_frontier
+    return masks
+
+
+_BYTE_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def _popcount(values):
+    """Set bits of each uint64 in an array, same shape out"""
+    per_byte = _BYTE_POPCOUNT[np.ascontiguousarray(values).view(np.uint8)]
+    return per_byte.reshape(values.shape + (8,)).sum(axis=-1)
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=INDEX_PATH, phash_threshold=PHASH_THRESHOLD, dhash_threshold=DHASH_THRESHOLD):
+        self.path = path
+        self.phash_threshold = phash_threshold
+        self.dhash_threshold = dhash_threshold
+        self.lock = threading.Lock()
+        self.records = []
+        # Hashes again as arrays (grown by doubling) for vectorised distances
+        self.hashes = np.zeros((1024, 2), dtype=np.uint64)
+        # one {chunk value: [record index, ...]} table per pHash chunk
+        self.tables = [{} for _ in CHUNK_WIDTHS]
+        radius = phash_threshold // len(CHUNK_WIDTHS)
+        self.masks = [_flip_masks(radius, width) for width in CHUNK_WIDTHS]
+        self.offset = 0
+        if path:
+            self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(FILE_MAGIC)
+        with open(self.path, 'rb') as f:
+            if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"Not a near-duplicate index: {self.path}")
+        self.offset = len(FILE_MAGIC)
+        self._refresh()
+
+    def _refresh(self):
+        """Load records appended since the last read, by this or another process"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        # A record still being written by another process is picked up next time
+        complete = len(data) - len(data) % RECORD.size
+        for values in RECORD.iter_unpack(data[:complete]):
+            self._insert(values)
+        self.offset += complete
+
+    def _insert(self, values):
+        index = len(self.records)
+        self.records.append(values)
+        if index == len(self.hashes):
+            self.hashes = np.concatenate([self.hashes, np.zeros_like(self.hashes)])
+        self.hashes[index] = values[:2]
+        for table, chunk in zip(self.tables, _chunks(values[0])):
+            table.setdefault(chunk, []).append(index)
+
+    def query(self, p_hash, d_hash):
+        """Records within the thresholds, closest first, as (pHash distance, dHash distance, record)"""
+        candidates = set()
+        for table, chunk, masks in zip(self.tables, _chunks(p_hash), self.masks):
+            for mask in masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+        if not candidates:
+            return []
+
+        indexes = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        distances = _popcount(self.hashes[indexes] ^ np.array([p_hash, d_hash], dtype=np.uint64))
+        close = (distances[:, 0] <= self.phash_threshold) & (distances[:, 1] <= self.dhash_threshold)
+        matches = [
+            (int(p_distance), int(d_distance), self.records[index])
+            for index, (p_distance, d_distance) in zip(indexes[close], distances[close])
+        ]
+        matches.sort(key=lambda match: match[:2])
+        return matches
+
+    def add(self, p_hash, d_hash, digest):
+        values = (p_hash, d_hash, time.time(), digest)
+        if self.path:
+            # One write per record on an O_APPEND file keeps concurrent appenders
+            # intact; reading it back also picks up whatever they added meanwhile
+            with open(self.path, 'ab') as f:
+                f.write(RECORD.pack(*values))
+            self._refresh()
+        else:
+            self._insert(values)
+
+    def check_and_add(self, p_hash, d_hash, digest):
+        """Look the image up, then record it; returns the matches found"""
+        with self.lock:
+            started = time.perf_counter()
+            if self.path:
+                self._refresh()
+            matches = self.query(p_hash, d_hash)
+            self.add(p_hash, d_hash, digest)
+            elapsed = time.perf_counter() - started
+        log.debug("🔁 Near-duplicate lookup in %.3f ms over %d records", elapsed * 1000, len(self.records))
+        return matches
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """The index at KYC_PHASH_INDEX, or None when screening is not configured"""
+    global _default_index
+    if INDEX_PATH is None:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            _default_index = NearDuplicateIndex(INDEX_PATH)
+        return _default_index
+
+
+def screen(image, image_path, index=None):
+    """
+    Result entry flagging near-duplicates of a decoded image, or None if it
+    is new or screening is off. The image is recorded in the index either way.
+    """
+    index = index or default_index()
+    if index is None:
+        return None
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+    p_hash, d_hash, digest = image_hashes(image, image_bytes)
+    matches = index.check_and_add(p_hash, d_hash, digest)
+    if not matches:
+        return None
+    p_distance, d_distance, closest = matches[0]
+    log.warning("🔁 Image matches %d previously seen document(s)", len(matches))
+    return {
+        "matches": len(matches),
+        "exact": any(match[2][3] == digest for match in matches),
+        "phash_distance": p_distance,
+        "dhash_distance": d_distance,
+        "first_seen": closest[2],
+    }
@@ -0,0 +1,91 @@
+import json
+import os
+
+from kyc_log import get_logger
+
+log = get_logger('ocr_profiles')
+
+# Named EasyOCR recognition profiles.
+# Each profile is a set of readtext() keyword arguments, and each pipeline
+# stage (full page, MRZ strip) picks the profile that suits its text.
+# Profiles and the stage mapping can be overridden from a JSON file:
+#
+#   {
+#     "profiles": {"mrz-fast": {"batch_size": 64}, "my-profile": {...}},
+#     "stages": {"page": "my-profile"}
+#   }
+#
+# The file path comes from KYC_OCR_PROFILES.
+
+# readtext() keyword arguments a profile may set
+READTEXT_OPTIONS = frozenset({
+    "decoder", "beamWidth", "batch_size", "workers", "allowlist", "blocklist",
+    "text_threshold", "low_text", "link_threshold", "canvas_size", "mag_ratio",
+    "min_size", "contrast_ths", "adjust_contrast", "paragraph",
+})
+
+# ICAO 9303 MRZ character set (OCR-B uppercase, digits and filler)
+MRZ_ALLOWLIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<'
+
+DEFAULT_PROFILES = {
+    # readtext() defaults, i.e. what the pipeline did before profiles
+    "default": {},
+    # MRZ strip: MRZ charset only, greedy CTC decoding, large batches
+    "mrz-fast": {
+        "allowlist": MRZ_ALLOWLIST,
+        "decoder": "greedy",
+        "batch_size": 32,
+        "text_threshold": 0.5,
+        "canvas_size": 1280,
+    },
+}
+
+# The full page stays on readtext() defaults. A slower, more accurate page
+# profile is opt-in through KYC_OCR_PROFILES once benchmarks/bench_profiles.py
+# shows it is worth its latency, e.g.
+#
+#   {
+#     "profiles": {"page-beamsearch": {"decoder": "beamsearch", "beamWidth": 5}},
+#     "stages": {"page": "page-beamsearch"}
+#   }
+DEFAULT_STAGES = {
+    "page": "default",
+    "mrz": "mrz-fast",
+}
+
+_config = None
+
+
+def load_profiles(path=None):
+    """Return (profiles, stages) with the optional config file merged over the defaults"""
+    profiles = {name: dict(options) for name, options in DEFAULT_PROFILES.items()}
+    stages = dict(DEFAULT_STAGES)
+
+    path = path or os.getenv('KYC_OCR_PROFILES')
+    if path:
+        with open(path, 'r') as f:
+            config = json.load(f)
+        for name, options in config.get("profiles", {}).items():
+            profiles.setdefault(name, {}).update(options)
+        stages.update(config.get("stages", {}))
+        log.info("⚙️ Loaded OCR profiles from: %s", path)
+
+    for name, options in profiles.items():
+        unknown = set(options) - READTEXT_OPTIONS
+        if unknown:
+            raise ValueError(f"Unknown readtext option(s) {sorted(unknown)} in OCR profile '{name}'")
+    for stage, name in stages.items():
+        if name not in profiles:
+            raise ValueError(f"OCR stage '{stage}' uses unknown profile '{name}'")
+
+    return profiles, stages
+
+
+def stage_profile(stage):
+    """Return (profile name, readtext() keyword arguments) for a pipeline stage"""
+    global _config
+    if _config is None:
+        _config = load_profiles()
+    profiles, stages = _config
+    name = stages[stage]
+    return name, dict(profiles[name])
@@ -0,0 +1,42 @@
+# Merging of per-page OCR results (front, back, selfie...) into one identity
+# record. Kept free of OCR dependencies so the test apps can share it.
+
+def _page_rank(page_result):
+    """Sort key preferring real OCR extractions over demo data, then confidence"""
+    is_demo = bool(page_result.get("demo_mode") or page_result.get("demo_fallback_applied"))
+    return (not is_demo, page_result.get("confidence_score") or 0)
+
+def merge_page_results(page_results):
+    """Merge per-page OCR results into a single identity record"""
+    usable = [page for page in page_results if "error" not in page]
+    if not usable:
+        raise Exception("No passport page could be processed")
+
+    ranked = sorted(usable, key=_page_rank, reverse=True)
+    result = dict(ranked[0])
+    result.pop("page", None)
+
+    # Each field comes from the most trustworthy page that has it
+    for field in ("passport_number", "country", "name"):
+        source = next((page for page in ranked if page.get(field)), None)
+        result[field] = source[field] if source else None
+        if source and not _page_rank(source)[0]:
+            result["demo_fallback_applied"] = True
+
+    result["verified"] = bool(result["passport_number"] and result["country"])
+    # A page seen before flags the whole record, whichever page it was
+    near_duplicate = next((page["near_duplicate"] for page in ranked if page.get("near_duplicate")), None)
+    if near_duplicate:
+        result["near_duplicate"] = near_duplicate
+    result["pages"] = [
+        {
+            "page": page.get("page"),
+            "extraction_method": page.get("extraction_method"),
+            "confidence_score": page.get("confidence_score"),
+            "processing_time": page.get("processing_time"),
+            "error": page.get("error"),
+            "near_duplicate": page.get("near_duplicate"),
+        }
+        for page in page_results
+    ]
+    return result
@@ -0,0 +1,90 @@
+import queue
+import threading
+
+from easyocr.utils import reformat_input
+
+# Pipelined EasyOCR executor for batches of documents.
+# reader.readtext() runs the CRAFT detector and then the CRNN recognizer
+# back to back, so each model leaves the CPU partly idle while the other
+# works. Here a detector thread runs reader.detect() on document N+1 while
+# the calling thread runs reader.recognize() on document N. A bounded queue
+# between the stages caps how many decoded images are held in memory.
+
+# readtext() options that belong to the detection stage; the rest go to recognition
+DETECT_OPTIONS = frozenset({
+    "min_size", "text_threshold", "low_text", "link_threshold", "canvas_size", "mag_ratio",
+})
+
+_DONE = object()
+
+
+def split_options(options):
+    """Split readtext() keyword arguments into (detect, recognize) keyword arguments"""
+    detect = {key: value for key, value in options.items() if key in DETECT_OPTIONS}
+    recognize = {key: value for key, value in options.items() if key not in DETECT_OPTIONS}
+    return detect, recognize
+
+
+def _put(detected, item, stop):
+    """Block while the queue is full (bounding memory use) unless asked to stop"""
+    while not stop.is_set():
+        try:
+            detected.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _detect_worker(reader, images, detect_options, detected, stop):
+    """Detection stage: decode and detect each image, hand boxes to recognition"""
+    for index, image in enumerate(images):
+        try:
+            img, img_cv_grey = reformat_input(image)
+            horizontal_list, free_list = reader.detect(img, reformat=False, **detect_options)
+            item = (index, img_cv_grey, horizontal_list[0], free_list[0], None)
+        except Exception as detect_error:
+            item = (index, None, None, None, detect_error)
+        if not _put(detected, item, stop):
+            return
+    _put(detected, _DONE, stop)
+
+
+def pipelined_readtext(reader, images, queue_size=2, **options):
+    """
+    Run readtext() over many images with detection and recognition overlapped.
+    Yields (index, results) in input order; results match readtext(detail=1).
+    A failed image yields (index, exception) instead of stopping the batch.
+    """
+    detect_options, recognize_options = split_options(options)
+    detected = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+    detector = threading.Thread(
+        target=_detect_worker,
+        args=(reader, images, detect_options, detected, stop),
+        name="ocr-detect",
+        daemon=True
+    )
+    detector.start()
+
+    try:
+        while True:
+            item = detected.get()
+            if item is _DONE:
+                break
+            index, img_cv_grey, horizontal_list, free_list, error = item
+            if error is not None:
+                yield index, error
+                continue
+            try:
+                results = reader.recognize(
+                    img_cv_grey, horizontal_list, free_list,
+                    detail=1, reformat=False, **recognize_options
+                )
+            except Exception as recognize_error:
+                results = recognize_error
+            yield index, results
+    finally:
+        # Consumer stopped early or finished: release the detector thread
+        stop.set()
+        detector.join()
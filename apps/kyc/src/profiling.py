@@ -0,0 +1,215 @@
+import cProfile
+import gzip
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from kyc_log import get_logger
+
+log = get_logger('profiling')
+
+# Opt-in profiling for tasks we cannot attach a debugger to.
+# The only view into an enclave task is its output directory, so profiles
+# are written as gzipped artifacts next to result.json:
+#
+#   profile-cprofile.pstats.gz    cProfile of main(), loadable with pstats
+#   profile-cprofile.txt.gz       top functions by cumulative time
+#   profile-tracemalloc.txt.gz    memory at each stage boundary, top growth
+#   profile-torch.txt.gz          torch autograd profiler around readtext(); one
+#                                 region at a time, overlapping ones are listed
+#
+#   KYC_PROFILE=cprofile,tracemalloc,torch   (or "all"; unset/empty is off)
+#   KYC_PROFILE_MAX_KB=1024                  compressed size cap per artifact
+
+PROFILE = {
+    part.strip()
+    for part in os.getenv('KYC_PROFILE', '').lower().split(',')
+    if part.strip()
+}
+if 'all' in PROFILE:
+    PROFILE = {'cprofile', 'tracemalloc', 'torch'}
+MAX_ARTIFACT_BYTES = int(os.getenv('KYC_PROFILE_MAX_KB', '1024')) * 1024
+
+# Rows kept in text reports
+TOP_FUNCTIONS = 80
+TOP_ALLOCATIONS = 15
+TOP_TORCH_OPS = 40
+
+_session = None
+
+
+class ProfileSession:
+    def __init__(self, parts):
+        self.parts = parts
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.cprofile = None
+        # cProfile only sees the thread that enabled it; page workers bring their own
+        self.worker_profiles = []
+        self.snapshot = None
+        self.memory_report = []
+        self.torch_report = []
+        # torch's profiler is process-wide: a region that starts while another
+        # is being profiled runs unprofiled (waiting would serialise the pages
+        # being measured) and is listed as skipped in the report
+        self.torch_lock = threading.Lock()
+        self.torch_skipped = Counter()
+
+        if 'tracemalloc' in parts:
+            tracemalloc.start()
+            self.snapshot = tracemalloc.take_snapshot()
+        if 'cprofile' in parts:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def mark(self, stage):
+        if 'tracemalloc' not in self.parts:
+            return
+        with self.lock:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory_report.append(
+                f"== {stage} at {time.perf_counter() - self.start:.2f}s: "
+                f"current {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB"
+            )
+            for stat in snapshot.compare_to(self.snapshot, 'lineno')[:TOP_ALLOCATIONS]:
+                self.memory_report.append(f"   {stat}")
+            self.snapshot = snapshot
+
+    @contextmanager
+    def worker(self):
+        if self.cprofile is None:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self.lock:
+                self.worker_profiles.append(profile)
+
+    @contextmanager
+    def torch_region(self, label):
+        if 'torch' not in self.parts:
+            yield
+            return
+        if not self.torch_lock.acquire(blocking=False):
+            with self.lock:
+                self.torch_skipped[label] += 1
+            yield
+            return
+        try:
+            import torch
+        except ImportError:
+            self.torch_lock.release()
+            yield
+            return
+        try:
+            with torch.autograd.profiler.profile() as prof:
+                yield
+            self.torch_report.append(f"== {label}")
+            self.torch_report.append(
+                prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=TOP_TORCH_OPS)
+            )
+        finally:
+            self.torch_lock.release()
+
+    def finish(self, output_dir):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            stats = pstats.Stats(self.cprofile)
+            for profile in self.worker_profiles:
+                stats.add(profile)
+            stats_path = os.path.join(output_dir, 'profile-cprofile.pstats')
+            stats.dump_stats(stats_path)
+            with open(stats_path, 'rb') as f:
+                stats_data = f.read()
+            os.remove(stats_path)
+            # Raw stats cannot be truncated; over the cap only the text report is kept
+            write_artifact(output_dir, 'profile-cprofile.pstats.gz', stats_data, truncate=False)
+
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            write_artifact(output_dir, 'profile-cprofile.txt.gz', text.getvalue().encode())
+
+        if 'tracemalloc' in self.parts:
+            self.mark("finish")
+            tracemalloc.stop()
+            write_artifact(output_dir, 'profile-tracemalloc.txt.gz', '\n'.join(self.memory_report).encode())
+
+        if self.torch_skipped:
+            skipped = ', '.join(f"{label} x{count}" for label, count in sorted(self.torch_skipped.items()))
+            self.torch_report.insert(0, f"== Not profiled, ran while another region was: {skipped}")
+        if self.torch_report:
+            write_artifact(output_dir, 'profile-torch.txt.gz', '\n'.join(self.torch_report).encode())
+
+
+def write_artifact(output_dir, name, data, truncate=True):
+    """gzip data into output_dir, halving text until it fits MAX_ARTIFACT_BYTES"""
+    compressed = gzip.compress(data)
+    while len(compressed) > MAX_ARTIFACT_BYTES:
+        if not truncate or len(data) < 1024:
+            log.warning("⚠️ Profile artifact %s over %d bytes, not written", name, MAX_ARTIFACT_BYTES)
+            return None
+        data = data[:len(data) // 2] + b"\n[truncated to fit KYC_PROFILE_MAX_KB]\n"
+        compressed = gzip.compress(data)
+
+    path = os.path.join(output_dir, name)
+    with open(path, 'wb') as f:
+        f.write(compressed)
+    log.info("📊 Profile artifact written: %s (%d bytes)", path, len(compressed))
+    return path
+
+
+def start():
+    """Begin a profiling session if KYC_PROFILE asks for one"""
+    global _session
+    if PROFILE and _session is None:
+        log.info("📊 Profiling enabled: %s", sorted(PROFILE))
+        _session = ProfileSession(PROFILE)
+    return _session
+
+
+def mark(stage):
+    """Stage boundary: records a tracemalloc snapshot when profiling"""
+    if _session is not None:
+        _session.mark(stage)
+
+
+@contextmanager
+def worker():
+    """Run a worker thread's share of the task under cProfile when profiling"""
+    if _session is None:
+        yield
+    else:
+        with _session.worker():
+            yield
+
+
+@contextmanager
+def torch_region(label):
+    """Wrap an inference call in the torch autograd profiler when profiling"""
+    if _session is None:
+        yield
+    else:
+        with _session.torch_region(label):
+            yield
+
+
+def finish(output_dir):
+    """Stop profiling and write the artifacts"""
+    global _session
+    session, _session = _session, None
+    if session is not None:
+        try:
+            session.finish(output_dir)
+        except Exception as profile_error:
+            log.warning("⚠️ Could not write profile artifacts: %s", profile_error)
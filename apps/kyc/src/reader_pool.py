@@ -0,0 +1,126 @@
+import gc
+import os
+import threading
+from collections import OrderedDict
+
+import easyocr
+
+from kyc_log import get_logger
+
+log = get_logger('reader_pool')
+
+# Pool of EasyOCR Readers keyed by language set.
+# Every language set needs its own recognizer (several hundred MB each), so
+# readers are built on first use and the least recently used one is evicted
+# once the estimated resident model size exceeds KYC_READER_POOL_MB.
+# The language set for a document comes from its MRZ-issuing country.
+
+DEFAULT_LANGUAGES = ('en',)
+MEMORY_CAP_MB = float(os.getenv('KYC_READER_POOL_MB', '1024'))
+
+# Visual-zone languages by ICAO issuing state. All of these share EasyOCR's
+# latin recognizer, so English stays in every set for the MRZ and labels.
+LANGUAGES_BY_COUNTRY = {
+    "DEU": ('en', 'de'), "D": ('en', 'de'), "AUT": ('en', 'de'), "LIE": ('en', 'de'),
+    "CHE": ('en', 'de', 'fr', 'it'),
+    "FRA": ('en', 'fr'), "BEL": ('en', 'fr', 'nl'), "LUX": ('en', 'fr', 'de'), "MCO": ('en', 'fr'),
+    "SRB": ('en', 'rs_latin'), "MNE": ('en', 'rs_latin'), "BIH": ('en', 'rs_latin', 'hr'),
+    "HRV": ('en', 'hr'),
+    "ESP": ('en', 'es'), "ITA": ('en', 'it'), "PRT": ('en', 'pt'), "BRA": ('en', 'pt'),
+    "NLD": ('en', 'nl'), "POL": ('en', 'pl'), "CZE": ('en', 'cs'), "SVK": ('en', 'sk'),
+    "SVN": ('en', 'sl'), "HUN": ('en', 'hu'), "ROU": ('en', 'ro'), "TUR": ('en', 'tr'),
+    "SWE": ('en', 'sv'), "DNK": ('en', 'da'), "NOR": ('en', 'no'),
+}
+
+
+def languages_for_country(country):
+    """Language set for a document issued by the given ICAO state code"""
+    return LANGUAGES_BY_COUNTRY.get(country, DEFAULT_LANGUAGES)
+
+
+def model_size_mb(reader):
+    """Parameter memory of a Reader's detector and recognizer, in MB"""
+    total = 0
+    for model in (getattr(reader, 'detector', None), getattr(reader, 'recognizer', None)):
+        if model is not None:
+            total += sum(p.numel() * p.element_size() for p in model.parameters())
+    return total / (1024 * 1024)
+
+
+def load_reader(languages):
+    return easyocr.Reader(list(languages), gpu=False, verbose=False)
+
+
+class ReaderPool:
+    """Thread-safe LRU of Readers under an estimated memory cap"""
+
+    def __init__(self, memory_cap_mb=MEMORY_CAP_MB, loader=load_reader):
+        self.memory_cap_mb = memory_cap_mb
+        self.loader = loader
+        self.lock = threading.Lock()
+        # languages -> (reader, size_mb), least recently used first
+        self.readers = OrderedDict()
+        self.pinned = set()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(languages):
+        """Readers are shared by language set, whatever the order given"""
+        return tuple(sorted(set(languages)))
+
+    def put(self, languages, reader, pinned=False):
+        """Add an already built Reader, e.g. the default one main() started with"""
+        key = self.key(languages)
+        with self.lock:
+            self.readers[key] = (reader, model_size_mb(reader))
+            self.readers.move_to_end(key)
+            if pinned:
+                self.pinned.add(key)
+            self._evict()
+
+    def get(self, languages):
+        key = self.key(languages)
+        with self.lock:
+            if key in self.readers:
+                self.hits += 1
+                self.readers.move_to_end(key)
+                return self.readers[key][0]
+
+            # Loading under the lock keeps concurrent pages from building the same model twice
+            log.info("🌍 Loading OCR reader for languages %s", list(key))
+            reader = self.loader(key)
+            self.loads += 1
+            self.readers[key] = (reader, model_size_mb(reader))
+            self._evict()
+            return reader
+
+    def resident_mb(self):
+        return sum(size for _, size in self.readers.values())
+
+    def _evict(self):
+        """Drop least recently used readers until under the cap; the newest always stays"""
+        evicted = False
+        for key in list(self.readers)[:-1]:
+            if self.resident_mb() <= self.memory_cap_mb:
+                break
+            if key in self.pinned:
+                continue
+            del self.readers[key]
+            self.evictions += 1
+            evicted = True
+            log.info("♻️ Evicted OCR reader for languages %s", list(key))
+        if evicted:
+            gc.collect()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "memory_cap_mb": self.memory_cap_mb,
+                "resident_mb": round(self.resident_mb(), 1),
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "readers": {'+'.join(key): round(size, 1) for key, (_, size) in self.readers.items()},
+            }
@@ -0,0 +1,164 @@
+import ctypes
+import ctypes.util
+import math
+import os
+
+from kyc_log import get_logger
+
+log = get_logger('runtime_tuning')
+
+# Thread and allocator settings sized to the container, not the host.
+# torch defaults to one intra-op thread per host core; under a cgroup CPU
+# quota those threads get throttled together and inference slows down.
+# The CPU budget is the smallest of the cgroup quota (v2 cpu.max or v1
+# cfs_quota_us/cfs_period_us) and the scheduler affinity mask.
+#
+# configure_environment() must run before torch is imported (app.py calls it
+# ahead of `import easyocr`) because OpenMP and MKL read their thread counts
+# once at load. configure_torch() runs once torch is loaded.
+#
+# Passport pages are OCRed concurrently (app.process_passport_pages) and each
+# inference call runs its own intra-op threads, so the budget is shared:
+# page workers x intra-op threads stays within the CPUs. Logged as total_threads.
+#
+#   KYC_MAX_PAGE_WORKERS       concurrent pages (default: CPU budget, at most 4)
+#   KYC_TORCH_THREADS          intra-op threads per page (default: CPU budget / page workers)
+#   KYC_TORCH_INTEROP_THREADS  inter-op threads (default: 1, EasyOCR runs ops in sequence)
+#   KYC_MALLOC_ARENAS          glibc malloc arenas (default: from CPU budget and memory limit)
+#
+# Variables already set in the environment (OMP_NUM_THREADS, ...) are left alone.
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# Below this memory limit each extra malloc arena's retained pages matter
+SMALL_MEMORY_BYTES = 4 * 1024 ** 3
+MAX_ARENAS = 4
+
+DEFAULT_PAGE_WORKERS = 4
+
+# mallopt() parameter number from glibc's malloc.h
+M_ARENA_MAX = -8
+
+_config = None
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root=CGROUP_ROOT):
+    """CPUs allowed by the cgroup quota, or None when unlimited or not in a cgroup"""
+    cpu_max = _read(os.path.join(root, 'cpu.max'))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(root, 'cpu', 'cpu.cfs_quota_us'))
+    period = _read(os.path.join(root, 'cpu', 'cpu.cfs_period_us'))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit(root=CGROUP_ROOT):
+    """Memory limit of the cgroup in bytes, or None when unlimited"""
+    limit = _read(os.path.join(root, 'memory.max'))
+    if limit is None:
+        limit = _read(os.path.join(root, 'memory', 'memory.limit_in_bytes'))
+    if not limit or limit == 'max':
+        return None
+    limit = int(limit)
+    # cgroup v1 reports "unlimited" as a page-aligned huge number
+    return limit if limit < 2 ** 60 else None
+
+
+def cpu_budget(root=CGROUP_ROOT):
+    """Whole CPUs this process can actually keep busy"""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    quota = cgroup_cpu_limit(root)
+    if quota is not None:
+        available = min(available, max(1, math.floor(quota)))
+    return max(1, available)
+
+
+def plan(root=CGROUP_ROOT):
+    """Chosen settings for this container, env overrides applied"""
+    cpus = cpu_budget(root)
+    memory_limit = cgroup_memory_limit(root)
+    if memory_limit is not None and memory_limit < SMALL_MEMORY_BYTES:
+        arenas = min(cpus, 2)
+    else:
+        arenas = min(cpus, MAX_ARENAS)
+    page_workers = max(1, int(os.getenv('KYC_MAX_PAGE_WORKERS', min(cpus, DEFAULT_PAGE_WORKERS))))
+    intra_op_threads = max(1, int(os.getenv('KYC_TORCH_THREADS', cpus // page_workers)))
+    return {
+        "cpu_quota": cgroup_cpu_limit(root),
+        "memory_limit_mb": None if memory_limit is None else memory_limit // 2 ** 20,
+        "cpus": cpus,
+        "page_workers": page_workers,
+        "intra_op_threads": intra_op_threads,
+        "total_threads": page_workers * intra_op_threads,
+        "inter_op_threads": int(os.getenv('KYC_TORCH_INTEROP_THREADS', '1')),
+        "malloc_arenas": int(os.getenv('KYC_MALLOC_ARENAS', arenas)),
+    }
+
+
+def _set_malloc_arenas(arenas):
+    """MALLOC_ARENA_MAX is only read at process start; mallopt() applies it now"""
+    os.environ.setdefault('MALLOC_ARENA_MAX', str(arenas))
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return False
+    try:
+        libc = ctypes.CDLL(libc_name)
+        return bool(libc.mallopt(M_ARENA_MAX, int(os.environ['MALLOC_ARENA_MAX'])))
+    except (OSError, AttributeError):
+        # Not glibc (e.g. musl or macOS)
+        return False
+
+
+def configure_environment():
+    """Set OpenMP/MKL threads and malloc arenas; call before importing torch"""
+    global _config
+    if _config is not None:
+        return _config
+    config = plan()
+    threads = str(config["intra_op_threads"])
+    for key in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ.setdefault(key, threads)
+    config["omp_num_threads"] = os.environ['OMP_NUM_THREADS']
+    config["mallopt"] = _set_malloc_arenas(config["malloc_arenas"])
+    _config = config
+    return config
+
+
+def configure_torch():
+    """Apply the thread plan to a loaded torch and log the final configuration"""
+    config = configure_environment()
+    if "torch_threads" in config:
+        return config
+    try:
+        import torch
+    except ImportError:
+        config["torch_threads"] = config["torch_interop_threads"] = None
+    else:
+        torch.set_num_threads(config["intra_op_threads"])
+        try:
+            torch.set_num_interop_threads(config["inter_op_threads"])
+        except RuntimeError:
+            # Only allowed before the first inter-op parallel work; keep what is running
+            pass
+        config["torch_threads"] = torch.get_num_threads()
+        config["torch_interop_threads"] = torch.get_num_interop_threads()
+    log.info("⚙️ Runtime tuned for %d CPU(s): %d page worker(s) x %d torch thread(s)",
+             config["cpus"], config["page_workers"], config["intra_op_threads"],
+             extra={"fields": {"runtime": config}})
+    return config
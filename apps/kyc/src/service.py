@@ -0,0 +1,244 @@
+import base64
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import initialize_ocr, process_passport
+from kyc_log import get_logger
+from ocr_profiles import stage_profile
+from pipeline import pipelined_readtext
+
+log = get_logger('service')
+
+# Local HTTP verification service for off-chain pre-screening.
+#
+#   POST /verify   raw image body, or JSON {"images": [<base64>, ...]}
+#                  -> one JSON line per image, streamed as each completes
+#   GET  /metrics  queue depth, batch sizes and latency percentiles
+#   GET  /health
+#
+# Concurrent requests are gathered into micro-batches within a short time
+# window and run through one shared Reader with detection and recognition
+# pipelined across the batch.
+
+HOST = os.getenv('KYC_SERVICE_HOST', '127.0.0.1')
+PORT = int(os.getenv('KYC_SERVICE_PORT', '8080'))
+# How long the first request of a batch waits for others to join
+BATCH_WINDOW = float(os.getenv('KYC_BATCH_WINDOW_MS', '20')) / 1000
+MAX_BATCH_SIZE = int(os.getenv('KYC_MAX_BATCH_SIZE', '8'))
+# Largest request body accepted; a JSON batch carries its images in base64
+MAX_REQUEST_BYTES = int(os.getenv('KYC_MAX_REQUEST_BYTES', str(32 * 1024 * 1024)))
+# Latencies kept for the percentiles on /metrics
+LATENCY_WINDOW = 1000
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class ServiceMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record_batch(self, size):
+        with self.lock:
+            self.batches += 1
+            self.batch_sizes[size] += 1
+
+    def record_result(self, latency, failed=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += int(failed)
+            self.latencies.append(latency)
+
+    def snapshot(self, queue_depth):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            batched = sum(size * count for size, count in self.batch_sizes.items())
+            return {
+                "queue_depth": queue_depth,
+                "requests_total": self.requests,
+                "errors_total": self.errors,
+                "batches_total": self.batches,
+                "batch_size_mean": batched / self.batches if self.batches else None,
+                "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                "latency_seconds": {
+                    "p50": percentile(latencies, 0.50),
+                    "p90": percentile(latencies, 0.90),
+                    "p99": percentile(latencies, 0.99),
+                    "max": latencies[-1] if latencies else None,
+                },
+            }
+
+
+class MicroBatcher:
+    """Gathers submitted images into micro-batches processed by one worker thread"""
+
+    def __init__(self, reader, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+        self.reader = reader
+        self.window = window
+        self.max_batch_size = max(1, max_batch_size)
+        self.pending = queue.Queue()
+        self.metrics = ServiceMetrics()
+        self.worker = threading.Thread(target=self._run, name="kyc-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, image_bytes):
+        future = Future()
+        self.pending.put((image_bytes, future, time.perf_counter()))
+        return future
+
+    def _next_batch(self):
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            self.metrics.record_batch(len(batch))
+            try:
+                self._process(batch)
+            except Exception as batch_error:
+                for _, future, submitted in batch:
+                    if not future.done():
+                        future.set_exception(batch_error)
+                        self.metrics.record_result(time.perf_counter() - submitted, failed=True)
+
+    def _process(self, batch):
+        work_dir = tempfile.mkdtemp(prefix='kyc-batch-')
+        try:
+            paths = []
+            for n, (image_bytes, _, _) in enumerate(batch):
+                path = os.path.join(work_dir, f'upload_{n}.img')
+                with open(path, 'wb') as f:
+                    f.write(image_bytes)
+                paths.append(path)
+
+            _, page_options = stage_profile("page")
+            for index, results in pipelined_readtext(self.reader, paths, **page_options):
+                _, future, submitted = batch[index]
+                try:
+                    if isinstance(results, Exception):
+                        raise results
+                    result = process_passport(paths[index], self.reader, ocr_results=results)
+                    result["image_processed"] = "upload"
+                    future.set_result(result)
+                    self.metrics.record_result(time.perf_counter() - submitted)
+                except Exception as image_error:
+                    future.set_exception(image_error)
+                    self.metrics.record_result(time.perf_counter() - submitted, failed=True)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class VerifyHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # Access log through kyc_log instead of stderr
+        log.debug("🌐 %s %s", self.address_string(), format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            batcher = self.server.batcher
+            self._send_json(200, batcher.metrics.snapshot(batcher.pending.qsize()))
+        elif self.path == '/health':
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != '/verify':
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_REQUEST_BYTES:
+            # The body is left unread, so this connection cannot carry another request
+            self.close_connection = True
+            if length < 0:
+                self._send_json(400, {"error": "Invalid Content-Length"})
+            else:
+                self._send_json(413, {"error": f"Request body over {MAX_REQUEST_BYTES} bytes"})
+            return
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                images = [base64.b64decode(image) for image in json.loads(body)["images"]]
+            else:
+                images = [body]
+        except Exception as request_error:
+            self._send_json(400, {"error": f"Invalid request: {request_error}"})
+            return
+        if not images or not all(images):
+            self._send_json(400, {"error": "No image data"})
+            return
+
+        futures = {self.server.batcher.submit(image): index for index, image in enumerate(images)}
+
+        # Stream one JSON line per image as soon as its result is ready
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        for future in as_completed(futures):
+            line = {"index": futures[future]}
+            try:
+                line["result"] = future.result()
+            except Exception as image_error:
+                line["error"] = str(image_error)
+            self.wfile.write((json.dumps(line) + "\n").encode())
+            self.wfile.flush()
+
+
+def serve(host=HOST, port=PORT, reader=None):
+    if reader is None:
+        reader = initialize_ocr()
+    if not reader:
+        raise Exception("Failed to initialize OCR reader")
+
+    server = ThreadingHTTPServer((host, port), VerifyHandler)
+    server.batcher = MicroBatcher(reader)
+    log.info("🌐 KYC verification service on http://%s:%d (batch window %.0fms, max batch %d)",
+             host, port, BATCH_WINDOW * 1000, MAX_BATCH_SIZE)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
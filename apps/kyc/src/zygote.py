@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import deadline
+from kyc_log import get_logger
+
+log = get_logger('zygote')
+
+# Pre-warmed fork server ("zygote") for non-TEE staging and high-volume runs.
+# The parent imports the OCR stack once, builds the EasyOCR Reader and runs a
+# warmup inference, then forks one child per task. Each child inherits the
+# loaded models copy-on-write, so per-task latency is OCR time only.
+#
+#   python src/zygote.py serve            # long-lived parent
+#   python src/zygote.py submit           # per task: forwards IEXEC_* to the parent
+#
+# Requests and replies are one JSON line each over a local Unix socket.
+
+SOCKET_PATH = os.getenv('KYC_ZYGOTE_SOCKET', '/tmp/kyc-zygote.sock')
+
+# Environment forwarded from the task to the forked child
+TASK_ENV = ('IEXEC_IN', 'IEXEC_OUT', 'IEXEC_DATASET_FILENAME')
+
+WARMUP_IMAGE = os.path.join(os.path.dirname(__file__), '..', 'test-image.png')
+
+
+def warmup(reader):
+    """Run one inference so weights are paged in and allocators are primed"""
+    import numpy as np
+    import torch
+
+    # Warm up single-threaded: forking after OpenMP has started its thread
+    # team can deadlock the child, and the child picks its own thread count
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        if os.path.exists(WARMUP_IMAGE):
+            reader.readtext(WARMUP_IMAGE, detail=1)
+        else:
+            reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8), detail=1)
+    finally:
+        torch.set_num_threads(threads)
+    return threads
+
+
+def _run_task(conn, request, app, reader, threads):
+    """Child process: point the app at the task's directories and run it"""
+    import torch
+
+    torch.set_num_threads(threads)
+    for key in TASK_ENV:
+        if request.get(key) is not None:
+            os.environ[key] = request[key]
+    app.IEXEC_IN = os.environ.get('IEXEC_IN', 'input')
+    app.IEXEC_OUT = os.environ.get('IEXEC_OUT')
+    sys.argv = ['app.py'] + list(request.get('args', []))
+
+    start = time.perf_counter()
+    replied = threading.Lock()
+
+    def reply(status):
+        # Sent once: by the task, or by the deadline watchdog before it exits
+        if not replied.acquire(blocking=False):
+            return
+        message = {"status": status, "pid": os.getpid(), "elapsed": time.perf_counter() - start}
+        conn.sendall((json.dumps(message) + "\n").encode())
+
+    deadline.add_exit_hook(lambda: reply("deadline"))
+    status = "ok"
+    try:
+        app.main(reader)
+    except BaseException as task_error:
+        log.error("❌ Zygote task failed: %s", task_error)
+        status = "error"
+    reply(status)
+
+
+def _reap_children():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def serve(socket_path=SOCKET_PATH):
+    """Load and warm up the OCR stack, then fork a child per incoming task"""
+    start = time.perf_counter()
+    import app
+
+    reader = app.initialize_ocr()
+    if not reader:
+        raise Exception("Failed to initialize OCR reader")
+    threads = warmup(reader)
+    log.info("🧬 Zygote ready in %.1fs, listening on %s", time.perf_counter() - start, socket_path)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    signal.signal(signal.SIGCHLD, lambda *_: _reap_children())
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    request = json.loads(conn.makefile('r').readline())
+                    if not isinstance(request, dict):
+                        raise ValueError(f"expected a JSON object, got {type(request).__name__}")
+                except (ValueError, OSError) as request_error:
+                    # A bad or vanished client must not stop the server
+                    log.warning("🧬 Rejected zygote request: %s", request_error)
+                    try:
+                        conn.sendall((json.dumps({"status": "error"}) + "\n").encode())
+                    except OSError:
+                        pass
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    server.close()
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    try:
+                        _run_task(conn, request, app, reader, threads)
+                    finally:
+                        sys.stdout.flush()
+                        sys.stderr.flush()
+                        os._exit(0)
+                log.info("🧬 Forked task %d", pid)
+    finally:
+        server.close()
+        os.remove(socket_path)
+
+
+def submit(socket_path=SOCKET_PATH, args=()):
+    """Hand the current task's IEXEC_* environment to the zygote and wait for it"""
+    request = {key: os.environ.get(key) for key in TASK_ENV}
+    request["args"] = list(args)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + "\n").encode())
+        reply = client.makefile('r').readline()
+    if not reply:
+        raise Exception("Zygote closed the connection without a reply")
+    return json.loads(reply)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warmed fork server for the KYC app")
+    parser.add_argument('command', choices=['serve', 'submit'])
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    parser.add_argument('args', nargs='*')
+    options = parser.parse_args()
+
+    if options.command == 'serve':
+        serve(options.socket)
+    else:
+        reply = submit(options.socket, options.args)
+        print(f"🧬 Task {reply.get('pid')} finished with status {reply['status']} in {reply.get('elapsed', 0):.2f}s")
+        # The deadline fallback still wrote result.json and computed.json
+        sys.exit(0 if reply["status"] in ("ok", "deadline") else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for MRZ data line validation and check-digit-driven correction,
+on the ICAO 9303 specimen passport (Utopia, Anna Maria Eriksson)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from mrz import TD3_LINE_LENGTH, correct_data_line, find_data_line, is_valid, read_data_line
+
+SPECIMEN = 'L898902C36UTO7408122F1204159ZE184226B<<<<<10'
+
+
+def misread(position, char, line=SPECIMEN):
+    return line[:position] + char + line[position + 1:]
+
+
+def line_of(*fragments):
+    """An assembled OCR line made of (text, confidence) fragments"""
+    return {
+        "text": ' '.join(text for text, _ in fragments),
+        "confidence": sum(confidence for _, confidence in fragments) / len(fragments),
+        "fragments": list(fragments),
+    }
+
+
+def test_valid_line():
+    assert is_valid(SPECIMEN)
+    result = read_data_line([line_of((SPECIMEN, 0.8))])
+    assert result["valid"] and result["substitutions"] == 0
+    assert result["fields"] == {
+        "document_number": "L898902C3",
+        "nationality": "UTO",
+        "birth_date": "74-08-12",
+        "sex": "F",
+        "expiry_date": "12-04-15",
+    }
+
+
+def test_repaired_check_digit_fields():
+    # 4 read as A in the birth date, 2 as Z in its check digit, 6 as G in
+    # the document number's check digit
+    for position, char in ((14, 'A'), (19, 'Z'), (9, 'G')):
+        read = misread(position, char)
+        assert not is_valid(read)
+        assert correct_data_line(read, [0.95] * TD3_LINE_LENGTH) == (SPECIMEN, 1)
+
+
+def test_nationality_must_be_a_known_code():
+    # O read as 0: UTD and UTQ pass the (absent) checks too, but are no country
+    read = misread(12, '0')
+    confidences = [0.95] * 10 + [0.6] * 3 + [0.95] * 31
+    assert correct_data_line(read, confidences) == (SPECIMEN, 1)
+
+
+def test_unverifiable_twin_of_a_confident_read_is_not_ambiguity():
+    # L at position 0 has a 1 twin that passes every check; read with 0.95
+    # confidence it is no reason to escalate
+    read = misread(12, '0')
+    result = read_data_line([line_of((read[:22], 0.95), (read[22:], 0.95))])
+    assert result["valid"] and result["substitutions"] == 1
+    assert result["fields"]["nationality"] == "UTO"
+
+
+def test_ambiguous_line_is_left_for_the_reread():
+    # Read with middling confidence, L or 1 at position 0 is a real question
+    read = misread(12, '0')
+    assert correct_data_line(read, [0.8] * TD3_LINE_LENGTH) is None
+    result = read_data_line([line_of((read[:22], 0.6), (read[22:], 0.95))])
+    assert result == {"valid": False, "fields": None, "substitutions": 0}
+
+
+def test_fragment_confidences_reach_their_characters():
+    text, confidences = find_data_line([line_of((SPECIMEN[:13], 0.95), (SPECIMEN[13:], 0.5))])
+    assert text == SPECIMEN
+    assert confidences == [0.95] * 13 + [0.5] * 31
+    # Without fragments every character gets the line's confidence
+    text, confidences = find_data_line([{"text": SPECIMEN, "confidence": 0.7}])
+    assert confidences == [0.7] * TD3_LINE_LENGTH
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
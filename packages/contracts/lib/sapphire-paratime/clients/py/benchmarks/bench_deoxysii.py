@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Deoxys-II-256-128 throughput for payload sizes from 64 B to 1 MB, for the
+scalar implementation and, when NumPy is installed, the vectorized one.
+
+Time per byte should stay flat as payloads grow: sealing is linear in the
+message length, so MB/s at 1 MB should match MB/s at 4 KB. The vectorized
+implementation hands payloads under VECTOR_MIN_BLOCKS blocks to the scalar
+code, so both rows match for the smallest sizes.
+
+Usage: python benchmarks/bench_deoxysii.py [min seconds per size]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sapphirepy.deoxysii import DeoxysII, NONCE_SIZE, TAG_SIZE
+
+try:
+    from sapphirepy.deoxysii_numpy import DeoxysIINumpy
+except ImportError:
+    DeoxysIINumpy = None
+
+SIZES = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+
+def measure(fn, min_seconds):
+    """Seconds per call, repeating until at least min_seconds have passed"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    min_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    key = os.urandom(32)
+    nonce = os.urandom(NONCE_SIZE)
+    ciphers = [DeoxysII(key)]
+    if DeoxysIINumpy is not None:
+        ciphers.append(DeoxysIINumpy(key))
+
+    print(f"{'implementation':<14} {'size':>9} {'seal ms':>10} {'open ms':>10} "
+          f"{'seal MB/s':>10} {'open MB/s':>10} {'us/KB':>8}")
+    for cipher in ciphers:
+        for size in SIZES:
+            msg = os.urandom(size)
+            sealed = bytearray(size + TAG_SIZE)
+            opened = bytearray(size)
+            seal = measure(lambda: cipher.encrypt(nonce, sealed, None, msg), min_seconds)
+            assert cipher.decrypt(nonce, opened, None, sealed) and opened == msg
+            unseal = measure(lambda: cipher.decrypt(nonce, opened, None, sealed), min_seconds)
+            print(f"{cipher.implementation:<14} {size:>9} {seal * 1e3:10.3f} {unseal * 1e3:10.3f} "
+                  f"{size / seal / 1e6:10.3f} {size / unseal / 1e6:10.3f} {seal / size * 1024 * 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
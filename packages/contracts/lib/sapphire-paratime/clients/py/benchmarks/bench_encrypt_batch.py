@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Payloads per second sealed by encrypt_batch() against one
+TransactionCipher per payload (what _encrypt_tx_params does per request),
+for several key_reuse settings, serially and on a process pool.
+
+Usage: python benchmarks/bench_encrypt_batch.py [payloads] [calldata_bytes] [processes]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nacl.public import PrivateKey
+
+from sapphirepy.envelope import TransactionCipher, encrypt_batch
+
+KEY_REUSE = [1, 16, 256]
+
+
+def rate(seal, count):
+    start = time.perf_counter()
+    seal()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 68
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+    peer = '0x' + bytes(PrivateKey.generate().public_key).hex()
+    payloads = [os.urandom(size) for _ in range(count)]
+
+    baseline = rate(lambda: [TransactionCipher(peer, 1).encrypt(p) for p in payloads], count)
+    print(f"{count} payloads of {size} B, {processes} process(es)")
+    print(f"{'path':>24} {'payloads/s':>11} {'speedup':>8}")
+    print(f"{'per-call':>24} {baseline:11.0f} {1:8.2f}")
+    for key_reuse in KEY_REUSE:
+        serial = rate(lambda: encrypt_batch(peer, 1, payloads, key_reuse), count)
+        print(f"{f'batch key_reuse={key_reuse}':>24} {serial:11.0f} {serial / baseline:8.2f}")
+    with ProcessPoolExecutor(processes) as executor:
+        # Start the workers before timing
+        encrypt_batch(peer, 1, payloads[:processes], executor=executor)
+        for key_reuse in KEY_REUSE:
+            pooled = rate(lambda: encrypt_batch(peer, 1, payloads, key_reuse, executor), count)
+            print(f"{f'pool key_reuse={key_reuse}':>24} {pooled:11.0f} {pooled / baseline:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
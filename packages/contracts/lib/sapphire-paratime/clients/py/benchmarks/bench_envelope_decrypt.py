@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Latency and memory of decrypting eth_call responses with
+TransactionCipher.decrypt() for growing return payloads. Peak traced
+memory is reported as a multiple of the payload size, i.e. how many
+payload-sized buffers were alive at once.
+
+Usage: python benchmarks/bench_envelope_decrypt.py [size ...]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import cbor2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nacl.public import PrivateKey
+
+from sapphirepy.deoxysii import NONCE_SIZE, TAG_SIZE
+from sapphirepy.envelope import TransactionCipher
+
+SIZES = [1024, 16384, 65536]
+
+
+def response(cipher, payload):
+    """What the node returns for a successful eth_call, sealed to the caller"""
+    nonce = os.urandom(NONCE_SIZE)
+    inner = cbor2.dumps({'ok': payload})
+    sealed = bytearray(len(inner) + TAG_SIZE)
+    cipher.cipher.encrypt(nonce, sealed, None, inner)
+    return cbor2.dumps({'ok': {'nonce': nonce, 'data': bytes(sealed)}})
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    peer = PrivateKey.generate()
+    cipher = TransactionCipher('0x' + bytes(peer.public_key).hex(), 1)
+
+    print(f"{'payload':>9} {'ms':>9} {'peak/payload':>13}")
+    for size in sizes:
+        payload = os.urandom(size)
+        sealed = response(cipher, payload)
+        assert cipher.decrypt(sealed) == payload
+
+        start = time.perf_counter()
+        cipher.decrypt(sealed)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        base, _ = tracemalloc.get_traced_memory()
+        cipher.decrypt(sealed)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{size:>9} {elapsed * 1e3:9.2f} {(peak - base) / size:13.2f}")
+
+
+if __name__ == "__main__":
+    main()
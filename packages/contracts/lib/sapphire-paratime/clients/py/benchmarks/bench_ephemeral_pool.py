@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Per-request encryption time of the Sapphire middleware with and without an
+EphemeralKeyPool: obtaining a TransactionCipher and sealing the calldata,
+as _encrypt_tx_params does. Requests are spaced by a simulated RPC round
+trip, during which the pool's worker thread refills.
+
+Usage: python benchmarks/bench_ephemeral_pool.py [requests] [gap_ms] [calldata_bytes]
+"""
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nacl.public import PrivateKey
+
+from sapphirepy.envelope import TransactionCipher, EphemeralKeyPool
+
+
+def percentile(timings, q):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(requests, gap, calldata, new_cipher):
+    """(time to get a cipher, time to get it and encrypt) per request"""
+    acquire, total = [], []
+    for _ in range(requests):
+        time.sleep(gap)
+        start = time.perf_counter()
+        cipher = new_cipher()
+        acquired = time.perf_counter()
+        cipher.encrypt(calldata)
+        done = time.perf_counter()
+        acquire.append(acquired - start)
+        total.append(done - start)
+    return acquire, total
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    gap = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1e3
+    calldata = os.urandom(int(sys.argv[3]) if len(sys.argv) > 3 else 68)
+    peer = '0x' + bytes(PrivateKey.generate().public_key).hex()
+
+    inline = run(requests, gap, calldata, lambda: TransactionCipher(peer, 1))
+    with EphemeralKeyPool(peer, 1) as pool:
+        # Let the worker fill the pool before the first request
+        time.sleep(0.5)
+        pooled = run(requests, gap, calldata, pool.take)
+
+    print(f"{requests} requests, {len(calldata)} B calldata, {gap * 1e3:.1f} ms between requests")
+    print(f"{'':>8} {'stage':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, timings in (('inline', inline), ('pool', pooled)):
+        for stage, values in zip(('cipher', 'total'), timings):
+            print(f"{name:>8} {stage:>8} {percentile(values, 0.5) * 1e3:8.3f} "
+                  f"{percentile(values, 0.99) * 1e3:8.3f} {statistics.mean(values) * 1e3:8.3f}")
+    inline_total, pooled_total = inline[1], pooled[1]
+    print(f"total: p50 {percentile(inline_total, 0.5) / percentile(pooled_total, 0.5):.2f}x, "
+          f"p99 {percentile(inline_total, 0.99) / percentile(pooled_total, 0.99):.2f}x faster with the pool")
+
+
+if __name__ == "__main__":
+    main()
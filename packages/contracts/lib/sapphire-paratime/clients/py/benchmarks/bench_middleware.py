@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Per-call overhead of the Sapphire middleware for each intercepted method,
+and for signed eth_call queries, against an in-process endpoint that
+answers immediately, so only the encryption, envelope encoding, query
+signing and (for eth_call) response decryption are timed. Requires web3.
+
+Usage: python benchmarks/bench_middleware.py [calls] [calldata_bytes]
+"""
+
+import os
+import sys
+import time
+import statistics
+
+import cbor2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from eth_account import Account
+from hexbytes import HexBytes
+from nacl.public import PrivateKey, PublicKey
+from web3 import Web3
+from web3.types import RPCEndpoint
+
+from sapphirepy.deoxysii import DeoxysII, NONCE_SIZE, TAG_SIZE
+from sapphirepy.envelope import _derive_shared_secret
+from sapphirepy.sapphire import construct_sapphire_middleware
+
+# (label, method, whether the query is signed by an account)
+CASES = [
+    ('eth_sendTransaction', 'eth_sendTransaction', False),
+    ('eth_estimateGas', 'eth_estimateGas', False),
+    ('eth_call', 'eth_call', False),
+    ('eth_call (signed)', 'eth_call', True),
+]
+
+
+class Chain:
+    """The few Web3 calls a signed query makes, answered offline"""
+
+    class Eth:
+        chain_id = 0x5aff
+        block_number = 1000
+
+        @staticmethod
+        def get_transaction_count(address):
+            return 0
+
+        @staticmethod
+        def get_block(number):
+            return {'hash': HexBytes(bytes([number % 256]) * 32)}
+
+    eth = Eth()
+    to_wei = staticmethod(Web3.to_wei)
+    to_checksum_address = staticmethod(Web3.to_checksum_address)
+
+
+class Node:
+    """Answers each request as a Sapphire node would, without the network"""
+
+    def __init__(self):
+        self.sk = PrivateKey.generate()
+        self.calldata_public_key = {
+            'key': '0x' + bytes(self.sk.public_key).hex(),
+            'checksum': '0x', 'signature': '0x', 'epoch': 1,
+        }
+        # Time spent sealing responses, subtracted from the middleware's
+        self.elapsed = 0.0
+
+    def __call__(self, method, params):
+        if method == 'oasis_callDataPublicKey':
+            return {'result': self.calldata_public_key}
+        if method != 'eth_call':
+            return {'result': '0x01'}
+        start = time.perf_counter()
+        try:
+            return self._respond(params)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def _respond(self, params):
+        # Seal the response to the caller's ephemeral key. Signed queries
+        # carry a CBOR data pack around the envelope instead of hex
+        data = params[0]['data']
+        if isinstance(data, bytes):
+            body = cbor2.loads(data)['data']['body']
+        else:
+            body = cbor2.loads(bytes.fromhex(data[2:]))['body']
+        cipher = DeoxysII(_derive_shared_secret(PublicKey(body['pk']), self.sk))
+        nonce = os.urandom(NONCE_SIZE)
+        inner = cbor2.dumps({'ok': b'\x00' * 32})
+        sealed = bytearray(len(inner) + TAG_SIZE)
+        cipher.encrypt(nonce, sealed, None, inner)
+        return {'result': '0x' + cbor2.dumps({'ok': {'nonce': nonce, 'data': bytes(sealed)}}).hex()}
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    calldata = '0x' + os.urandom(int(sys.argv[2]) if len(sys.argv) > 2 else 68).hex()
+    node = Node()
+    account = Account.create()
+    unsigned = construct_sapphire_middleware()(node, Chain())
+    signed = construct_sapphire_middleware(account)(node, Chain())
+
+    print(f"{'method':>20} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for label, method, is_signed in CASES:
+        middleware = signed if is_signed else unsigned
+        sender = account.address if is_signed else None
+        timings = []
+        for _ in range(calls):
+            params = ({'from': sender, 'to': '0x' + '11' * 20, 'data': calldata},)
+            node.elapsed = 0.0
+            start = time.perf_counter()
+            middleware(RPCEndpoint(method), params)
+            timings.append(time.perf_counter() - start - node.elapsed)
+            # Leave the ephemeral key pool time to refill, as a real round trip would
+            time.sleep(0.005)
+        timings.sort()
+        print(f"{label:>20} {timings[len(timings) // 2] * 1e3:8.3f} "
+              f"{timings[min(len(timings) - 1, int(0.99 * len(timings)))] * 1e3:8.3f} "
+              f"{statistics.mean(timings) * 1e3:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Scaling of DeoxysII parallel mode: seal time for large payloads with the
+per-block work sharded across 1 (serial), 2, 4 ... worker processes.
+The pool is started and warmed before timing, as a long-lived cipher
+would have it.
+
+Usage: python benchmarks/bench_parallel_deoxysii.py [max processes] [size ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sapphirepy.deoxysii import DeoxysII, NONCE_SIZE, TAG_SIZE
+
+SIZES = [16384, 65536, 262144, 1048576]
+
+
+def seal_seconds(cipher, nonce, msg, repeats=3):
+    sealed = bytearray(len(msg) + TAG_SIZE)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        cipher.encrypt(nonce, sealed, None, msg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    max_processes = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    sizes = [int(size) for size in sys.argv[2:]] or SIZES
+    counts = [1] + [n for n in (2, 4, 8, 16) if n <= max_processes]
+    if max_processes not in counts:
+        counts.append(max_processes)
+
+    key, nonce = os.urandom(32), os.urandom(NONCE_SIZE)
+    print(f"{os.cpu_count()} CPU(s)")
+    print(f"{'size':>9} " + " ".join(f"{f'{n} proc s':>10} {'x':>5}" for n in counts))
+    ciphers = {n: DeoxysII(key, processes=n if n > 1 else None, parallel_min_bytes=0) for n in counts}
+    try:
+        for cipher in ciphers.values():
+            # Start and warm the pool outside the timings
+            cipher.encrypt(nonce, bytearray(4096 + TAG_SIZE), None, bytes(4096))
+        for size in sizes:
+            msg = os.urandom(size)
+            serial = seal_seconds(ciphers[1], nonce, msg)
+            row = [f"{size:>9}"]
+            for n in counts:
+                elapsed = serial if n == 1 else seal_seconds(ciphers[n], nonce, msg)
+                row.append(f"{elapsed:10.3f} {serial / elapsed:5.2f}")
+            print(" ".join(row))
+    finally:
+        for cipher in ciphers.values():
+            cipher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Peak memory of DeoxysII.seal_file()/open_file() against in-memory
+encrypt() as the payload grows. Each measurement runs in a fresh process
+and reports its peak RSS (ru_maxrss); seal_file should stay flat while
+encrypt() grows by two copies of the payload.
+
+Usage: python benchmarks/bench_seal_file.py [size ...]
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sapphirepy.deoxysii import DeoxysII, NONCE_SIZE, TAG_SIZE
+
+SIZES = [256 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+
+
+def child(mode, path):
+    cipher = DeoxysII(bytes(32))
+    nonce = bytes(NONCE_SIZE)
+    start = time.perf_counter()
+    if mode == 'seal_file':
+        cipher.seal_file(nonce, path, path + '.sealed')
+        assert cipher.open_file(nonce, path + '.sealed', path + '.opened')
+    else:
+        with open(path, 'rb') as handle:
+            msg = handle.read()
+        sealed = bytearray(len(msg) + TAG_SIZE)
+        cipher.encrypt(nonce, sealed, None, msg)
+        opened = bytearray(len(msg))
+        assert cipher.decrypt(nonce, opened, None, sealed)
+    elapsed = time.perf_counter() - start
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed)
+
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2], sys.argv[3])
+        return
+
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    print(f"{'size':>9} {'mode':<10} {'peak RSS MB':>12} {'seal+open s':>12}")
+    with tempfile.TemporaryDirectory() as root:
+        for size in sizes:
+            path = os.path.join(root, f'payload-{size}')
+            with open(path, 'wb') as handle:
+                handle.write(os.urandom(size))
+            for mode in ('encrypt', 'seal_file'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, path],
+                    check=True, capture_output=True, text=True,
+                ).stdout.split()
+                print(f"{size:>9} {mode:<10} {int(output[0]) / 1024:12.1f} {float(output[1]):12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,10 @@ SOFTWARE.
 import struct
 import array
 import hmac
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from typing import Union, Optional
 
 BLOCK_SIZE = 16
@@ -48,6 +52,14 @@ PREFIX_TAG      = 0x1 # 0001
 
 PREFIX_SHIFT = 4
 
+# Payloads shorter than this are sealed serially even in parallel mode:
+# below it, shipping shards to worker processes costs more than it saves.
+PARALLEL_MIN_BYTES = 32 * 1024
+
+# Bytes of a file mapped at once by seal_file()/open_file(); must be a
+# multiple of mmap.ALLOCATIONGRANULARITY since windows start at multiples of it
+FILE_CHUNK_SIZE = 1024 * 1024
+
 def xor_bytes(out:bytearray, a:Union[bytearray,bytes], b:Union[bytearray,bytes], n:int):
     assert len(out) >= n
     assert len(a) >= n
@@ -104,30 +116,64 @@ def xor_rc(t: bytearray, i: int):
     ])
     xor_bytes(t, t, rc, 8)
 
-def stk_derive_k(key:Union[bytes,bytearray]):
-    derived_k = [bytearray(STK_SIZE) for _ in range(STK_COUNT)]
-
-    tk2 = bytearray(key[16:32])  # Tk2 = W2
-    tk3 = bytearray(key[:16])    # Tk3 = W3
-
-    # i == 0
-    xor_bytes(derived_k[0], tk2, tk3, STK_SIZE)
-    xor_rc(derived_k[0], 0)
-
-    # i == 0 ... i == 16
-    i = 1
-    while i <= ROUNDS:
-        # Tk2(i+1) = h(LFSR2(Tk2(i)))
-        lfsr2(tk2)
-        stk_shuffle(tk2)
-
-        # Tk3(i+1) = h(LFSR3(Tk3(i)))
-        lfsr3(tk3)
-        stk_shuffle(tk3)
-
-        xor_bytes(derived_k[i], tk2, tk3, STK_SIZE)
-        xor_rc(derived_k[i], i)
-        i += 1
+# Table-driven tweakey schedule.
+#
+# The byte-level reference steps above are applied once at import time to
+# build lookup tables: 256-entry LFSR2/LFSR3 tables (used with
+# bytes.translate), the 17 powers of the h permutation, and the round
+# constants as 32-bit words. Derived keys are kept as STK_COUNT*4 big-endian
+# words, so per-block sub-tweak keys are one gather of the tweak through the
+# permutations followed by 68 word XORs. h has order 8, so only h^0..h^7 are
+# gathered and rounds 8-16 reuse them.
+
+def _byte_table(step) -> bytes:
+    table = bytearray(range(256))
+    for i in range(0, 256, STK_SIZE):
+        chunk = table[i:i+STK_SIZE]
+        step(chunk)
+        table[i:i+STK_SIZE] = chunk
+    return bytes(table)
+
+def _h_powers() -> list[bytes]:
+    # powers[i][k] is the position in Tk1 of byte k of h^i(Tk1)
+    perm = bytearray(range(STK_SIZE))
+    powers = [bytes(perm)]
+    for _ in range(ROUNDS):
+        stk_shuffle(perm)
+        powers.append(bytes(perm))
+    return powers
+
+def _rc_words(i:int) -> tuple[int, ...]:
+    rc = bytearray(STK_SIZE)
+    xor_rc(rc, i)
+    return struct.unpack('>LLLL', rc)
+
+LFSR2_TABLE = _byte_table(lfsr2)
+LFSR3_TABLE = _byte_table(lfsr3)
+H_POWERS = _h_powers()
+RC_WORDS = [_rc_words(i) for i in range(STK_COUNT)]
+
+H_ORDER = H_POWERS.index(H_POWERS[0], 1)
+assert STK_COUNT == 2 * H_ORDER + 1
+
+_H = itemgetter(*H_POWERS[1])
+# Tk1 through h^0..h^7 at once, read back as H_ORDER*4 words
+_TK1_GATHER = itemgetter(*[k for power in H_POWERS[:H_ORDER] for k in power])
+_TK1_WORDS = struct.Struct('>' + 'L' * (H_ORDER * 4))
+
+def stk_derive_k(key:Union[bytes,bytearray]) -> list[int]:
+    """Tk2 ^ Tk3 ^ RC for every round, as STK_COUNT*4 32-bit words"""
+    tk2 = bytes(key[16:32])  # Tk2 = W2
+    tk3 = bytes(key[:16])    # Tk3 = W3
+
+    derived_k = []
+    for i in range(STK_COUNT):
+        if i > 0:
+            # Tk2(i+1) = h(LFSR2(Tk2(i))), Tk3(i+1) = h(LFSR3(Tk3(i)))
+            tk2 = bytes(_H(tk2.translate(LFSR2_TABLE)))
+            tk3 = bytes(_H(tk3.translate(LFSR3_TABLE)))
+        for a, b, rc in zip(struct.unpack('>LLLL', tk2), struct.unpack('>LLLL', tk3), RC_WORDS[i]):
+            derived_k.append(a ^ b ^ rc)
 
     return derived_k
 
@@ -320,24 +366,29 @@ TE3 = array.array('I', [
 def uint8(x:int):
     return x & 0xFF
 
-def bc_encrypt(ciphertext:bytearray, derived_k:list[bytearray], tweak:bytearray, plaintext:Union[bytes,bytearray]):
-    assert len(plaintext) >= 16
-    assert len(derived_k) == STK_COUNT
-    assert len(derived_k[0]) == STK_SIZE
+def bc_encrypt_reference(ciphertext:bytearray, derived_k:list[int], tweak:bytearray, plaintext:Union[bytes,bytearray,memoryview], offset:int=0):
+    """
+    Encrypt the block at plaintext[offset:offset+16] into ciphertext[:16].
+
+    Callers walking a buffer pass the block offset instead of slicing, so
+    no block is ever copied on the way in.
+    """
+    assert len(plaintext) >= offset + 16
+    assert len(derived_k) == STK_COUNT * 4
     assert len(tweak) == TWEAK_SIZE
 
     # Derive all the Sub-Tweak Keys.
     stks = derive_sub_tweak_keys(derived_k, tweak)
 
     # AddRoundTweakKey (AES -> AddRoundKey)
-    s0, s1, s2, s3 = struct.unpack('>LLLL', plaintext[:16])
-    s0 = s0 ^ stks[0][0]
-    s1 = s1 ^ stks[0][1]
-    s2 = s2 ^ stks[0][2]
-    s3 = s3 ^ stks[0][3]
-
-    i = 1
-    while i <= ROUNDS:
+    s0, s1, s2, s3 = struct.unpack_from('>LLLL', plaintext, offset)
+    s0 = s0 ^ stks[0]
+    s1 = s1 ^ stks[1]
+    s2 = s2 ^ stks[2]
+    s3 = s3 ^ stks[3]
+
+    i = 4
+    while i < STK_COUNT * 4:
         # SubBytes, ShiftRows, MixBytes (AES -> MixColumns),
         # AddRoundTweakKey (AES -> AddRoundKey).
         #
@@ -347,238 +398,432 @@ def bc_encrypt(ciphertext:bytearray, derived_k:list[bytearray], tweak:bytearray,
               TE1[uint8(s1>>16)] ^
               TE2[uint8(s2>>8)] ^
               TE3[uint8(s3)] ^
-              stks[i][0])
+              stks[i+0])
 
         t1 = (TE0[uint8(s1>>24)] ^
               TE1[uint8(s2>>16)] ^
               TE2[uint8(s3>>8)] ^
               TE3[uint8(s0)] ^
-              stks[i][1])
+              stks[i+1])
 
         t2 = (TE0[uint8(s2>>24)] ^
               TE1[uint8(s3>>16)] ^
               TE2[uint8(s0>>8)] ^
               TE3[uint8(s1)] ^
-              stks[i][2])
+              stks[i+2])
 
         t3 = (TE0[uint8(s3>>24)] ^
               TE1[uint8(s0>>16)] ^
               TE2[uint8(s1>>8)] ^
               TE3[uint8(s2)] ^
-              stks[i][3])
+              stks[i+3])
 
         s0 = t0
         s1 = t1
         s2 = t2
         s3 = t3
-        i += 1
-
-    ciphertext[:16] = struct.pack('>LLLL', s0, s1, s2, s3)
+        i += 4
+
+    struct.pack_into('>LLLL', ciphertext, 0, s0, s1, s2, s3)
+
+def _pad_block(data:memoryview, offset:int) -> bytearray:
+    # pad10*(X*) of the trailing partial block starting at offset
+    remaining = len(data) - offset
+    block = bytearray(BLOCK_SIZE)
+    block[:remaining] = data[offset:]
+    block[remaining] = 0x80
+    return block
+
+def _xor_block_into(dst:Union[bytearray,memoryview], src:memoryview, offset:int, keystream:bytearray):
+    # dst[offset:offset+16] = src[offset:offset+16] ^ keystream, without slicing
+    k0, k1 = struct.unpack('>QQ', keystream)
+    m0, m1 = struct.unpack_from('>QQ', src, offset)
+    struct.pack_into('>QQ', dst, offset, m0 ^ k0, m1 ^ k1)
+
+def _nonce_block(nonce:Union[bytes,bytearray]) -> bytearray:
+    # 0x00 || N, the block encrypted for every keystream block
+    block = bytearray(BLOCK_SIZE)
+    block[1:] = nonce[:BLOCK_SIZE-1]
+    return block
+
+def _split_sealed(sealed:Union[bytes,bytearray,memoryview], out:Optional[Union[bytearray,memoryview]]) -> Optional[tuple[memoryview, memoryview, memoryview]]:
+    # (ciphertext, tag, dst) as views of the caller's buffers, or None if sealed is shorter than a tag
+    view = memoryview(sealed).cast('B')
+    ct_len = len(view) - TAG_SIZE
+    if ct_len < 0:
+        return None
+    ciphertext, tag = view[:ct_len], view[ct_len:]
+    dst = ciphertext if out is None else memoryview(out).cast('B')[:ct_len]
+    assert len(dst) == ct_len
+    return ciphertext, tag, dst
+
+def _verified(tag:memoryview, tag_p:bytearray, dst:memoryview) -> Optional[memoryview]:
+    # dst if the tags match, otherwise None with the plaintext written so far zeroed
+    if not hmac.compare_digest(tag, tag_p):
+        dst[:] = bytes(len(dst))
+        return None
+    return dst
 
 class DeoxysII:
-    derived_k:list[bytearray]
-    def __init__(self, key:Union[bytes,bytearray]):
+    derived_k:list[int]
+    def __init__(self, key:Union[bytes,bytearray], processes:Optional[int]=None, parallel_min_bytes:int=PARALLEL_MIN_BYTES):
+        """
+        processes enables parallel mode: the independent per-block work of
+        both passes over payloads of parallel_min_bytes or more is sharded
+        across that many worker processes. The pool starts on first use;
+        call close() (or use the cipher as a context manager) to stop it.
+        """
         self.derived_k = stk_derive_k(key)
+        self.processes = processes
+        self.parallel_min_bytes = parallel_min_bytes
+        self._pool:Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_derived_k(cls, derived_k:list[int]) -> 'DeoxysII':
+        cipher = cls.__new__(cls)
+        cipher.derived_k = derived_k
+        cipher.processes = None
+        cipher.parallel_min_bytes = PARALLEL_MIN_BYTES
+        cipher._pool = None
+        return cipher
 
     @property
     def implementation(self):
         return "vartime"
 
-    # pylint: disable=too-many-locals,too-many-branches,too-many-statements
-    def encrypt(self, nonce:Union[bytes,bytearray], dst:bytearray, ad:Optional[Union[bytes,bytearray]], msg:Optional[Union[bytes,bytearray]]):
-        assert len(nonce) == (BLOCK_SIZE-1)
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _shards(self, length:int) -> Optional[list[tuple[int, int]]]:
+        # Block-aligned (start, end) byte ranges, one per worker, or None to stay serial
+        if not self.processes or self.processes < 2 or not length or length < self.parallel_min_bytes:
+            return None
+        blocks = -(-length // BLOCK_SIZE)
+        per_shard = -(-blocks // self.processes) * BLOCK_SIZE
+        return [(start, min(start + per_shard, length)) for start in range(0, length, per_shard)]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Each worker receives the key schedule once, not with every shard
+            self._pool = ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(self.derived_k,))
+        return self._pool
+
+    def _auth_pass(self, auth:bytearray, data:memoryview, prefix_block:int, prefix_final:int, first:int=0):
+        shards = self._shards(len(data))
+        if shards is None:
+            self._auth_blocks(auth, data, prefix_block, prefix_final, first)
+            return
+        partials = self._executor().map(
+            _auth_shard,
+            [bytes(data[start:end]) for start, end in shards],
+            [first + start // BLOCK_SIZE for start, _ in shards],
+            [prefix_block] * len(shards), [prefix_final] * len(shards))
+        for partial in partials:
+            xor_bytes(auth, auth, partial, BLOCK_SIZE)
+
+    def _keystream_pass(self, dst:Union[bytearray,memoryview], src:memoryview, tag:Union[bytes,bytearray,memoryview], nonce_block:bytearray, first:int=0):
+        shards = self._shards(len(src))
+        if shards is None:
+            self._xor_keystream(dst, src, tag, nonce_block, first)
+            return
+        outputs = self._executor().map(
+            _keystream_shard,
+            [bytes(src[start:end]) for start, end in shards],
+            [first + start // BLOCK_SIZE for start, _ in shards],
+            [bytes(tag)] * len(shards), [bytes(nonce_block)] * len(shards))
+        for (start, end), output in zip(shards, outputs):
+            dst[start:end] = output
+
+    def _finalize_tag(self, tag:bytearray, nonce_block:bytearray):
+        # tag <- Ek(0001||0000||N, tag), leaving nonce_block as 0x00 || N
+        nonce_block[0] = PREFIX_TAG << PREFIX_SHIFT
+        bc_encrypt(tag, self.derived_k, nonce_block, tag)
+        nonce_block[0] = 0
+
+    def _auth_blocks(self, auth:bytearray, data:memoryview, prefix_block:int, prefix_final:int, first:int=0):
+        # Auth <- Auth ^ Ek(prefix||i, Xi+1) for every block, padded final block included;
+        # data starts at block number first
         tweak = bytearray(TWEAK_SIZE)
         tmp = bytearray(BLOCK_SIZE)
+        full = len(data) // BLOCK_SIZE
+        for i in range(full):
+            encode_tag_tweak(tweak, prefix_block, first + i)
+            bc_encrypt(tmp, self.derived_k, tweak, data, i * BLOCK_SIZE)
+            xor_bytes(auth, auth, tmp, BLOCK_SIZE)
+        if len(data) % BLOCK_SIZE:
+            encode_tag_tweak(tweak, prefix_final, first + full)
+            bc_encrypt(tmp, self.derived_k, tweak, _pad_block(data, full * BLOCK_SIZE))
+            xor_bytes(auth, auth, tmp, BLOCK_SIZE)
+
+    def _xor_keystream(self, dst:Union[bytearray,memoryview], src:memoryview, tag:Union[bytes,bytearray,memoryview], nonce_block:bytearray, first:int=0):
+        # Cj <- Mj ^ Ek(1||tag^j, 00000000||N), and the same for decryption;
+        # src starts at block number first
+        tweak = bytearray(TWEAK_SIZE)
+        keystream = bytearray(BLOCK_SIZE)
+        full, remaining = divmod(len(src), BLOCK_SIZE)
+        for j in range(full):
+            encode_enc_tweak(tweak, tag, first + j)
+            bc_encrypt(keystream, self.derived_k, tweak, nonce_block)
+            _xor_block_into(dst, src, j * BLOCK_SIZE, keystream)
+        if remaining:
+            encode_enc_tweak(tweak, tag, first + full)
+            bc_encrypt(keystream, self.derived_k, tweak, nonce_block)
+            offset = full * BLOCK_SIZE
+            for k in range(remaining):
+                dst[offset + k] = src[offset + k] ^ keystream[k]
+
+    def encrypt(self, nonce:Union[bytes,bytearray], dst:Union[bytearray,memoryview], ad:Optional[Union[bytes,bytearray]], msg:Optional[Union[bytes,bytearray]]):
+        assert len(nonce) == (BLOCK_SIZE-1)
+        msg_view = memoryview(msg if msg is not None else b'').cast('B')
 
         # Associated data.
         auth = bytearray(TAG_SIZE)
         if ad is not None:
-            ad_len = len(ad)
-            i = 0
-            while ad_len >= BLOCK_SIZE:
-                # 5. Auth <- Auth ^ Ek(0010||i, Ai+1)
-                encode_tag_tweak(tweak, PREFIX_AD_BLOCK, i)
-                bc_encrypt(tmp, self.derived_k, tweak, ad[i*16:])
-                xor_bytes(auth, auth, tmp, 16)
-                ad_len -= BLOCK_SIZE
-                i += 1
-            if ad_len > 0:
-                # 8. Auth <- Auth ^ Ek(0110||la, pad10*(A*))
-                encode_tag_tweak(tweak, PREFIX_AD_FINAL, i)
-                a_star = bytearray(16)
-                for a,b in enumerate(ad[len(ad)-ad_len:]):
-                    a_star[a] = b
-                a_star[ad_len] = 0x80
-                bc_encrypt(tmp, self.derived_k, tweak, a_star)
-                xor_bytes(auth, auth, tmp, 16)
+            # 5. Auth <- Auth ^ Ek(0010||i, Ai+1)
+            # 8. Auth <- Auth ^ Ek(0110||la, pad10*(A*))
+            self._auth_pass(auth, memoryview(ad).cast('B'), PREFIX_AD_BLOCK, PREFIX_AD_FINAL)
 
         # Message authentication and tag generation.
-        tag = auth[:]
-        if msg is not None:
-            msg_len = len(msg)
-            j = 0
-            while msg_len >= BLOCK_SIZE:
-                # 15. tag <- tag ^ Ek(0000||j, Mj+1)
-                encode_tag_tweak(tweak, PREFIX_MSG_BLOCK, j)
-                bc_encrypt(tmp, self.derived_k, tweak, msg[j*BLOCK_SIZE:])
-                xor_bytes(tag, tag, tmp, BLOCK_SIZE)
-                msg_len -= BLOCK_SIZE
-                j += 1
-            if msg_len > 0:
-                # 18. tag <- tag & Ek(0100||l, pad10*(M*))
-                encode_tag_tweak(tweak, PREFIX_MSG_FINAL, j)
-
-                m_star = bytearray(BLOCK_SIZE)
-                for a, b in enumerate(msg[len(msg)-msg_len:]):
-                    m_star[a] = b
-                m_star[msg_len] = 0x80
-
-                bc_encrypt(tmp, self.derived_k, tweak, m_star)
-                xor_bytes(tag, tag, tmp, BLOCK_SIZE)
+        # 15. tag <- tag ^ Ek(0000||j, Mj+1)
+        # 18. tag <- tag ^ Ek(0100||l, pad10*(M*))
+        tag = auth
+        self._auth_pass(tag, msg_view, PREFIX_MSG_BLOCK, PREFIX_MSG_FINAL)
 
         # 20. tag <- Ek(0001||0000||N, tag)
-        enc_nonce = bytearray(BLOCK_SIZE)
-        enc_nonce[1:] = nonce[:BLOCK_SIZE-1]
-        enc_nonce[0] = PREFIX_TAG << PREFIX_SHIFT
-        bc_encrypt(tag, self.derived_k, enc_nonce, tag)
+        enc_nonce = _nonce_block(nonce)
+        self._finalize_tag(tag, enc_nonce)
 
         # Message encryption.
-        enc_blk = bytearray(BLOCK_SIZE)
-        enc_nonce[0] = 0 # 0x00 || nonce
-        if msg is not None:
-            msg_len = len(msg)
-            j = 0
-            while msg_len >= BLOCK_SIZE:
-                # 24. Cj <- Mj ^ Ek(1||tag^j, 00000000||N)
-                encode_enc_tweak(tweak, tag, j)
-                bc_encrypt(enc_blk, self.derived_k, tweak, enc_nonce)
-                for k in range(16):
-                    dst[(j*16)+k] = msg[(j*16)+k] ^ enc_blk[k]
-                msg_len -= BLOCK_SIZE
-                j += 1
-            if msg_len > 0:
-                # 24. C* <- M* ^ Ek(1||tag^l, 00000000||N)
-                encode_enc_tweak(tweak, tag, j)
-                bc_encrypt(enc_blk, self.derived_k, tweak, enc_nonce)
-                for k in range(msg_len):
-                    dst[(j*16)+k] = msg[(j*16)+k] ^ enc_blk[k]
+        # 24. Cj <- Mj ^ Ek(1||tag^j, 00000000||N), then C* for the partial block
+        self._keystream_pass(dst, msg_view, tag, enc_nonce)
 
         dst[len(dst)-TAG_SIZE:] = tag
 
     def decrypt(self, nonce:Union[bytes,bytearray], dst:bytearray, ad:Optional[Union[bytes,bytearray]], ciphertext:Union[bytes,bytearray]):
-        assert len(nonce) == TAG_SIZE-1
         assert len(dst) == len(ciphertext) - TAG_SIZE
+        return self.decrypt_into(nonce, ciphertext, ad, dst) is not None
 
-        # Split out ct into ciphertext and tag.
-        ct_len = len(ciphertext) - TAG_SIZE
-        ciphertext, tag = ciphertext[:ct_len], ciphertext[ct_len:]
-
-        dec_tweak = bytearray(TWEAK_SIZE)
-        dec_blk = bytearray(BLOCK_SIZE)
-        dec_nonce = bytearray(BLOCK_SIZE)
-        dec_nonce[1:] = nonce  # 0x00 || nonce
-        j = 0
-        while ct_len >= BLOCK_SIZE:
-            # 4. Mj <- Cj ^ Ek(1||tag^j, 00000000||N)
-            encode_enc_tweak(dec_tweak, tag, j)
-            bc_encrypt(dec_blk, self.derived_k, dec_tweak, dec_nonce)
-            for k in range(16):
-                dst[(j*16)+k] = ciphertext[(j*16)+k] ^ dec_blk[k]
-            ct_len -= BLOCK_SIZE
-            j += 1
-        if ct_len > 0:
-            # 7. M* <- C* ^ Ek(1||tag^l, 00000000||N)
-            encode_enc_tweak(dec_tweak, tag, j)
-            bc_encrypt(dec_blk, self.derived_k, dec_tweak, dec_nonce)
-            for k in range(ct_len):
-                dst[(j*16)+k] = ciphertext[(j*16)+k] ^ dec_blk[k]
+    def decrypt_into(self, nonce:Union[bytes,bytearray], sealed:Union[bytes,bytearray,memoryview], ad:Optional[Union[bytes,bytearray]]=None, out:Optional[Union[bytearray,memoryview]]=None) -> Optional[memoryview]:
+        """
+        Decrypt sealed (ciphertext || tag) into out and return a view of the
+        plaintext, or None if the tag does not verify.
+
+        With out=None the plaintext overwrites the ciphertext inside sealed,
+        which must then be writable, and nothing payload-sized is allocated.
+        On failure the plaintext written so far is zeroed.
+        """
+        assert len(nonce) == TAG_SIZE-1
+
+        # Split out ct into ciphertext and tag, as views of the caller's buffer.
+        split = _split_sealed(sealed, out)
+        if split is None:
+            return None
+        ciphertext, tag, dst = split
+
+        # 4. Mj <- Cj ^ Ek(1||tag^j, 00000000||N)
+        # 7. M* <- C* ^ Ek(1||tag^l, 00000000||N)
+        # Each block is read before it is written, so dst may alias ciphertext.
+        dec_nonce = _nonce_block(nonce)
+        self._keystream_pass(dst, ciphertext, tag, dec_nonce)
 
         # Associated data.
         auth = bytearray(TAG_SIZE)
-        tweak = bytearray(TWEAK_SIZE)
-        tmp = bytearray(BLOCK_SIZE)
-
         if ad is not None:
-            ad_len = len(ad)
-            i = 0
-            while ad_len >= BLOCK_SIZE:
-                # 14. Auth <- Auth ^ Ek(0010||i, Ai+1)
-                encode_tag_tweak(tweak, PREFIX_AD_BLOCK, i)
-                bc_encrypt(tmp, self.derived_k, tweak, ad[i*BLOCK_SIZE:])
-                xor_bytes(auth, auth, tmp, BLOCK_SIZE)
-                ad_len -= BLOCK_SIZE
-                i += 1
-            if ad_len > 0:
-                # 17. Auth <- Auth ^ Ek(0110||la, pad10*(A*))
-                encode_tag_tweak(tweak, PREFIX_AD_FINAL, i)
-
-                a_star = bytearray(BLOCK_SIZE)
-                for a, b in enumerate(ad[len(ad)-ad_len:]):
-                    a_star[a] = b
-                a_star[ad_len] = 0x80
-
-                bc_encrypt(tmp, self.derived_k, tweak, a_star)
-                xor_bytes(auth, auth, tmp, BLOCK_SIZE)
+            # 14. Auth <- Auth ^ Ek(0010||i, Ai+1)
+            # 17. Auth <- Auth ^ Ek(0110||la, pad10*(A*))
+            self._auth_pass(auth, memoryview(ad).cast('B'), PREFIX_AD_BLOCK, PREFIX_AD_FINAL)
 
         # Message authentication and tag generation.
-        msg_len = len(dst)
-        tag_p = auth[:]
-        j = 0
-        while msg_len >= BLOCK_SIZE:
-            # 24. tag' <- tag' ^ Ek(0000||j, Mj+1)
-            encode_tag_tweak(tweak, PREFIX_MSG_BLOCK, j)
-            bc_encrypt(tmp, self.derived_k, tweak, dst[j*BLOCK_SIZE:])
-            xor_bytes(tag_p, tag_p, tmp, BLOCK_SIZE)
-            msg_len -= BLOCK_SIZE
-            j += 1
-        if msg_len > 0:
-            # 27. tag <- tag & Ek(0100||l, pad10*(M*))
-            encode_tag_tweak(tweak, PREFIX_MSG_FINAL, j)
-
-            m_star = bytearray(BLOCK_SIZE)
-            for a, b in enumerate(dst[len(dst)-msg_len:]):
-                m_star[a] = b
-            m_star[msg_len] = 0x80
-
-            bc_encrypt(tmp, self.derived_k, tweak, m_star)
-            xor_bytes(tag_p, tag_p, tmp, TAG_SIZE)
+        # 24. tag' <- tag' ^ Ek(0000||j, Mj+1)
+        # 27. tag' <- tag' ^ Ek(0100||l, pad10*(M*))
+        tag_p = auth
+        self._auth_pass(tag_p, dst, PREFIX_MSG_BLOCK, PREFIX_MSG_FINAL)
 
         # 29. tag' <- Ek(0001||0000||N, tag')
-        dec_nonce[0] = PREFIX_TAG << PREFIX_SHIFT
-        bc_encrypt(tag_p, self.derived_k, dec_nonce, tag_p)
+        self._finalize_tag(tag_p, dec_nonce)
 
         # Tag verification
-        return hmac.compare_digest(tag, tag_p)
+        return _verified(tag, tag_p, dst)
 
-def derive_sub_tweak_keys(derived_k:list[bytearray], t:bytearray):
-    assert len(derived_k) == STK_COUNT
-    assert len(t) >= TWEAK_SIZE
-
-    stks = [[0] * 4 for _ in range(STK_COUNT)]
+    def seal_file(self, nonce:Union[bytes,bytearray], src_path:str, dst_path:str, ad:Optional[Union[bytes,bytearray]]=None, chunk_size:int=FILE_CHUNK_SIZE):
+        """
+        encrypt() for files: writes ciphertext || tag of src_path to dst_path.
 
-    stk = bytearray(STK_SIZE)
+        Both passes read the input through chunk_size memory-mapped windows
+        and the output is written the same way, so peak memory does not grow
+        with the file size.
+        """
+        assert len(nonce) == (BLOCK_SIZE-1)
+        _check_chunk_size(chunk_size)
+        with open(src_path, 'rb') as src:
+            length = os.fstat(src.fileno()).st_size
+
+            # 5-18. Auth over AD, then tag over every message window
+            tag = bytearray(TAG_SIZE)
+            if ad is not None:
+                self._auth_pass(tag, memoryview(ad).cast('B'), PREFIX_AD_BLOCK, PREFIX_AD_FINAL)
+            for start, window in _mapped_windows(src, length, chunk_size, mmap.ACCESS_READ):
+                self._auth_pass(tag, window, PREFIX_MSG_BLOCK, PREFIX_MSG_FINAL, start // BLOCK_SIZE)
+
+            # 20. tag <- Ek(0001||0000||N, tag)
+            enc_nonce = _nonce_block(nonce)
+            self._finalize_tag(tag, enc_nonce)
+
+            # 24. Cj <- Mj ^ Ek(1||tag^j, 00000000||N), window by window
+            with open(dst_path, 'w+b') as dst:
+                dst.truncate(length + TAG_SIZE)
+                for (start, window), (_, out) in zip(
+                        _mapped_windows(src, length, chunk_size, mmap.ACCESS_READ),
+                        _mapped_windows(dst, length, chunk_size, mmap.ACCESS_WRITE)):
+                    self._keystream_pass(out, window, tag, enc_nonce, start // BLOCK_SIZE)
+                dst.seek(length)
+                dst.write(tag)
+
+    def open_file(self, nonce:Union[bytes,bytearray], src_path:str, dst_path:str, ad:Optional[Union[bytes,bytearray]]=None, chunk_size:int=FILE_CHUNK_SIZE) -> bool:
+        """
+        decrypt() for files sealed by seal_file(), through bounded memory-mapped
+        windows. On authentication failure dst_path is truncated to zero bytes,
+        so no unauthenticated plaintext is left behind, and False is returned.
+        """
+        assert len(nonce) == TAG_SIZE-1
+        _check_chunk_size(chunk_size)
+        with open(src_path, 'rb') as src, open(dst_path, 'w+b') as dst:
+            length = os.fstat(src.fileno()).st_size - TAG_SIZE
+            if length < 0:
+                return False
+            src.seek(length)
+            tag = src.read(TAG_SIZE)
+
+            # 4-7. Mj <- Cj ^ Ek(1||tag^j, 00000000||N), window by window
+            dec_nonce = _nonce_block(nonce)
+            dst.truncate(length)
+            for (start, window), (_, out) in zip(
+                    _mapped_windows(src, length, chunk_size, mmap.ACCESS_READ),
+                    _mapped_windows(dst, length, chunk_size, mmap.ACCESS_WRITE)):
+                self._keystream_pass(out, window, tag, dec_nonce, start // BLOCK_SIZE)
+
+            # 14-27. Auth over AD, then tag' over the plaintext just written
+            tag_p = bytearray(TAG_SIZE)
+            if ad is not None:
+                self._auth_pass(tag_p, memoryview(ad).cast('B'), PREFIX_AD_BLOCK, PREFIX_AD_FINAL)
+            for start, window in _mapped_windows(dst, length, chunk_size, mmap.ACCESS_READ):
+                self._auth_pass(tag_p, window, PREFIX_MSG_BLOCK, PREFIX_MSG_FINAL, start // BLOCK_SIZE)
+
+            # 29. tag' <- Ek(0001||0000||N, tag')
+            self._finalize_tag(tag_p, dec_nonce)
+
+            # Tag verification
+            if not hmac.compare_digest(tag, tag_p):
+                dst.truncate(0)
+                return False
+            return True
+
+def _check_chunk_size(chunk_size:int):
+    if chunk_size <= 0 or chunk_size % mmap.ALLOCATIONGRANULARITY:
+        raise ValueError(f'chunk_size must be a positive multiple of {mmap.ALLOCATIONGRANULARITY}')
+
+def _mapped_windows(f, length:int, chunk_size:int, access:int):
+    """(offset, memoryview) over successive chunk_size windows of the first length bytes of f"""
+    for start in range(0, length, chunk_size):
+        with mmap.mmap(f.fileno(), min(chunk_size, length - start), access=access, offset=start) as window:
+            with memoryview(window) as view:
+                yield start, view
+
+# Parallel mode workers. Each worker process holds one serial cipher built
+# from the key schedule handed over by the pool initializer.
+
+_worker_cipher:Optional[DeoxysII] = None  # pylint: disable=invalid-name
+
+def _init_worker(derived_k:list[int]):
+    global _worker_cipher  # pylint: disable=global-statement
+    _worker_cipher = DeoxysII.from_derived_k(derived_k)
+
+def _auth_shard(data:bytes, first:int, prefix_block:int, prefix_final:int) -> bytes:
+    """Partial Auth XOR-sum of the blocks first.. of one shard"""
+    assert _worker_cipher is not None
+    auth = bytearray(TAG_SIZE)
+    _worker_cipher._auth_blocks(auth, memoryview(data), prefix_block, prefix_final, first)  # pylint: disable=protected-access
+    return bytes(auth)
+
+def _keystream_shard(data:bytes, first:int, tag:bytes, nonce_block:bytes) -> bytes:
+    """One shard XORed with keystream blocks first.."""
+    assert _worker_cipher is not None
+    out = bytearray(len(data))
+    _worker_cipher._xor_keystream(out, memoryview(data), tag, bytearray(nonce_block), first)  # pylint: disable=protected-access
+    return bytes(out)
+
+def derive_sub_tweak_keys(derived_k:list[int], t:Union[bytes,bytearray]) -> list[int]:
+    """
+    Sub-Tweak Keys of all rounds as STK_COUNT*4 words, STK(i) = derived_k(i) ^ h^i(Tk1),
+    in the layout the table driven AES round function reads.
+    """
+    assert len(derived_k) == STK_COUNT * 4
+    assert len(t) >= TWEAK_SIZE
 
-    def write_stk(idx:int):
-        # Convert stk to a format that is easier to use with the
-        # table driven AES round function.
-        #
-        # Note: Other implementations can just return each
-        # Sub-Tweak Key as a 16 byte value.
-        stks[idx] = list(struct.unpack('>LLLL', stk[:16]))
-
-    tk1 = t[:TWEAK_SIZE] # Tk1 = W1
-
-    # i == 0
-    xor_bytes(stk, derived_k[0], tk1, STK_SIZE)
-    write_stk(0)
-
-    # i == 1 ... i == 16
-    i = 1
-    while i <= ROUNDS:
-        # Tk1(i+1) = h(Tk1(i))
-        stk_shuffle(tk1)
-        xor_bytes(stk, derived_k[i], tk1, STK_SIZE)
-        write_stk(i)
-        i += 1
-
-    return stks
+    tk1 = _TK1_WORDS.unpack(bytes(_TK1_GATHER(t)))
+    # h^(i+8) == h^i: rounds 0-7, 8-15, then round 16 as round 0
+    tk1 = tk1 + tk1 + tk1[:4]
+    return [k ^ w for k, w in zip(derived_k, tk1)]
+
+# Unrolled block cipher.
+#
+# bc_encrypt_reference() above is the readable round loop. The hot path
+# uses a generated equivalent with all 16 rounds written out: the T-tables
+# are bound as tuples through default arguments (local loads, no integer
+# boxing on every read), byte extraction is inlined, each round writes to
+# fresh locals instead of rebinding, and the 68 sub-tweak key words are
+# unpacked into locals once. It is selected at import after checking that
+# it matches the reference on a fixed block.
+
+def _unrolled_source() -> str:
+    stk = ', '.join(f'k{i}' for i in range(STK_COUNT * 4))
+    lines = [
+        'def bc_encrypt_unrolled(ciphertext, derived_k, tweak, plaintext, offset=0, '
+        '_te0=_TE0, _te1=_TE1, _te2=_TE2, _te3=_TE3, '
+        '_derive=derive_sub_tweak_keys, _unpack_from=struct.unpack_from, _pack_into=struct.pack_into):',
+        f'    {stk} = _derive(derived_k, tweak)',
+        "    a0, a1, a2, a3 = _unpack_from('>LLLL', plaintext, offset)",
+        '    a0 ^= k0; a1 ^= k1; a2 ^= k2; a3 ^= k3',
+    ]
+    src, dst = 'a', 'b'
+    for i in range(1, ROUNDS + 1):
+        for col in range(4):
+            w = [f'{src}{(col + n) % 4}' for n in range(4)]
+            lines.append(
+                f'    {dst}{col} = _te0[{w[0]} >> 24] ^ _te1[({w[1]} >> 16) & 255] ^ '
+                f'_te2[({w[2]} >> 8) & 255] ^ _te3[{w[3]} & 255] ^ k{4 * i + col}'
+            )
+        src, dst = dst, src
+    lines.append(f"    _pack_into('>LLLL', ciphertext, 0, {src}0, {src}1, {src}2, {src}3)")
+    return '\n'.join(lines) + '\n'
+
+def _build_unrolled():
+    namespace = {
+        '_TE0': tuple(TE0), '_TE1': tuple(TE1), '_TE2': tuple(TE2), '_TE3': tuple(TE3),
+        'derive_sub_tweak_keys': derive_sub_tweak_keys, 'struct': struct,
+    }
+    exec(compile(_unrolled_source(), '<deoxysii-unrolled>', 'exec'), namespace)  # pylint: disable=exec-used
+    return namespace['bc_encrypt_unrolled']
+
+def _select_bc_encrypt():
+    try:
+        unrolled = _build_unrolled()
+    except (SyntaxError, MemoryError):
+        return bc_encrypt_reference
+    derived_k = stk_derive_k(bytes(range(KEY_SIZE)))
+    tweak = bytearray(range(0xf0, 0x100))
+    block = bytes(range(0x10, 0x30))
+    expected, actual = bytearray(BLOCK_SIZE), bytearray(BLOCK_SIZE)
+    bc_encrypt_reference(expected, derived_k, tweak, block, 16)
+    unrolled(actual, derived_k, tweak, block, 16)
+    return unrolled if actual == expected else bc_encrypt_reference
+
+bc_encrypt = _select_bc_encrypt()
@@ -0,0 +1,175 @@
+"""
+Multi-block Deoxys-II-256-128 on NumPy arrays.
+
+Every block of the message-encryption pass, Ek(1||tag^j, 00000000||N), and
+of the authentication pass, Ek(0000||j, Mj), is independent of the others.
+Instead of running the 16 table-driven rounds once per block in Python,
+this implementation keeps the round state of a whole batch of blocks in
+uint32 arrays and performs every T-table lookup as one vectorized gather.
+
+NumPy is an optional dependency; import this module only when it is
+installed. Payloads under VECTOR_MIN_BLOCKS blocks go through the scalar
+implementation, which is faster when there is nothing to batch.
+"""
+
+from typing import Union, Optional
+
+import numpy as np
+
+from .deoxysii import (
+    DeoxysII, BLOCK_SIZE, TAG_SIZE, TWEAK_SIZE, STK_COUNT, ROUNDS, PARALLEL_MIN_BYTES,
+    PREFIX_AD_BLOCK, PREFIX_AD_FINAL, PREFIX_MSG_BLOCK, PREFIX_MSG_FINAL,
+    PREFIX_SHIFT, TE0, TE1, TE2, TE3, H_POWERS,
+    _nonce_block, _split_sealed, _verified,
+)
+
+# Below this many blocks (AD + message) the scalar implementation wins
+VECTOR_MIN_BLOCKS = 12
+
+# Blocks per vectorized call; bounds the (blocks, 17, 16) sub-tweak key array
+BATCH_BLOCKS = 4096
+
+_TE = [np.array(table, dtype=np.uint32) for table in (TE0, TE1, TE2, TE3)]
+
+# Row i maps Tk1(i) = h^i(Tk1) back to byte positions of the original tweak
+_H_POWERS = np.array([list(power) for power in H_POWERS])
+
+def _block_numbers(start:int, count:int) -> np.ndarray:
+    # Big-endian 64-bit block counters as (count, 8) bytes
+    return np.arange(start, start + count, dtype='>u8').view(np.uint8).reshape(count, 8)
+
+def _as_words(blocks:np.ndarray) -> np.ndarray:
+    # (n, 16) bytes -> (n, 4) big-endian words in native uint32
+    return blocks.view('>u4').astype(np.uint32)
+
+def _as_bytes(words:np.ndarray) -> np.ndarray:
+    return words.astype('>u4').view(np.uint8).reshape(-1, BLOCK_SIZE)
+
+def _padded(data:memoryview) -> np.ndarray:
+    # Every block of data, the partial final one padded with pad10*
+    full, remaining = divmod(len(data), BLOCK_SIZE)
+    blocks = np.zeros((full + (remaining > 0), BLOCK_SIZE), dtype=np.uint8)
+    blocks.reshape(-1)[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    if remaining:
+        blocks[full, remaining] = 0x80
+    return blocks
+
+def _derived_k_array(derived_k:list[int]) -> np.ndarray:
+    # Key schedule as (STK_COUNT, 16) bytes, to XOR with the h^i(tweak) rows
+    return np.array(derived_k, dtype=">u4").view(np.uint8).reshape(STK_COUNT, BLOCK_SIZE)
+
+def _tag_tweaks(count:int, full:int, prefix_block:int, prefix_final:int) -> np.ndarray:
+    # encode_tag_tweak() for blocks 0..count-1, the last one final when count > full
+    tweaks = np.zeros((count, TWEAK_SIZE), dtype=np.uint8)
+    tweaks[:, 0] = prefix_block << PREFIX_SHIFT
+    if count > full:
+        tweaks[full, 0] = prefix_final << PREFIX_SHIFT
+    tweaks[:, 8:] = _block_numbers(0, count)
+    return tweaks
+
+class DeoxysIINumpy(DeoxysII):
+    def __init__(self, key:Union[bytes,bytearray], processes:Optional[int]=None, parallel_min_bytes:int=PARALLEL_MIN_BYTES):
+        super().__init__(key, processes, parallel_min_bytes)
+        self.derived_k_array = _derived_k_array(self.derived_k)
+
+    @classmethod
+    def from_derived_k(cls, derived_k:list[int]) -> 'DeoxysIINumpy':
+        cipher = super().from_derived_k(derived_k)
+        assert isinstance(cipher, DeoxysIINumpy)
+        cipher.derived_k_array = _derived_k_array(derived_k)
+        return cipher
+
+    @property
+    def implementation(self):
+        return "vartime-numpy"
+
+    def _encrypt_blocks(self, tweaks:np.ndarray, plaintext:np.ndarray) -> np.ndarray:  # pylint: disable=too-many-locals
+        """Ek(tweaks[n], plaintext[n]) for every row; plaintext may be one shared block"""
+        out = np.empty((len(tweaks), BLOCK_SIZE), dtype=np.uint8)
+        te0, te1, te2, te3 = _TE
+        for start in range(0, len(tweaks), BATCH_BLOCKS):
+            batch = tweaks[start:start + BATCH_BLOCKS]
+            # Sub-tweak keys of every round for every block: derived_k[i] ^ h^i(tweak)
+            stks = _as_words((self.derived_k_array ^ batch[:, _H_POWERS]).reshape(-1, BLOCK_SIZE))
+            stks = stks.reshape(len(batch), STK_COUNT, 4)
+
+            state = _as_words(plaintext if len(plaintext) == 1 else plaintext[start:start + BATCH_BLOCKS])
+            s0, s1, s2, s3 = (state[:, k] ^ stks[:, 0, k] for k in range(4))
+            for i in range(1, ROUNDS + 1):
+                s0, s1, s2, s3 = (
+                    te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xff] ^ te2[(s2 >> 8) & 0xff] ^ te3[s3 & 0xff] ^ stks[:, i, 0],
+                    te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xff] ^ te2[(s3 >> 8) & 0xff] ^ te3[s0 & 0xff] ^ stks[:, i, 1],
+                    te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xff] ^ te2[(s0 >> 8) & 0xff] ^ te3[s1 & 0xff] ^ stks[:, i, 2],
+                    te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xff] ^ te2[(s1 >> 8) & 0xff] ^ te3[s2 & 0xff] ^ stks[:, i, 3],
+                )
+            out[start:start + len(batch)] = _as_bytes(np.stack([s0, s1, s2, s3], axis=1))
+        return out
+
+    def _auth(self, ad:memoryview, msg:memoryview) -> bytearray:
+        """XOR-sum of Ek over all AD and message blocks (steps 5-18 / 14-27)"""
+        ad_blocks, msg_blocks = _padded(ad), _padded(msg)
+        tweaks = np.concatenate([
+            _tag_tweaks(len(ad_blocks), len(ad) // BLOCK_SIZE, PREFIX_AD_BLOCK, PREFIX_AD_FINAL),
+            _tag_tweaks(len(msg_blocks), len(msg) // BLOCK_SIZE, PREFIX_MSG_BLOCK, PREFIX_MSG_FINAL),
+        ])
+        encrypted = self._encrypt_blocks(tweaks, np.concatenate([ad_blocks, msg_blocks]))
+        return bytearray(np.bitwise_xor.reduce(encrypted, axis=0).tobytes())
+
+    def _keystream(self, tag:Union[bytes,bytearray,memoryview], nonce_block:bytearray, length:int) -> np.ndarray:
+        """Ek(1||tag^j, 00000000||N) for every block j, as length bytes"""
+        count = -(-length // BLOCK_SIZE)
+        tweaks = np.tile(np.frombuffer(tag, dtype=np.uint8), (count, 1))
+        tweaks[:, 0] |= 0x80
+        tweaks[:, 8:] ^= _block_numbers(0, count)
+        block = np.frombuffer(bytes(nonce_block), dtype=np.uint8).reshape(1, BLOCK_SIZE)
+        return self._encrypt_blocks(tweaks, block).reshape(-1)[:length]
+
+    @staticmethod
+    def _blocks(ad:Optional[Union[bytes,bytearray]], data_len:int) -> int:
+        ad_len = len(ad) if ad is not None else 0
+        return -(-ad_len // BLOCK_SIZE) + -(-data_len // BLOCK_SIZE)
+
+    def encrypt(self, nonce:Union[bytes,bytearray], dst:Union[bytearray,memoryview], ad:Optional[Union[bytes,bytearray]], msg:Optional[Union[bytes,bytearray]]):
+        msg_len = len(msg) if msg is not None else 0
+        if self._blocks(ad, msg_len) < VECTOR_MIN_BLOCKS:
+            super().encrypt(nonce, dst, ad, msg)
+            return
+        assert len(nonce) == (BLOCK_SIZE-1)
+        msg_view = memoryview(msg if msg is not None else b'').cast('B')
+        ad_view = memoryview(ad if ad is not None else b'').cast('B')
+
+        # 20. tag <- Ek(0001||0000||N, Auth ^ message tag)
+        tag = self._auth(ad_view, msg_view)
+        enc_nonce = _nonce_block(nonce)
+        self._finalize_tag(tag, enc_nonce)
+
+        # 24. C <- M ^ Ek(1||tag^j, 00000000||N)
+        if msg_len:
+            keystream = self._keystream(tag, enc_nonce, msg_len)
+            np.bitwise_xor(np.frombuffer(msg_view, dtype=np.uint8), keystream,
+                           out=np.frombuffer(dst, dtype=np.uint8)[:msg_len])
+        dst[len(dst)-TAG_SIZE:] = tag
+
+    def decrypt_into(self, nonce:Union[bytes,bytearray], sealed:Union[bytes,bytearray,memoryview], ad:Optional[Union[bytes,bytearray]]=None, out:Optional[Union[bytearray,memoryview]]=None) -> Optional[memoryview]:
+        ct_len = len(sealed) - TAG_SIZE
+        if ct_len < 0 or self._blocks(ad, ct_len) < VECTOR_MIN_BLOCKS:
+            return super().decrypt_into(nonce, sealed, ad, out)
+        assert len(nonce) == TAG_SIZE-1
+        split = _split_sealed(sealed, out)
+        assert split is not None
+        ciphertext, tag, dst = split
+
+        # 4-7. M <- C ^ Ek(1||tag^j, 00000000||N); the keystream is complete
+        # before the XOR, so dst may alias ciphertext
+        dec_nonce = _nonce_block(nonce)
+        if ct_len:
+            keystream = self._keystream(tag, dec_nonce, ct_len)
+            np.bitwise_xor(np.frombuffer(ciphertext, dtype=np.uint8), keystream,
+                           out=np.frombuffer(dst, dtype=np.uint8))
+
+        # 29. tag' <- Ek(0001||0000||N, Auth ^ message tag')
+        tag_p = self._auth(memoryview(ad if ad is not None else b'').cast('B'), dst)
+        self._finalize_tag(tag_p, dec_nonce)
+
+        # Tag verification
+        return _verified(tag, tag_p, dst)
@@ -1,6 +1,10 @@
-from typing import Optional, TypedDict, cast, Union
+from typing import Optional, Sequence, TypedDict, cast, Union
 from binascii import unhexlify
+from collections import deque
+from concurrent.futures import Executor
 import hmac
+import threading
+import time
 
 import cbor2
 from nacl.bindings.crypto_scalarmult import crypto_scalarmult
@@ -15,6 +19,18 @@ from .error import SapphireError
 
 FORMAT_ENCRYPTED_X25519DEOXYSII = 1
 
+# Ready-to-use ciphers an EphemeralKeyPool keeps per calldata public key
+POOL_SIZE = 8
+# Seconds after the last take() before refilling, so key generation runs
+# while the caller waits on the RPC round trip rather than competing with
+# it for the GIL
+REFILL_DELAY = 0.002
+
+# Upper bound on the payloads encrypt_batch() may seal under one ephemeral key
+MAX_KEY_REUSE = 1024
+# Payloads per task when encrypt_batch() runs on an executor
+BATCH_SHARD_SIZE = 64
+
 class Failure(TypedDict):
     module: str
     code: int
@@ -62,40 +78,91 @@ def _derive_shared_secret(pk:PublicKey, sk:PrivateKey):
     msg = crypto_scalarmult(sk.encode(), pk.encode())
     return hmac.new(key, msg, digestmod='sha512_256').digest()
 
+MAJOR_BYTES = 2
+
+def _cbor_head(major:int, length:int) -> bytes:
+    """CBOR initial byte and argument in the shortest form, as canonical encoding requires"""
+    if length < 24:
+        return bytes([major << 5 | length])
+    for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if length < 1 << (8 * size):
+            return bytes([major << 5 | info]) + length.to_bytes(size, 'big')
+    raise ValueError('length', length)
+
+# {'body': calldata} up to the calldata, and the envelope's closing 'format' entry
+_BODY_KEY = b'\xa1' + cbor2.dumps('body')
+_ENVELOPE_FORMAT = cbor2.dumps('format') + cbor2.dumps(FORMAT_ENCRYPTED_X25519DEOXYSII)
+
+def _calldata_body(calldata:bytes) -> bytes:
+    return _BODY_KEY + _cbor_head(MAJOR_BYTES, len(calldata)) + calldata
+
+_DATA_PACK_HEAD = b'\xa3' + cbor2.dumps('data')
+_DATA_PACK_LEASH = cbor2.dumps('leash')
+_DATA_PACK_SIGNATURE = cbor2.dumps('signature')
+
+def encode_data_pack(envelope:bytes, leash:dict, signature:bytes) -> bytes:
+    """
+    Canonical CBOR of a signed query's {'data', 'leash', 'signature'}, with
+    the already encoded request envelope spliced in as the 'data' value
+    """
+    return b''.join([
+        _DATA_PACK_HEAD,
+        envelope,
+        _DATA_PACK_LEASH,
+        cbor2.dumps(leash, canonical=True),
+        _DATA_PACK_SIGNATURE,
+        cbor2.dumps(signature),
+    ])
+
+def _parse_pubkey(peer_pubkey:Union[PublicKey,str]) -> PublicKey:
+    if isinstance(peer_pubkey, str):
+        if len(peer_pubkey) != 66 or peer_pubkey[:2] != "0x":
+            raise ValueError('peerPublicKey.invalid', peer_pubkey)
+        peer_pubkey = PublicKey(unhexlify(peer_pubkey[2:]))
+    return peer_pubkey
+
 class TransactionCipher:
     epoch:int
     cipher:DeoxysII
     ephemeral_pubkey:bytes
 
     def __init__(self, peer_pubkey:Union[PublicKey,str], peer_epoch:int):
-        if isinstance(peer_pubkey, str):
-            if len(peer_pubkey) != 66 or peer_pubkey[:2] != "0x":
-                raise ValueError('peerPublicKey.invalid', peer_pubkey)
-            peer_pubkey = PublicKey(unhexlify(peer_pubkey[2:]))
+        peer_pubkey = _parse_pubkey(peer_pubkey)
         sk = PrivateKey.generate()
         self.ephemeral_pubkey = sk.public_key.encode()
         self.cipher = DeoxysII(_derive_shared_secret(peer_pubkey, sk))
         self.epoch = peer_epoch
+        # Canonical CBOR of the request envelope on either side of the
+        # ciphertext: {'body': {'pk', 'data', 'epoch', 'nonce'}, 'format'}
+        self._envelope_head = (b'\xa2' + cbor2.dumps('body') + b'\xa4'
+                               + cbor2.dumps('pk') + cbor2.dumps(self.ephemeral_pubkey)
+                               + cbor2.dumps('data'))
+        self._envelope_tail = (cbor2.dumps('epoch') + cbor2.dumps(peer_epoch)
+                               + cbor2.dumps('nonce') + _cbor_head(MAJOR_BYTES, NONCE_SIZE))
 
     def _encrypt_calldata(self, calldata: bytes):
         nonce = random(NONCE_SIZE)
-        plaintext = cbor2.dumps({'body': calldata}, canonical=True)
+        plaintext = _calldata_body(calldata)
         ciphertext = bytearray(len(plaintext) + TAG_SIZE)
         self.cipher.encrypt(nonce=nonce, dst=ciphertext, ad=None, msg=plaintext)
         return ciphertext, nonce
 
-    def encrypt(self, plaintext: bytes):
-        ciphertext, nonce = self._encrypt_calldata(plaintext)
-        envelope:RequestEnvelope = {
-            'body': {
-                'pk': self.ephemeral_pubkey,
-                'data': ciphertext,
-                'nonce': nonce,
-                'epoch': self.epoch
-            },
-            'format': FORMAT_ENCRYPTED_X25519DEOXYSII
-        }
-        return cbor2.dumps(envelope, canonical=True)
+    def encrypt(self, plaintext: bytes) -> bytes:
+        """
+        Seal calldata into a CBOR encoded RequestEnvelope, byte for byte what
+        cbor2.dumps(envelope, canonical=True) gives, with the ciphertext
+        sealed straight into its place between the precomputed head and tail
+        """
+        nonce = random(NONCE_SIZE)
+        body = _calldata_body(plaintext)
+        sealed_len = len(body) + TAG_SIZE
+        head = self._envelope_head + _cbor_head(MAJOR_BYTES, sealed_len)
+        tail = self._envelope_tail + nonce + _ENVELOPE_FORMAT
+        out = bytearray(len(head) + sealed_len + len(tail))
+        out[:len(head)] = head
+        self.cipher.encrypt(nonce=nonce, dst=memoryview(out)[len(head):len(head) + sealed_len], ad=None, msg=body)
+        out[len(head) + sealed_len:] = tail
+        return bytes(out)
 
     def make_envelope(self, plaintext: bytes):
         ciphertext, nonce = self._encrypt_calldata(plaintext)
@@ -110,20 +177,18 @@ class TransactionCipher:
         }
         return envelope
 
-    def _decode_inner(self, plaintext:bytes) -> bytes:
+    def _decode_inner(self, plaintext:Union[bytes,memoryview]) -> bytes:
         inner_result = cast(ResultInner, cbor2.loads(plaintext))
         if inner_result.get('ok', None) is not None:
             return inner_result['ok']
         raise CallError(inner_result['fail'])
 
     def _decrypt_inner(self, envelope: AeadEnvelope):
-        plaintext = bytearray(len(envelope['data']) - TAG_SIZE)
-        decrypt_ok = self.cipher.decrypt(
-            nonce=envelope['nonce'],
-            dst=plaintext,
-            ad=None,
-            ciphertext=envelope['data'])
-        if not decrypt_ok:
+        # Decrypt in place over a writable copy of the ciphertext, leaving
+        # the caller's envelope untouched.
+        sealed = bytearray(envelope['data'])
+        plaintext = self.cipher.decrypt_into(nonce=envelope['nonce'], sealed=sealed)
+        if plaintext is None:
             raise DecryptError()
         return self._decode_inner(plaintext)
 
@@ -139,3 +204,133 @@ class TransactionCipher:
         if ok is not None:
             return self._decrypt_inner(ok)
         raise EnvelopeError("No 'ok' in call result!")
+
+class EphemeralKeyPool:  # pylint: disable=too-many-instance-attributes
+    """
+    TransactionCiphers for one calldata public key and epoch, generated ahead
+    of time on a worker thread so the ephemeral key, X25519 exchange and
+    Deoxys-II key schedule are off the request path.
+
+    Every cipher is handed out by take() exactly once. When the pool is empty
+    take() builds one inline. Close the pool when the key or epoch rotates.
+    """
+    peer_pubkey:PublicKey
+    epoch:int
+
+    def __init__(self, peer_pubkey:Union[PublicKey,str], peer_epoch:int, size:int=POOL_SIZE, refill_delay:float=REFILL_DELAY):
+        if size < 1:
+            raise ValueError('size', size)
+        self.peer_pubkey = _parse_pubkey(peer_pubkey)
+        self.epoch = peer_epoch
+        self.size = size
+        self.refill_delay = refill_delay
+        self._ready: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_take = 0.0
+        self._worker = threading.Thread(target=self._fill, name='sapphire-ephemeral-keys', daemon=True)
+        self._worker.start()
+
+    def matches(self, peer_pubkey:Union[PublicKey,str], peer_epoch:int) -> bool:
+        return peer_epoch == self.epoch and _parse_pubkey(peer_pubkey) == self.peer_pubkey
+
+    @classmethod
+    def rotate(cls, pool:Optional['EphemeralKeyPool'], peer_pubkey:Union[PublicKey,str],
+               peer_epoch:int, size:int=POOL_SIZE) -> 'EphemeralKeyPool':
+        """
+        pool if it is for this key and epoch, else a new pool. The old pool is
+        closed whenever it is not returned, also if the new key is rejected.
+        """
+        replaced = pool
+        try:
+            if pool is not None and pool.matches(peer_pubkey, peer_epoch):
+                replaced = None
+                return pool
+            return cls(peer_pubkey, peer_epoch, size)
+        finally:
+            if replaced is not None:
+                replaced.close()
+
+    def _wait_for_refill(self) -> bool:
+        """Block until a key should be generated; False once closed"""
+        with self._cond:
+            while not self._closed:
+                if len(self._ready) >= self.size:
+                    self._cond.wait()
+                    continue
+                idle = time.monotonic() - self._last_take
+                if idle >= self.refill_delay or not self._ready:
+                    return True
+                self._cond.wait(self.refill_delay - idle)
+            return False
+
+    def _fill(self):
+        while self._wait_for_refill():
+            cipher = TransactionCipher(self.peer_pubkey, self.epoch)
+            with self._cond:
+                if self._closed:
+                    return
+                self._ready.append(cipher)
+
+    def take(self) -> TransactionCipher:
+        with self._cond:
+            self._last_take = time.monotonic()
+            if self._ready:
+                cipher = self._ready.popleft()
+                self._cond.notify()
+                return cipher
+        return TransactionCipher(self.peer_pubkey, self.epoch)
+
+    def close(self):
+        """Stop the worker and discard every unused key"""
+        with self._cond:
+            self._closed = True
+            self._ready.clear()
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _seal_shard(peer_pubkey:bytes, peer_epoch:int, payloads:Sequence[bytes], key_reuse:int) -> list[bytes]:
+    # Module level, with plain arguments, so a process pool can run it
+    pk = PublicKey(peer_pubkey)
+    envelopes: list[bytes] = []
+    for start in range(0, len(payloads), key_reuse):
+        cipher = TransactionCipher(pk, peer_epoch)
+        envelopes.extend(cipher.encrypt(payload) for payload in payloads[start:start + key_reuse])
+    return envelopes
+
+def encrypt_batch(peer_pubkey:Union[PublicKey,str], peer_epoch:int,
+                  payloads:Sequence[bytes], key_reuse:int=1,
+                  executor:Optional[Executor]=None) -> list[bytes]:
+    """
+    Seal many calldata payloads for one calldata public key and epoch.
+    Each becomes its own CBOR request envelope with a fresh random nonce,
+    exactly as TransactionCipher.encrypt() would produce, in input order.
+
+    key_reuse is how many consecutive payloads share one ephemeral key. The
+    default of 1 gives each payload its own key, like the per-call path.
+    Larger groups amortize the key agreement and key schedule, but show the
+    node that those payloads came from one sender. At most MAX_KEY_REUSE.
+
+    With an executor (thread or process pool), payloads are split into
+    shards of BATCH_SHARD_SIZE, rounded to whole key groups, and sealed
+    concurrently.
+    """
+    if not 1 <= key_reuse <= MAX_KEY_REUSE:
+        raise ValueError('key_reuse', key_reuse)
+    pk = _parse_pubkey(peer_pubkey).encode()
+    payloads = [bytes(payload) for payload in payloads]
+    if executor is None:
+        return _seal_shard(pk, peer_epoch, payloads, key_reuse)
+    shard = key_reuse * max(1, BATCH_SHARD_SIZE // key_reuse)
+    shards = [payloads[start:start + shard] for start in range(0, len(payloads), shard)]
+    envelopes: list[bytes] = []
+    for sealed in executor.map(_seal_shard, [pk] * len(shards), [peer_epoch] * len(shards),
+                               shards, [key_reuse] * len(shards)):
+        envelopes.extend(sealed)
+    return envelopes
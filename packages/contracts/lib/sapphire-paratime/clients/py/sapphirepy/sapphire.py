@@ -1,4 +1,5 @@
-from binascii import unhexlify, hexlify
+from binascii import unhexlify
+import threading
 from typing import (
     Any,
     Callable,
@@ -7,14 +8,13 @@ from typing import (
     TypedDict,
 )
 
-import cbor2
 from web3 import Web3
 from web3.types import RPCEndpoint, RPCResponse, TxParams, Middleware
 from eth_typing import HexStr
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 
-from .envelope import TransactionCipher
+from .envelope import TransactionCipher, EphemeralKeyPool, POOL_SIZE, encode_data_pack
 
 NETWORKS = {
     "sapphire": "https://sapphire.oasis.io",
@@ -77,12 +77,17 @@ def _should_intercept(method: RPCEndpoint, params: tuple[TxParams]):
     return method in ('eth_estimateGas', 'eth_sendTransaction', 'eth_call')
 
 
-def _encrypt_tx_params(pk: CalldataPublicKey,
+def _new_cipher(pk: CalldataPublicKey, pool: Optional[EphemeralKeyPool]=None) -> TransactionCipher:
+    if pool is not None:
+        return pool.take()
+    return TransactionCipher(peer_pubkey=pk['key'], peer_epoch=pk['epoch'])
+
+
+def _encrypt_tx_params(c: TransactionCipher,
                        params: tuple[TxParams],
                        method,
                        web3: Web3,
                        account: Optional[LocalAccount]=None) -> TransactionCipher:
-    c = TransactionCipher(peer_pubkey=pk['key'], peer_epoch=pk['epoch'])
     data = params[0]['data']
     if isinstance(data, bytes):
         data_bytes = data
@@ -92,25 +97,25 @@ def _encrypt_tx_params(pk: CalldataPublicKey,
         data_bytes = unhexlify(data[2:])
     else:
         raise TypeError("Invalid 'data' type", type(data))
+    # Sealed exactly once, whichever of the three methods this is
     encrypted_data = c.encrypt(data_bytes)
 
     if method == 'eth_call' and params[0]['from'] and account:
-        data_pack = _new_signed_call_data_pack(c.make_envelope(data_bytes),
-                                               data_bytes,
-                                               params,
-                                               web3,
-                                               account)
-        params[0]['data'] = cbor2.dumps(data_pack, canonical=True)
+        params[0]['data'] = _new_signed_call_data_pack(encrypted_data,
+                                                       data_bytes,
+                                                       params,
+                                                       web3,
+                                                       account)
     else:
-        params[0]['data'] = HexStr('0x' + hexlify(encrypted_data).decode('ascii'))
+        params[0]['data'] = HexStr('0x' + encrypted_data.hex())
     return c
 
 
-def _new_signed_call_data_pack(encrypted_data: dict,
+def _new_signed_call_data_pack(encrypted_data: bytes,
                                data_bytes: bytes,
                                params: tuple[TxParams],
                                web3: Web3,
-                               account: LocalAccount) -> dict:
+                               account: LocalAccount) -> bytes:
     # Update params with default values, these get used outside the scope of this function
     params[0]['gas'] = params[0].get('gas', DEFAULT_GAS_LIMIT)
     params[0]['gasPrice'] = params[0].get('gasPrice', web3.to_wei(DEFAULT_GAS_PRICE, 'wei'))
@@ -180,20 +185,17 @@ def _new_signed_call_data_pack(encrypted_data: dict,
         "block_range": DEFAULT_BLOCK_RANGE,
     }
 
-    data_pack= {
-        'data': encrypted_data,
-        'leash': leash,
-        'signature': bytes(signed_msg['signature']),
-    }
-    return data_pack
+    return encode_data_pack(encrypted_data, leash, bytes(signed_msg['signature']))
 
 
 def construct_sapphire_middleware(
-        account: Optional[LocalAccount] = None
+        account: Optional[LocalAccount] = None,
+        pool_size: int = POOL_SIZE
 ) -> Middleware:
     """
     Construct a Sapphire middleware for Web3.py.
     :param account: Used to encrypt signed queries.
+    :param pool_size: Ephemeral keys to generate ahead of time, 0 to disable.
     :return: A Sapphire middleware function.
     """
 
@@ -217,8 +219,24 @@ def construct_sapphire_middleware(
         from being verified.
 
         Pre-signed transactions can't be encrypted if submitted via this instance.
+
+        Ephemeral keys for the current calldata public key are generated on a
+        background thread, up to pool_size ahead; each is still used once.
         """
         manager = CalldataPublicKeyManager()
+        pool: Optional[EphemeralKeyPool] = None
+        # Requests may come from several threads; one pool is swapped at a time
+        pool_lock = threading.Lock()
+
+        def pool_for(pk: CalldataPublicKey) -> Optional[EphemeralKeyPool]:
+            nonlocal pool
+            if pool_size < 1:
+                return None
+            with pool_lock:
+                # rotate() closes the old pool, even when it raises
+                previous, pool = pool, None
+                pool = EphemeralKeyPool.rotate(previous, pk['key'], pk['epoch'], pool_size)
+                return pool
 
         def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
             if _should_intercept(method, params):
@@ -235,7 +253,7 @@ def construct_sapphire_middleware(
                         raise RuntimeError('Could not retrieve callDataPublicKey!')
                     do_fetch = False
 
-                    c = _encrypt_tx_params(pk, params, method, w3, account)
+                    c = _encrypt_tx_params(_new_cipher(pk, pool_for(pk)), params, method, w3, account)
 
                     # We may encounter three errors here:
                     #  'core: invalid call format: epoch too far in the past'
@@ -254,8 +272,8 @@ def construct_sapphire_middleware(
 
                 # Only eth_call is decrypted
                 if method == 'eth_call' and result.get('result', '0x') != '0x':
-                    decrypted = c.decrypt(unhexlify(result['result'][2:]))
-                    result['result'] = HexStr('0x' + hexlify(decrypted).decode('ascii'))
+                    decrypted = c.decrypt(bytes.fromhex(result['result'][2:]))
+                    result['result'] = HexStr('0x' + decrypted.hex())
 
                 return result
             return make_request(method, params)
@@ -1,10 +1,24 @@
 import os
 import json
+import mmap
+import tempfile
 import unittest
 from base64 import b64decode
 from dataclasses import dataclass
+from types import ModuleType
+from typing import Optional
+from unittest import mock
 
-from sapphirepy.deoxysii import DeoxysII, TAG_SIZE
+from sapphirepy.deoxysii import (
+    DeoxysII, TAG_SIZE, BLOCK_SIZE, TWEAK_SIZE, KEY_SIZE,
+    bc_encrypt, bc_encrypt_reference, stk_derive_k,
+)
+
+deoxysii_numpy:Optional[ModuleType]
+try:
+    from sapphirepy import deoxysii_numpy
+except ImportError:
+    deoxysii_numpy = None
 
 TESTDATA = os.path.join(os.path.dirname(__file__), 'testdata')
 
@@ -18,6 +32,8 @@ class OfficialTestVector:
     sealed: bytes
 
 class TestDeoxysII(unittest.TestCase):
+    cipher:type[DeoxysII] = DeoxysII
+
     # pylint: disable=too-many-locals
     def test_kat(self):
         fn = os.path.join(TESTDATA, 'Deoxys-II-256-128.json')
@@ -28,7 +44,7 @@ class TestDeoxysII(unittest.TestCase):
         assert len(nonce) == 15
         msg = b64decode(data['MsgData'])
         ad = b64decode(data['AADData'])
-        x = DeoxysII(key)
+        x = self.cipher(key)
 
         off = 0
 
@@ -49,11 +65,20 @@ class TestDeoxysII(unittest.TestCase):
             p = bytearray(pt_len)
             self.assertTrue(x.decrypt(nonce, p, a, c))
 
+            # Decrypt in place over a copy of the sealed buffer.
+            sealed = bytearray(c)
+            opened = x.decrypt_into(nonce, sealed, a)
+            assert opened is not None
+            self.assertEqual(bytes(opened), m)
+            self.assertEqual(sealed[:pt_len], m)
+
             # Test malformed ciphertext (or tag).
             bad_ciphertext = c[:]
             bad_ciphertext[pt_len] ^= 0x23
             p = bytearray(pt_len)
             self.assertFalse(x.decrypt(nonce, p, a, bad_ciphertext))
+            self.assertIsNone(x.decrypt_into(nonce, bad_ciphertext, a))
+            self.assertEqual(bad_ciphertext[:pt_len], bytes(pt_len))
 
             # Test malformed AD.
             if pt_len > 0:
@@ -82,7 +107,7 @@ class TestDeoxysII(unittest.TestCase):
                 #print('\t   Msg:', t.msg.hex())
                 #print('\tSealed:', t.sealed.hex())
 
-                x = DeoxysII(t.key)
+                x = self.cipher(t.key)
 
                 # Verify encryption matches
                 ciphertext = bytearray(len(t.sealed))
@@ -99,5 +124,98 @@ class TestDeoxysII(unittest.TestCase):
                 self.assertEqual(plaintext, t.msg)
                 #print()
 
+    def test_from_derived_k(self):
+        key, nonce, ad, msg = os.urandom(KEY_SIZE), os.urandom(15), os.urandom(40), os.urandom(300)
+        x = self.cipher(key, processes=2, parallel_min_bytes=4096)
+        self.assertEqual((x.processes, x.parallel_min_bytes), (2, 4096))
+        y = self.cipher.from_derived_k(x.derived_k)
+        self.assertIsInstance(y, self.cipher)
+
+        expected = bytearray(len(msg) + TAG_SIZE)
+        x.encrypt(nonce, expected, ad, msg)
+        sealed = bytearray(len(msg) + TAG_SIZE)
+        y.encrypt(nonce, sealed, ad, msg)
+        self.assertEqual(sealed, expected)
+        self.assertTrue(y.decrypt(nonce, bytearray(len(msg)), ad, sealed))
+
+class TestBlockCipher(unittest.TestCase):
+    def test_unrolled_matches_reference(self):
+        self.assertEqual(bc_encrypt.__name__, 'bc_encrypt_unrolled')
+        for _ in range(64):
+            derived_k = stk_derive_k(os.urandom(KEY_SIZE))
+            tweak = bytearray(os.urandom(TWEAK_SIZE))
+            plaintext = os.urandom(3 * BLOCK_SIZE)
+            for offset in (0, 5, 2 * BLOCK_SIZE):
+                expected, actual = bytearray(BLOCK_SIZE), bytearray(BLOCK_SIZE)
+                bc_encrypt_reference(expected, derived_k, tweak, plaintext, offset)
+                bc_encrypt(actual, derived_k, tweak, plaintext, offset)
+                self.assertEqual(actual, expected)
+
+class TestFiles(unittest.TestCase):
+    def test_seal_open_file(self):
+        key, nonce = os.urandom(KEY_SIZE), os.urandom(15)
+        x = DeoxysII(key)
+        chunk = mmap.ALLOCATIONGRANULARITY
+        with tempfile.TemporaryDirectory() as root:
+            src, sealed, opened = (os.path.join(root, name) for name in ('src', 'sealed', 'opened'))
+            for length in (0, 33, chunk, 2 * chunk + 7):
+                msg, ad = os.urandom(length), os.urandom(20)
+                with open(src, 'wb') as handle:
+                    handle.write(msg)
+
+                # Same bytes as encrypt(), while crossing window boundaries
+                x.seal_file(nonce, src, sealed, ad, chunk_size=chunk)
+                expected = bytearray(length + TAG_SIZE)
+                x.encrypt(nonce, expected, ad, msg)
+                with open(sealed, 'rb') as handle:
+                    self.assertEqual(handle.read(), expected)
+
+                self.assertTrue(x.open_file(nonce, sealed, opened, ad, chunk_size=chunk))
+                with open(opened, 'rb') as handle:
+                    self.assertEqual(handle.read(), msg)
+
+                # Tampering leaves no plaintext behind
+                self.assertFalse(x.open_file(nonce, sealed, opened, ad + b'!', chunk_size=chunk))
+                self.assertEqual(os.path.getsize(opened), 0)
+
+class TestParallel(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        key, nonce = os.urandom(KEY_SIZE), os.urandom(15)
+        serial = DeoxysII(key)
+        with DeoxysII(key, processes=3, parallel_min_bytes=0) as parallel:
+            for msg_len, ad_len in ((0, 0), (1, 0), (47, 33), (48, 0), (200, 130), (1000, 17)):
+                msg, ad = os.urandom(msg_len), os.urandom(ad_len)
+                expected = bytearray(msg_len + TAG_SIZE)
+                serial.encrypt(nonce, expected, ad, msg)
+                sealed = bytearray(msg_len + TAG_SIZE)
+                parallel.encrypt(nonce, sealed, ad, msg)
+                self.assertEqual(sealed, expected)
+
+                opened = bytearray(msg_len)
+                self.assertTrue(parallel.decrypt(nonce, opened, ad, sealed))
+                self.assertEqual(opened, msg)
+                sealed[0] ^= 0x23
+                self.assertFalse(parallel.decrypt(nonce, bytearray(msg_len), ad, sealed))
+
+@unittest.skipIf(deoxysii_numpy is None, 'numpy is not installed')
+class TestDeoxysIINumpy(TestDeoxysII):
+    cipher = deoxysii_numpy.DeoxysIINumpy if deoxysii_numpy else DeoxysII
+
+    def setUp(self):
+        # Vectorize every payload, not just those past the scalar cut-over
+        patcher = mock.patch.object(deoxysii_numpy, 'VECTOR_MIN_BLOCKS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_short_sealed_matches_scalar(self):
+        key, nonce = os.urandom(KEY_SIZE), os.urandom(15)
+        x, scalar = self.cipher(key), DeoxysII(key)
+        for sealed_len in (0, 5, TAG_SIZE - 1):
+            for ad in (None, b'', b'A' * 256):
+                with self.subTest(sealed_len=sealed_len, ad_len=len(ad) if ad is not None else None):
+                    sealed = bytearray(sealed_len)
+                    self.assertIsNone(scalar.decrypt_into(nonce, bytearray(sealed), ad))
+                    self.assertIsNone(x.decrypt_into(nonce, sealed, ad))
+
 if __name__ == '__main__':
     unittest.main()
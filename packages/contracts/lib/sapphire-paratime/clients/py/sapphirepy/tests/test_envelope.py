@@ -0,0 +1,242 @@
+import os
+import time
+import unittest
+from importlib.util import find_spec
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+import cbor2
+from nacl.public import PrivateKey, PublicKey
+
+from sapphirepy.deoxysii import DeoxysII, TAG_SIZE
+from sapphirepy.envelope import (
+    MAX_KEY_REUSE, AeadEnvelope, EphemeralKeyPool, TransactionCipher,
+    _derive_shared_secret, encode_data_pack, encrypt_batch,
+)
+
+# Lengths where a CBOR length prefix or integer grows by a byte
+CBOR_BOUNDARIES = [0, 1, 23, 24, 255, 256, 65535, 65536]
+
+def open_envelope(peer:PrivateKey, envelope:dict) -> bytes:
+    """Calldata sealed in a request envelope, as the node would open it"""
+    body = envelope['body']
+    cipher = DeoxysII(_derive_shared_secret(PublicKey(body['pk']), peer))
+    plaintext = bytearray(len(body['data']) - TAG_SIZE)
+    assert cipher.decrypt(body['nonce'], plaintext, None, body['data'])
+    return cbor2.loads(plaintext)['body']
+
+class TestTransactionCipher(unittest.TestCase):
+    def setUp(self):
+        self.peer = PrivateKey.generate()
+        self.peer_hex = '0x' + bytes(self.peer.public_key).hex()
+
+    def test_encrypt_is_canonical(self):
+        # Calldata lengths at each boundary, and those that put the sealed
+        # body (calldata + CBOR head + tag) on one
+        lengths = set(CBOR_BOUNDARIES)
+        for boundary in CBOR_BOUNDARIES:
+            lengths.update(n for n in range(max(0, boundary - 32), boundary)
+                           if len(cbor2.dumps({'body': bytes(n)})) + TAG_SIZE == boundary)
+        for epoch in (0, 23, 24, 255, 256, 65536, 2**32):
+            cipher = TransactionCipher(self.peer_hex, epoch)
+            # The 64 KiB payloads are slow to seal; one epoch is enough for them
+            for length in sorted(n for n in lengths if epoch == 0 or n < 1024):
+                with self.subTest(epoch=epoch, length=length):
+                    calldata = os.urandom(length)
+                    encoded = cipher.encrypt(calldata)
+                    envelope = cbor2.loads(encoded)
+                    self.assertEqual(encoded, cbor2.dumps(envelope, canonical=True))
+                    self.assertEqual(envelope['format'], 1)
+                    self.assertEqual(envelope['body']['epoch'], epoch)
+                    self.assertEqual(envelope['body']['pk'], cipher.ephemeral_pubkey)
+                    self.assertEqual(open_envelope(self.peer, envelope), calldata)
+
+    def test_data_pack_is_canonical(self):
+        cipher = TransactionCipher(self.peer_hex, 3)
+        leash = {
+            'nonce': 7,
+            'block_number': 123456789,
+            'block_hash': os.urandom(32),
+            'block_range': 15,
+        }
+        signature = os.urandom(65)
+        for length in (0, 24, 300):
+            with self.subTest(length=length):
+                envelope = cipher.encrypt(os.urandom(length))
+                expected = cbor2.dumps({
+                    'data': cbor2.loads(envelope),
+                    'leash': leash,
+                    'signature': signature,
+                }, canonical=True)
+                self.assertEqual(encode_data_pack(envelope, leash, signature), expected)
+
+    def test_decrypt_leaves_envelope(self):
+        cipher = TransactionCipher(self.peer_hex, 0)
+        for result in (b'', os.urandom(300)):
+            with self.subTest(length=len(result)):
+                nonce = os.urandom(15)
+                inner = cbor2.dumps({'ok': result})
+                sealed = bytearray(len(inner) + TAG_SIZE)
+                cipher.cipher.encrypt(nonce, sealed, None, inner)
+                ok = AeadEnvelope(nonce=nonce, data=bytes(sealed))
+                self.assertEqual(cipher.decrypt(cbor2.dumps({'ok': ok})), result)
+                self.assertEqual(cipher._decrypt_inner(ok), result)  # pylint: disable=protected-access
+                self.assertEqual(ok, {'nonce': nonce, 'data': bytes(sealed)})
+
+class TestEncryptBatch(unittest.TestCase):
+    def setUp(self):
+        self.peer = PrivateKey.generate()
+        self.peer_hex = '0x' + bytes(self.peer.public_key).hex()
+        # Distinct lengths, so a reordering cannot go unnoticed
+        self.payloads = [os.urandom(n) for n in range(10)]
+
+    def check_batch(self, envelopes:list[bytes], key_reuse:int):
+        self.assertEqual(len(envelopes), len(self.payloads))
+        decoded = [cbor2.loads(encoded) for encoded in envelopes]
+        for envelope, payload in zip(decoded, self.payloads):
+            self.assertEqual(envelope['body']['epoch'], 4)
+            self.assertEqual(open_envelope(self.peer, envelope), payload)
+        nonces = [envelope['body']['nonce'] for envelope in decoded]
+        self.assertEqual(len(set(nonces)), len(nonces))
+        # One ephemeral key per group of key_reuse consecutive payloads
+        keys = [envelope['body']['pk'] for envelope in decoded]
+        groups = [keys[start:start + key_reuse] for start in range(0, len(keys), key_reuse)]
+        for group in groups:
+            self.assertEqual(set(group), {group[0]})
+        self.assertEqual(len({group[0] for group in groups}), len(groups))
+
+    def test_serial(self):
+        for key_reuse in (1, 3, 10, 16):
+            with self.subTest(key_reuse=key_reuse):
+                self.check_batch(encrypt_batch(self.peer_hex, 4, self.payloads, key_reuse), key_reuse)
+
+    def test_executors(self):
+        for executor_class in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with executor_class(2) as executor:
+                for key_reuse in (1, 3):
+                    with self.subTest(executor=executor_class.__name__, key_reuse=key_reuse):
+                        # Shards of 2 payloads, so the batch is split across tasks
+                        with mock.patch('sapphirepy.envelope.BATCH_SHARD_SIZE', 2):
+                            envelopes = encrypt_batch(self.peer_hex, 4, self.payloads, key_reuse, executor)
+                        self.check_batch(envelopes, key_reuse)
+
+    def test_key_reuse_bounds(self):
+        for key_reuse in (0, -1, MAX_KEY_REUSE + 1):
+            with self.subTest(key_reuse=key_reuse):
+                with self.assertRaises(ValueError):
+                    encrypt_batch(self.peer_hex, 4, self.payloads, key_reuse)
+        self.assertEqual(len(encrypt_batch(self.peer_hex, 4, self.payloads, MAX_KEY_REUSE)), len(self.payloads))
+
+def wait_for(condition, timeout:float=10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class TestEphemeralKeyPool(unittest.TestCase):
+    # pylint: disable=protected-access
+    def setUp(self):
+        self.peer_hex = '0x' + bytes(PrivateKey.generate().public_key).hex()
+
+    def pool(self, **kwargs) -> EphemeralKeyPool:
+        pool = EphemeralKeyPool(self.peer_hex, 5, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_take_never_repeats(self):
+        pool = self.pool(size=4, refill_delay=0)
+        taken = [pool.take() for _ in range(40)]
+        self.assertEqual(len({id(cipher) for cipher in taken}), len(taken))
+        self.assertEqual(len({cipher.ephemeral_pubkey for cipher in taken}), len(taken))
+        for cipher in taken:
+            self.assertEqual(cipher.epoch, 5)
+
+    def test_refills_up_to_size(self):
+        pool = self.pool(size=3, refill_delay=0)
+        self.assertTrue(wait_for(lambda: len(pool._ready) == 3))
+        pool.take()
+        self.assertTrue(wait_for(lambda: len(pool._ready) == 3))
+        time.sleep(0.1)
+        self.assertEqual(len(pool._ready), 3)
+
+    def test_inline_when_empty(self):
+        # No worker, so every take() has to build its cipher itself
+        with mock.patch.object(EphemeralKeyPool, '_fill'):
+            pool = self.pool(size=2)
+            first, second = pool.take(), pool.take()
+        self.assertNotEqual(first.ephemeral_pubkey, second.ephemeral_pubkey)
+        self.assertEqual((first.epoch, second.epoch), (5, 5))
+        self.assertEqual(len(pool._ready), 0)
+
+    def test_close_stops_worker_and_drops_keys(self):
+        pool = self.pool(size=2, refill_delay=0)
+        self.assertTrue(wait_for(lambda: len(pool._ready) == 2))
+        pool.close()
+        pool._worker.join(10)
+        self.assertFalse(pool._worker.is_alive())
+        self.assertEqual(len(pool._ready), 0)
+
+    def test_rotate(self):
+        pool = self.pool(size=1)
+        self.assertIs(EphemeralKeyPool.rotate(pool, self.peer_hex, 5, 1), pool)
+
+        # A new epoch, then a new key: the previous pool is closed each time
+        next_epoch = EphemeralKeyPool.rotate(pool, self.peer_hex, 6, 1)
+        self.addCleanup(next_epoch.close)
+        self.assertIsNot(next_epoch, pool)
+        self.assertEqual(next_epoch.epoch, 6)
+        pool._worker.join(10)
+        self.assertFalse(pool._worker.is_alive())
+
+        other_key = '0x' + bytes(PrivateKey.generate().public_key).hex()
+        next_key = EphemeralKeyPool.rotate(next_epoch, other_key, 6, 1)
+        self.addCleanup(next_key.close)
+        self.assertIsNot(next_key, next_epoch)
+        next_epoch._worker.join(10)
+        self.assertFalse(next_epoch._worker.is_alive())
+
+        # A malformed key raises, and the pool it would replace is still closed
+        with self.assertRaises(ValueError):
+            EphemeralKeyPool.rotate(next_key, '0x1234', 7, 1)
+        next_key._worker.join(10)
+        self.assertFalse(next_key._worker.is_alive())
+
+@unittest.skipUnless(find_spec('web3'), 'web3 is not installed')
+class TestMiddlewarePools(unittest.TestCase):
+    def test_pool_discarded_on_epoch_change(self):
+        # pylint: disable=import-outside-toplevel
+        from sapphirepy import sapphire
+
+        node = {'epoch': 1}
+        sent_epochs = []
+        closed = []
+        original_close = EphemeralKeyPool.close
+
+        def make_request(method, params):
+            if method == 'oasis_callDataPublicKey':
+                return {'result': {'key': '0x' + bytes(PrivateKey.generate().public_key).hex(),
+                                   'checksum': '0x', 'signature': '0x', 'epoch': node['epoch']}}
+            epoch = cbor2.loads(bytes.fromhex(params[0]['data'][2:]))['body']['epoch']
+            sent_epochs.append(epoch)
+            if epoch < node['epoch']:
+                return {'error': {'code': -32000,
+                                  'message': 'core: invalid call format: epoch too far in the past'}}
+            return {'result': '0x01'}
+
+        def close(pool):
+            closed.append(pool.epoch)
+            original_close(pool)
+
+        with mock.patch.object(EphemeralKeyPool, 'close', autospec=True, side_effect=close):
+            middleware = sapphire.construct_sapphire_middleware(pool_size=2)(make_request, None)
+            for epoch in (1, 2):
+                node['epoch'] = epoch
+                middleware('eth_estimateGas', ({'to': '0x' + '11' * 20, 'data': '0x00'},))
+        # The stale epoch was rejected once, then the request went out under a new pool
+        self.assertEqual(sent_epochs, [1, 1, 2])
+        self.assertEqual(closed, [1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,7 @@ setup(
     python_requires='>=3.8',
     packages=find_packages(include=["sapphirepy"]),
     install_requires=REQUIREMENTS,
+    extras_require={'numpy': ['numpy']},
     url="https://github.com/oasisprotocol/sapphire-paratime",
     version="0.3.0",
     zip_safe=True,